@@ -0,0 +1,170 @@
+"""
+Benchmark the two search backends of the app on the same ontologies:
+
+  tfidf  the default: the TF-IDF matrix, vectorizer and terms loaded into
+         memory, cosine similarity (tfidf_search.search_local)
+  fts    MAPTOLOGY_SEARCH_BACKEND=fts: the SQLite/FTS5 file answers from
+         disk with BM25, nothing is loaded (fts_search.py)
+
+Each ontology is built once into a temporary cache directory with both
+artifacts. Every backend is then measured in a fresh subprocess, so its
+memory is not mixed with the other's:
+
+  build s     time to write the backend's artifacts (vectorize+save / FTS)
+  disk MB     size of those artifacts
+  RSS MB      resident memory of the process after the first query (the
+              load) and after all queries, minus the same process right
+              after importing the app modules
+  first ms    first query (includes loading the ontology for tfidf)
+  mean / p95  per-query latency over the query set, after the first
+  overlap@N   top-N IRIs shared with the tfidf backend
+
+Usage:
+    python benchmark_search_backends.py NCIT EFO            # from tfidf_cache/
+    python benchmark_search_backends.py ../ontology_cache/X.owl
+    python benchmark_search_backends.py NCIT --queries queries.txt --top-n 10
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import build_all_caches as bac
+import evaluate_search
+
+
+APP_DIR = os.path.join(bac._REPO_ROOT, "src", "Maptology")
+BACKENDS = ("tfidf", "fts")
+
+
+def current_rss_mb():
+    """Resident set size of this process now (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024.0 / 1024.0, 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return bac.peak_rss_mb()
+
+
+def measure(backend, cache_dir, acronym, queries, top_n):
+    """Run the queries through the app's search_local with one backend
+    (called in a fresh subprocess); returns the measurements as a dict."""
+    os.environ["MAPTOLOGY_SEARCH_BACKEND"] = backend
+    os.environ["MAPTOLOGY_MEMORY_BUDGET_MB"] = "0"
+    os.environ["MAPTOLOGY_SEMANTIC_WEIGHT"] = "0"
+    sys.path.insert(0, APP_DIR)
+    import tfidf_search
+
+    tfidf_search.CACHE_DIR = cache_dir
+    base_rss = current_rss_mb()
+    times = []
+    results = []
+    rss_loaded = None
+    for query in queries:
+        t0 = time.perf_counter()
+        df = tfidf_search.search_local(query, [acronym], top_n=top_n)
+        times.append((time.perf_counter() - t0) * 1000.0)
+        if rss_loaded is None:
+            rss_loaded = current_rss_mb()
+        results.append([] if df is None else df["Ontology Term URI"].tolist()[:top_n])
+    warm = sorted(times[1:]) or times
+    return {
+        "rss_loaded_mb": round(rss_loaded - base_rss, 1),
+        "rss_final_mb": round(current_rss_mb() - base_rss, 1),
+        "first_ms": round(times[0], 2),
+        "mean_ms": round(sum(warm) / len(warm), 2),
+        "p95_ms": round(warm[min(len(warm) - 1, int(len(warm) * 0.95))], 2),
+        "results": results,
+    }
+
+
+def build(cache_dir, acronym, terms):
+    """Publish both backends' artifacts for one ontology into cache_dir;
+    returns {backend: (build seconds, artifact bytes)}."""
+    bac.CACHE_DIR = cache_dir
+    bac.BUILD_OPTIONS_FILE = os.path.join(cache_dir, "build_options.json")
+    with open(bac.BUILD_OPTIONS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"*": {"fts": True}}, f)
+    stats = {}
+    bac.build_and_save(acronym, terms, stats=stats)
+    timings = stats["timings"]
+    sizes = stats["artifact_bytes"]
+    fts_bytes = sizes.get(acronym + bac.FTS_SUFFIX, 0)
+    return {
+        "tfidf": (timings["vectorize"] + timings["save"], sum(sizes.values()) - fts_bytes),
+        "fts": (timings["fts"], fts_bytes),
+    }
+
+
+def benchmark(source, queries, top_n):
+    name, terms = evaluate_search.load_terms(source)
+    acronym = "BENCH"
+    cache_dir = tempfile.mkdtemp(prefix="maptology_backends_")
+    queries_file = os.path.join(cache_dir, "queries.json")
+    with open(queries_file, "w", encoding="utf-8") as f:
+        json.dump(queries, f)
+    try:
+        built = build(cache_dir, acronym, terms)
+        measured = {}
+        for backend in BACKENDS:
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", backend,
+                 cache_dir, acronym, queries_file, str(top_n)],
+                capture_output=True, text=True, check=True)
+            measured[backend] = json.loads(out.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(name + "  " + str(len(terms)) + " terms, " + str(len(queries)) + " queries", flush=True)
+    print("  " + "backend".ljust(8) + "build s".rjust(9) + "disk MB".rjust(9)
+          + "RSS MB load".rjust(13) + "RSS MB end".rjust(12) + "first ms".rjust(10)
+          + "mean ms".rjust(9) + "p95 ms".rjust(9) + ("overlap@" + str(top_n)).rjust(12))
+    reference = measured["tfidf"]["results"]
+    for backend in BACKENDS:
+        m = measured[backend]
+        overlaps = [len(set(mine) & set(ref)) / float(len(ref))
+                    for mine, ref in zip(m["results"], reference) if ref]
+        build_s, nbytes = built[backend]
+        print("  " + backend.ljust(8)
+              + str(round(build_s, 1)).rjust(9)
+              + str(round(nbytes / 1024.0 / 1024.0, 1)).rjust(9)
+              + str(m["rss_loaded_mb"]).rjust(13)
+              + str(m["rss_final_mb"]).rjust(12)
+              + str(m["first_ms"]).rjust(10)
+              + str(m["mean_ms"]).rjust(9)
+              + str(m["p95_ms"]).rjust(9)
+              + str(round(sum(overlaps) / len(overlaps), 3) if overlaps else "-").rjust(12),
+              flush=True)
+
+
+def main():
+    if len(sys.argv) == 7 and sys.argv[1] == "--measure":
+        _, _, backend, cache_dir, acronym, queries_file, top_n = sys.argv
+        with open(queries_file, "r", encoding="utf-8") as f:
+            queries = json.load(f)
+        print(json.dumps(measure(backend, cache_dir, acronym, queries, int(top_n))))
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sources", nargs="+", help="Acronyms (cached) or OWL file paths")
+    parser.add_argument("--queries", help="File with one query per line (replaces the default set)")
+    parser.add_argument("--top-n", type=int, default=evaluate_search.TOP_N)
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = list(evaluate_search.DEFAULT_QUERIES)
+    for source in args.sources:
+        benchmark(source, queries, args.top_n)
+
+
+if __name__ == "__main__":
+    main()
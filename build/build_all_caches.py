@@ -2,12 +2,16 @@
 Build TF-IDF caches for every ontology listed in ontology_cache/ontology_list.tsv.
 
 Resumable: skips ontologies whose cache already exists in tfidf_cache/<ACRONYM>/.
-Failures are logged to build_failures.log and the script continues.
+Failures are logged to build_failures.log and the script continues. Each build
+runs in its own subprocess and is published atomically as a new generation;
+the cache layout, build_options.json and the files written next to the caches
+are described in README.md ("Building the ontology caches").
 
 Strategy:
   - Small/medium files (<= STREAM_THRESHOLD_MB): owlready2 (handles RDF/XML + Turtle).
-  - Large files (> STREAM_THRESHOLD_MB) that look like RDF/XML: streaming
-    xml.etree.iterparse (low memory). Non-XML large files fall back to owlready2.
+  - Large RDF/XML, Turtle / N-Triples and OWL/XML files: streaming parsers
+    (low memory). Anything else falls back to owlready2, then rdflib.
+  - Sources may be compressed (.owl.gz, .owl.zst with zstandard).
 
 Annotation property handling (namespace-agnostic, matched by local name):
   label:       rdfs:label
@@ -15,28 +19,70 @@ Annotation property handling (namespace-agnostic, matched by local name):
   synonyms:    hasExactSynonym / hasRelatedSynonym / hasBroadSynonym /
                hasNarrowSynonym (OBO) + P90 (NCIT FULL_SYN)
   deprecated:  owl:deprecated="true"
+  parents:     rdfs:subClassOf with a named class (restrictions are skipped)
 
 Usage:
     python build_all_caches.py                 # build everything not yet cached
     python build_all_caches.py --limit 5       # build only the first 5 (sample run)
     python build_all_caches.py --only ABC,DEF  # build just these acronyms
     python build_all_caches.py --list-only     # show the plan, don't build
+    python build_all_caches.py --only ABC --rebuild  # publish a new generation
+    python build_all_caches.py --catalog-only  # or --shared-index-only, --bundle-only
 """
 
 import argparse
+import errno
 import gc
+import gzip
+import hashlib
+import io
 import json
 import os
 import pickle
+import re
+import sqlite3
+import struct
 import subprocess
 import sys
+import tempfile
 import time
+import tracemalloc
 import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
 
+import numpy as np
 import ormsgpack
 import pandas as pd
 from scipy import sparse
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse.csgraph import connected_components
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+
+# Optional: resource (POSIX only) gives peak RSS for the build telemetry.
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    resource = None
+    RESOURCE_AVAILABLE = False
+
+# Optional: lxml makes the RDF/XML streaming parse faster. xml.etree is used
+# when it is not installed.
+try:
+    from lxml import etree as LXML_ETREE
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_ETREE = None
+    LXML_AVAILABLE = False
+
+# Optional: zstandard is only needed for .zst-compressed ontology sources.
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
 
 
 # Resolved against the repo root (this script lives in build/) rather than the
@@ -46,11 +92,56 @@ TSV_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_list.tsv")
 CACHE_DIR = os.path.join(_REPO_ROOT, "tfidf_cache")
 FAILURE_LOG = os.path.join(_REPO_ROOT, "build_failures.log")
 WORKER_STATUS_FILE = os.path.join(_REPO_ROOT, "_worker_status.json")
+BUILD_REPORT_FILE = os.path.join(CACHE_DIR, "build_report.json")
+SHARED_IRIS_FILE = os.path.join(CACHE_DIR, "shared_iris.ormsgpack")
+# Every shared term, once, published like an ontology (tfidf_cache/_shared/).
+# Not an ontology: left out of the catalog and the warm-start bundle.
+SHARED_BLOCK = "_shared"
+CATALOG_FILE = os.path.join(CACHE_DIR, "catalog.json")
+WARM_BUNDLE_FILE = os.path.join(CACHE_DIR, "warm_bundle.bin")
+WARM_BUNDLE_MAGIC = b"MAPTWB01"
+WARM_BUNDLE_ALIGN = 64
+WARM_BUNDLE_PREAMBLE = struct.Struct("<8sQQ")
+SYNONYM_SEPARATOR = "\x1f"
+STDERR_TAIL_CHARS = 300
 STREAM_THRESHOLD_MB = 100  # files larger than this prefer streaming XML parsing
-PER_ONTOLOGY_TIMEOUT_SEC = 120  # subprocess hard-kill if a single build exceeds this
+PER_ONTOLOGY_TIMEOUT_SEC = 120  # minimum per-build timeout (subprocess hard-kill)
+MAX_TIMEOUT_SEC = 6 * 3600
+# Seconds of build time allowed per MB of (uncompressed) source, by primary
+# extractor. The scaled timeout is PER_ONTOLOGY_TIMEOUT_SEC + size_mb * rate.
+TIMEOUT_SEC_PER_MB = {"owlready": 6.0, "stream": 1.5}
+MEMORY_LIMIT_ENV = "MAPTOLOGY_BUILD_MEMORY_MB"  # worker address-space limit (0 = none)
+# Default limit, as a multiple of physical memory: RLIMIT_AS counts virtual
+# memory, which allocator and thread-pool reservations inflate well beyond
+# what is resident, so only a worker that keeps growing hits it.
+MEMORY_LIMIT_RAM_MULTIPLE = 2
+CURRENT_FILE = "CURRENT"  # per-ontology pointer to the published generation
+GENERATION_PREFIX = "gen-"
+STAGING_PREFIX = ".staging-"
+KEEP_GENERATIONS = 2  # the published generation + the previous one
+MANIFEST_SUFFIX = "_manifest.json"
+BUILD_OPTIONS_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "build_options.json")
+HASHING_N_FEATURES = 2 ** 20  # buckets for the hashing vectorizer mode
+HASHING_THRESHOLD_TERMS = 500000  # above this many terms, use hashing by default
+MATRIX_DTYPE = np.float32
+FTS_SUFFIX = "_terms.sqlite"
+HIERARCHY_SUFFIX = "_hierarchy.npz"
+DELTA_SUFFIX = "_delta.json"
+LSA_MIN_DF = 2  # features in fewer terms than this carry no co-occurrence signal
+LSA_MAX_FEATURES = 100000  # most frequent features kept for the SVD (bounds components)
+HASH_CHUNK = 1024 * 1024
+STREAM_READ_CHUNK = 1024 * 1024  # bytes fed to the streaming XML parser at a time
+# Used to estimate the uncompressed size of a compressed source whose size is
+# not recorded in the file (typical OWL compression ratio).
+COMPRESSED_SIZE_FACTOR = 8
+# Loaded size of the terms / vectorizer files relative to their size on disk,
+# for catalog estimates of caches built before memory_bytes was measured.
+RESIDENT_SIZE_FACTOR = 5
 
 CLASS_TAG_OWL = "{http://www.w3.org/2002/07/owl#}Class"
 ABOUT_ATTR = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about"
+SUBCLASS_TAG = "{http://www.w3.org/2000/01/rdf-schema#}subClassOf"
+RESOURCE_ATTR = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}resource"
 
 # Property local names (namespace-agnostic match)
 LABEL_LN = "label"
@@ -63,9 +154,45 @@ SYN_LN = {
     "P90",
 }
 
+# Turtle / N-Triples streaming
+RDF_TYPE_IRI = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+RDFS_SUBCLASS_OF_IRI = "http://www.w3.org/2000/01/rdf-schema#subClassOf"
+OWL_CLASS_IRI = "http://www.w3.org/2002/07/owl#Class"
+TTL_READ_CHUNK = 1024 * 1024  # characters read per refill of the tokenizer buffer
 
-def is_cache_built(acronym):
+
+def current_generation(acronym):
+    """Generation number currently published for an ontology, 0 for a cache in
+    the pre-generation layout, or None if nothing is published."""
+    folder = os.path.join(CACHE_DIR, acronym)
+    try:
+        with open(os.path.join(folder, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(os.path.join(folder, acronym + "_tfidf_matrix.npz")):
+        return 0
+    return None
+
+
+def generation_dir(acronym, generation):
     folder = os.path.join(CACHE_DIR, acronym)
+    if generation == 0:
+        return folder
+    return os.path.join(folder, GENERATION_PREFIX + str(generation).zfill(6))
+
+
+def current_cache_dir(acronym):
+    generation = current_generation(acronym)
+    if generation is None:
+        return None
+    return generation_dir(acronym, generation)
+
+
+def is_cache_built(acronym):
+    folder = current_cache_dir(acronym)
+    if folder is None:
+        return False
     return (
         os.path.exists(os.path.join(folder, acronym + "_tfidf_matrix.npz"))
         and os.path.exists(os.path.join(folder, acronym + "_vectorizer.pkl"))
@@ -73,10 +200,82 @@ def is_cache_built(acronym):
     )
 
 
+def _fsync_dir_files(folder):
+    for fname in os.listdir(folder):
+        with open(os.path.join(folder, fname), "rb") as f:
+            os.fsync(f.fileno())
+
+
+def publish_generation(acronym, staging):
+    """Atomically publish a fully-written staging directory as the next
+    generation of an ontology's cache. Returns the new generation number."""
+    _fsync_dir_files(staging)
+    generation = (current_generation(acronym) or 0) + 1
+    while os.path.exists(generation_dir(acronym, generation)):
+        generation += 1
+    target = generation_dir(acronym, generation)
+    os.rename(staging, target)
+
+    folder = os.path.join(CACHE_DIR, acronym)
+    tmp_pointer = os.path.join(folder, CURRENT_FILE + ".tmp-" + str(os.getpid()))
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(str(generation) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, os.path.join(folder, CURRENT_FILE))
+
+    prune_generations(acronym, generation)
+    return generation
+
+
+def prune_generations(acronym, current):
+    """Remove generations older than the newest KEEP_GENERATIONS. A server
+    still holding an old generation keeps its data in memory, so deleting the
+    files does not affect it."""
+    folder = os.path.join(CACHE_DIR, acronym)
+    keep_from = current - KEEP_GENERATIONS + 1
+    for name in os.listdir(folder):
+        if not name.startswith(GENERATION_PREFIX):
+            continue
+        try:
+            generation = int(name[len(GENERATION_PREFIX):])
+        except ValueError:
+            continue
+        if generation < keep_from:
+            _remove_tree(os.path.join(folder, name))
+    if keep_from > 0:
+        # Pre-generation layout files (generation 0) sit directly in the folder.
+        for name in os.listdir(folder):
+            path = os.path.join(folder, name)
+            if name.startswith(acronym + "_") and os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def _remove_tree(path):
+    for fname in os.listdir(path):
+        try:
+            os.remove(os.path.join(path, fname))
+        except OSError:
+            pass
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass
+
+
 def localname(tag):
     return tag.rsplit("}", 1)[-1] if "}" in tag else tag
 
 
+def iri_localname(iri):
+    if "#" in iri:
+        return iri.rsplit("#", 1)[-1]
+    return iri.rsplit("/", 1)[-1]
+
+
 def label_from_iri(iri):
     if "#" in iri:
         frag = iri.split("#")[-1]
@@ -85,83 +284,729 @@ def label_from_iri(iri):
     return frag.replace("_", " ")
 
 
+def is_compressed_source(owl_file):
+    return owl_file.endswith((".gz", ".zst"))
+
+
+def open_owl_source(owl_file):
+    """Open an ontology source for binary reading. .gz and .zst files are
+    decompressed on the fly, so sources can be stored compressed."""
+    if owl_file.endswith(".gz"):
+        return gzip.open(owl_file, "rb")
+    if owl_file.endswith(".zst"):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("the zstandard package is required to read " + owl_file)
+        return zstandard.ZstdDecompressor().stream_reader(open(owl_file, "rb"), closefd=True)
+    return open(owl_file, "rb")
+
+
+def source_size_mb(owl_file):
+    """Uncompressed size of a source in MB (exact for plain files; read from
+    the gzip trailer / zstd frame header when possible, else estimated)."""
+    size = os.path.getsize(owl_file)
+    try:
+        if owl_file.endswith(".gz"):
+            with open(owl_file, "rb") as f:
+                f.seek(-4, os.SEEK_END)
+                isize = int.from_bytes(f.read(4), "little")
+            # ISIZE is the length mod 2**32; smaller than the file means it wrapped.
+            if isize >= size:
+                return isize / 1024.0 / 1024.0
+            return size * COMPRESSED_SIZE_FACTOR / 1024.0 / 1024.0
+        if owl_file.endswith(".zst"):
+            content_size = -1
+            if ZSTD_AVAILABLE:
+                with open(owl_file, "rb") as f:
+                    content_size = zstandard.frame_content_size(f.read(18))
+            if content_size > 0:
+                return content_size / 1024.0 / 1024.0
+            return size * COMPRESSED_SIZE_FACTOR / 1024.0 / 1024.0
+    except Exception:  # unreadable trailer / malformed frame header
+        return size * COMPRESSED_SIZE_FACTOR / 1024.0 / 1024.0
+    return size / 1024.0 / 1024.0
+
+
+def _read_head(owl_file, n=4096):
+    """First n (decompressed) bytes of a source, or None if unreadable."""
+    try:
+        with open_owl_source(owl_file) as f:
+            head = b""
+            while len(head) < n:
+                chunk = f.read(n - len(head))
+                if not chunk:
+                    break
+                head += chunk
+            return head
+    except (OSError, EOFError, RuntimeError):
+        return None
+
+
 def looks_like_rdf_xml(owl_file):
     """True only for RDF/XML (the streaming parser's supported format).
     OWL/XML files (root <Ontology>, uses <Declaration>/<AnnotationAssertion>)
-    are NOT supported by streaming and must go through owlready2."""
-    try:
-        with open(owl_file, "rb") as f:
-            head = f.read(4096)
-    except OSError:
+    are NOT RDF/XML; they are streamed by extract_terms_owl_xml instead."""
+    head = _read_head(owl_file)
+    if head is None:
         return False
     head_lower = head.lower()
     # RDF/XML marker: the <rdf:RDF root element appears near the top.
     return b"<rdf:rdf" in head_lower
 
 
-def extract_terms_streaming(owl_file):
-    terms_by_iri = {}
-    deprecated_count = 0
-    n_classes = 0
+# First statement of a Turtle / N-Triples document: a directive, or a subject
+# (IRI, prefixed name or blank node) followed by a predicate.
+_TTL_HEAD_RE = re.compile(
+    rb"(?:@prefix|@base|prefix\s|base\s"
+    rb"|<[^<>\s]*>\s+(?:<|a\s|_:|[A-Za-z][\w.-]*:)"
+    rb"|_:\S+\s+(?:<|a\s|[A-Za-z][\w.-]*:)"
+    rb"|[A-Za-z][\w.-]*:\S*\s+(?:<|a\s|[A-Za-z][\w.-]*:))",
+    re.IGNORECASE,
+)
 
-    context = ET.iterparse(owl_file, events=("start", "end"))
-    _, root = next(context)
 
-    for event, elem in context:
-        if event != "end" or elem.tag != CLASS_TAG_OWL:
+def looks_like_turtle(owl_file):
+    """True for Turtle and N-Triples (N-Triples is a subset of Turtle), the
+    formats the streaming Turtle extractor supports. XML of any kind is
+    rejected first."""
+    head = _read_head(owl_file)
+    if head is None:
+        return False
+    head_lower = head.lower()
+    if b"<?xml" in head_lower or b"<rdf:rdf" in head_lower or b"<ontology" in head_lower:
+        return False
+    if head.startswith(b"\xef\xbb\xbf"):
+        head = head[3:]
+    # Skip leading blank and comment lines.
+    for line in head.splitlines():
+        line = line.strip()
+        if not line or line.startswith(b"#"):
             continue
+        return _TTL_HEAD_RE.match(line) is not None
+    return False
+
+
+# ============================================================
+# Streaming RDF/XML
+# ============================================================
+#
+# Only two things matter in an RDF/XML file: owl:Class elements with an
+# rdf:about, and the text of their direct annotation children. Both parsers
+# below act on nothing else:
+#   - lxml (when installed): end events filtered to owl:Class in C; each class
+#     and every sibling before it are deleted as soon as it is read, so the
+#     tree never grows.
+#   - xml.etree fallback: a parser target that builds no tree at all and only
+#     collects text while inside an annotation child of an open owl:Class.
+# Annotation tags are classified once per distinct full tag ({ns}local) rather
+# than split and compared for every element.
+
+def _annotation_kind(tag, kinds):
+    """Which annotation a full element tag carries ("label", "def", "alt",
+    "syn", "dep") or None. Memoized in kinds."""
+    kind = kinds.get(tag, 0)
+    if kind == 0:
+        ln = localname(tag)
+        if ln == LABEL_LN:
+            kind = "label"
+        elif ln in DEF_PRIMARY_LN:
+            kind = "def"
+        elif ln in DEF_FALLBACK_LN:
+            kind = "alt"
+        elif ln in SYN_LN:
+            kind = "syn"
+        elif ln == DEPRECATED_LN:
+            kind = "dep"
+        else:
+            kind = None
+        kinds[tag] = kind
+    return kind
+
+
+def _new_class_frame(about):
+    # [about, label, def_primary, def_alt, synonyms, is_dep, parents]
+    return [about, None, None, None, [], False, []]
+
+
+def _add_parent(parents, iri):
+    if iri and iri not in parents:
+        parents.append(iri)
+
+
+def _fold_class_text(frame, kind, text):
+    text = text.strip()
+    if not text:
+        return
+    if kind == "label":
+        if frame[1] is None:
+            frame[1] = text
+    elif kind == "def":
+        if frame[2] is None:
+            frame[2] = text
+    elif kind == "alt":
+        if frame[3] is None:
+            frame[3] = text
+    elif kind == "syn":
+        if text not in frame[4]:
+            frame[4].append(text)
+    elif text.lower() == "true":
+        frame[5] = True
+
+
+def _store_class_frame(frame, terms_by_iri):
+    """Store a finished class; returns True if it was deprecated (skipped)."""
+    about, label, def_primary, def_alt, synonyms, is_dep, parents = frame
+    if is_dep:
+        return True
+    if label is None:
+        label = label_from_iri(about)
+    terms_by_iri[about] = {
+        "label": str(label),
+        "iri": str(about),
+        "synonyms": synonyms,
+        "definition": def_primary or def_alt or "No definition available",
+        "parents": parents,
+    }
+    return False
+
+
+class _RdfXmlClassTarget:
+    """xml.etree parser target for RDF/XML that builds no tree. It tracks the
+    open owl:Class elements and collects the text of their direct annotation
+    children (the text before the child's first sub-element, like .text) and
+    their named superclasses (rdfs:subClassOf rdf:resource=...)."""
+
+    def __init__(self):
+        self.terms_by_iri = {}
+        self.deprecated_count = 0
+        self.kinds = {}
+        self.classes = []  # (frame, depth) of the open owl:Class elements
+        self.depth = 0
+        self.text_kind = None
+        self.text_depth = -1
+        self.text = []
+        self.collecting = False
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        self.collecting = False
+        if tag == CLASS_TAG_OWL:
+            self.classes.append((_new_class_frame(attrib.get(ABOUT_ATTR)), self.depth))
+        elif self.classes and self.depth == self.classes[-1][1] + 1:
+            if tag == SUBCLASS_TAG:
+                _add_parent(self.classes[-1][0][6], attrib.get(RESOURCE_ATTR))
+                return
+            kind = _annotation_kind(tag, self.kinds)
+            if kind is not None:
+                self.text_kind = kind
+                self.text_depth = self.depth
+                self.text = []
+                self.collecting = True
+
+    def data(self, data):
+        if self.collecting:
+            self.text.append(data)
+
+    def end(self, tag):
+        depth = self.depth
+        self.depth -= 1
+        if self.text_kind is not None and depth == self.text_depth:
+            self.collecting = False
+            _fold_class_text(self.classes[-1][0], self.text_kind, "".join(self.text))
+            self.text_kind = None
+        elif tag == CLASS_TAG_OWL and self.classes and self.classes[-1][1] == depth:
+            frame = self.classes.pop()[0]
+            if frame[0] is not None and _store_class_frame(frame, self.terms_by_iri):
+                self.deprecated_count += 1
+
+    def close(self):
+        return list(self.terms_by_iri.values()), self.deprecated_count
+
+
+def _extract_rdf_xml_etree(owl_file):
+    target = _RdfXmlClassTarget()
+    parser = ET.XMLParser(target=target)
+    with open_owl_source(owl_file) as fh:
+        while True:
+            chunk = fh.read(STREAM_READ_CHUNK)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    return parser.close()
 
-        about = elem.get(ABOUT_ATTR)
-        if about is None:
-            elem.clear()
-            continue
 
-        n_classes += 1
+def _extract_rdf_xml_lxml(owl_file):
+    terms_by_iri = {}
+    deprecated_count = 0
+    kinds = {}
+    with open_owl_source(owl_file) as fh:
+        context = LXML_ETREE.iterparse(fh, events=("end",), tag=CLASS_TAG_OWL,
+                                       huge_tree=True)
+        for _, elem in context:
+            about = elem.get(ABOUT_ATTR)
+            if about is not None:
+                frame = _new_class_frame(about)
+                for child in elem:
+                    tag = child.tag
+                    if not isinstance(tag, str):
+                        continue  # comments / processing instructions
+                    if tag == SUBCLASS_TAG:
+                        _add_parent(frame[6], child.get(RESOURCE_ATTR))
+                        continue
+                    kind = _annotation_kind(tag, kinds)
+                    if kind is not None and child.text:
+                        _fold_class_text(frame, kind, child.text)
+                if _store_class_frame(frame, terms_by_iri):
+                    deprecated_count += 1
+            # Drop this class and everything read before it at this level.
+            elem.clear(keep_tail=True)
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    return list(terms_by_iri.values()), deprecated_count
 
-        label = None
-        def_primary = None
-        def_alt = None
-        synonyms = []
-        is_dep = False
 
-        for child in elem:
-            ln = localname(child.tag)
-            text = (child.text or "").strip()
-            if not text:
-                continue
-            if ln == LABEL_LN and label is None:
-                label = text
-            elif ln in DEF_PRIMARY_LN and def_primary is None:
-                def_primary = text
-            elif ln in DEF_FALLBACK_LN and def_alt is None:
-                def_alt = text
-            elif ln in SYN_LN:
-                if text not in synonyms:
-                    synonyms.append(text)
-            elif ln == DEPRECATED_LN and text.lower() == "true":
-                is_dep = True
-
-        elem.clear()
+def extract_terms_streaming(owl_file):
+    """Streaming extractor for RDF/XML. Memory stays flat regardless of file
+    size (only the extracted term records grow)."""
+    if LXML_AVAILABLE:
+        return _extract_rdf_xml_lxml(owl_file)
+    return _extract_rdf_xml_etree(owl_file)
+
+
+# ============================================================
+# Streaming Turtle / N-Triples
+# ============================================================
+#
+# rdflib materializes the whole Graph before we can read a single label, which
+# is what makes large Turtle builds time out or run out of memory. The reader
+# below tokenizes the file a chunk at a time, parses one statement at a time and
+# hands each (subject, predicate, object) triple to the extractor, which keeps
+# only the per-subject label / definition / synonym / deprecated state. Triples
+# about blank nodes (restrictions, axioms) are parsed but never stored.
+
+_TTL_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<iri><(?:[^<>"{}|^`\\\s]|\\.)*>)
+  | (?P<lstr>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | (?P<str>"(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*')
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<dtype>\^\^)
+  | (?P<punct>[.;,\[\]()])
+  | (?P<name>(?:[^\s<>"'{}|^`\\;,\[\]()\#]|\\.)+)
+''', re.VERBOSE | re.DOTALL)
+
+_TTL_ESCAPE_RE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))", re.DOTALL)
+_TTL_ECHARS = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f"}
+_TTL_NUMBER_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$")
+
+
+def _unescape_turtle(text):
+    if "\\" not in text:
+        return text
+
+    def repl(m):
+        code = m.group(1) or m.group(2)
+        if code:
+            return chr(int(code, 16))
+        return _TTL_ECHARS.get(m.group(3), m.group(3))
+
+    return _TTL_ESCAPE_RE.sub(repl, text)
+
+
+def _iter_turtle_tokens(fh):
+    """Yield (kind, text) tokens, reading fh in TTL_READ_CHUNK pieces.
+
+    A token that touches the end of the buffer may be incomplete, so the buffer
+    is refilled and the match retried before the token is emitted."""
+    buf = ""
+    pos = 0
+    eof = False
+    while True:
+        m = _TTL_TOKEN_RE.match(buf, pos)
+        incomplete = m is None or m.end() == len(buf)
+        if not incomplete and m.lastgroup == "str" and m.end() - m.start() == 2:
+            # "" / '' may be the start of a long string split across chunks.
+            incomplete = buf[m.end()] == buf[m.start()]
+        if incomplete and not eof:
+            chunk = fh.read(TTL_READ_CHUNK)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        if m is None:
+            if pos >= len(buf):
+                return
+            raise ValueError("Turtle syntax error near: " + buf[pos:pos + 60])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        text = m.group(kind)
+        if kind == "name" and text.endswith("."):
+            # A prefixed name cannot end with '.', so it is the statement end.
+            stripped = text.rstrip(".")
+            if stripped:
+                yield "name", stripped
+            for _ in range(len(text) - len(stripped)):
+                yield "punct", "."
+            continue
+        yield kind, text
+
+
+def _iter_turtle_triples(fh):
+    """Yield (subject, predicate, object_kind, object) for every triple whose
+    subject is a named IRI. object_kind is "iri", "literal" or "bnode".
+
+    Handles @prefix/@base and SPARQL-style PREFIX/BASE, predicate lists (;),
+    object lists (,), 'a', literals with language tags or datatypes, numbers,
+    booleans, blank node property lists ([ ... ]) and collections (( ... ))."""
+    tokens = _iter_turtle_tokens(fh)
+    pushed = []
+    prefixes = {}
+    base = [""]
+
+    def next_token():
+        if pushed:
+            return pushed.pop()
+        return next(tokens, (None, None))
+
+    def expect(value):
+        kind, text = next_token()
+        if text != value:
+            raise ValueError("expected '" + value + "' but found " + repr(text))
+
+    def resolve(raw):
+        iri = _unescape_turtle(raw[1:-1])
+        if base[0] and ":" not in iri.split("/", 1)[0]:
+            iri = urljoin(base[0], iri)
+        return iri
+
+    def expand(name):
+        if name == "a":
+            return RDF_TYPE_IRI
+        prefix, sep, local = name.partition(":")
+        if not sep:
+            raise ValueError("unexpected token " + repr(name))
+        if prefix not in prefixes:
+            raise ValueError("undefined prefix " + repr(prefix))
+        if "\\" in local:
+            local = re.sub(r"\\(.)", r"\1", local)
+        return prefixes[prefix] + local
+
+    def parse_object(subject, predicate, out):
+        kind, text = next_token()
+        if kind == "iri":
+            obj = ("iri", resolve(text))
+        elif kind in ("str", "lstr"):
+            quote = 3 if kind == "lstr" else 1
+            obj = ("literal", _unescape_turtle(text[quote:-quote]))
+            kind2, text2 = next_token()
+            if kind2 == "dtype":
+                next_token()  # datatype IRI / prefixed name - not needed
+            elif kind2 != "lang":
+                pushed.append((kind2, text2))
+        elif kind == "punct" and text == "[":
+            parse_predicate_objects(None, out)
+            expect("]")
+            obj = ("bnode", None)
+        elif kind == "punct" and text == "(":
+            while True:
+                kind2, text2 = next_token()
+                if text2 == ")":
+                    break
+                pushed.append((kind2, text2))
+                parse_object(None, None, out)
+            obj = ("bnode", None)
+        elif kind == "name":
+            if text.startswith("_:"):
+                obj = ("bnode", None)
+            elif text in ("true", "false") or _TTL_NUMBER_RE.match(text):
+                obj = ("literal", text)
+            else:
+                obj = ("iri", expand(text))
+        else:
+            raise ValueError("unexpected object token " + repr(text))
+        if subject is not None:
+            out.append((subject, predicate, obj[0], obj[1]))
+
+    def parse_predicate_objects(subject, out):
+        while True:
+            kind, text = next_token()
+            if kind == "punct" and text in ("]", "."):
+                pushed.append((kind, text))
+                return
+            if kind == "iri":
+                predicate = resolve(text)
+            elif kind == "name":
+                predicate = expand(text)
+            else:
+                raise ValueError("unexpected predicate token " + repr(text))
+            parse_object(subject, predicate, out)
+            kind, text = next_token()
+            while text == ",":
+                parse_object(subject, predicate, out)
+                kind, text = next_token()
+            if text != ";":
+                pushed.append((kind, text))
+                return
+            # Repeated / trailing ';' are allowed.
+            kind, text = next_token()
+            while text == ";":
+                kind, text = next_token()
+            pushed.append((kind, text))
+
+    out = []
+    while True:
+        kind, text = next_token()
+        if kind is None:
+            return
+        directive = text.lower() if kind in ("lang", "name") else ""
+        if directive in ("@prefix", "prefix"):
+            _k, ns = next_token()
+            _k, iri = next_token()
+            prefixes[ns[:-1]] = resolve(iri)
+            if directive == "@prefix":
+                expect(".")
+            continue
+        if directive in ("@base", "base"):
+            _k, iri = next_token()
+            base[0] = resolve(iri)
+            if directive == "@base":
+                expect(".")
+            continue
 
+        if kind == "iri":
+            subject = resolve(text)
+        elif kind == "name" and not text.startswith("_:"):
+            subject = expand(text)
+        elif kind == "name":
+            subject = None
+        elif kind == "punct" and text == "[":
+            parse_predicate_objects(None, out)
+            expect("]")
+            subject = None
+        elif kind == "punct" and text == "(":
+            pushed.append((kind, text))
+            parse_object(None, None, out)
+            subject = None
+        else:
+            raise ValueError("unexpected subject token " + repr(text))
+
+        parse_predicate_objects(subject, out)
+        expect(".")
+        for triple in out:
+            yield triple
+        del out[:]
+
+
+def _term_state(state, iri):
+    entry = state.get(iri)
+    if entry is None:
+        # [is_class, label, def_primary, def_alt, synonyms, is_dep, parents]
+        entry = state[iri] = [False, None, None, None, [], False, []]
+    return entry
+
+
+def _fold_annotation(state, iri, pn, value):
+    """Fold one literal annotation (property local name pn) into the
+    per-subject state. Annotations we don't index are dropped immediately."""
+    if pn == DEPRECATED_LN:
+        if value.strip().lower() == "true":
+            _term_state(state, iri)[5] = True
+        return
+    if pn != LABEL_LN and pn not in DEF_PRIMARY_LN \
+            and pn not in DEF_FALLBACK_LN and pn not in SYN_LN:
+        return
+    v = value.strip()
+    if not v:
+        return
+    entry = _term_state(state, iri)
+    if pn == LABEL_LN:
+        if entry[1] is None:
+            entry[1] = v
+    elif pn in DEF_PRIMARY_LN:
+        if entry[2] is None:
+            entry[2] = v
+    elif pn in DEF_FALLBACK_LN:
+        if entry[3] is None:
+            entry[3] = v
+    elif v not in entry[4]:
+        entry[4].append(v)
+
+
+def _terms_from_state(state):
+    """Turn the per-subject state into (terms, deprecated_count), keeping
+    classes only."""
+    terms = []
+    deprecated_count = 0
+    for iri, (is_class, label, def_primary, def_alt, synonyms, is_dep, parents) in state.items():
+        if not is_class:
+            continue
         if is_dep:
             deprecated_count += 1
             continue
-
         if label is None:
-            label = label_from_iri(about)
-
-        definition = def_primary or def_alt or "No definition available"
-        terms_by_iri[about] = {
+            label = label_from_iri(iri)
+        terms.append({
             "label": str(label),
-            "iri": str(about),
+            "iri": iri,
             "synonyms": synonyms,
-            "definition": definition,
-        }
+            "definition": def_primary or def_alt or "No definition available",
+            "parents": parents,
+        })
+    return terms, deprecated_count
+
 
-        if n_classes % 5000 == 0:
+def extract_terms_turtle_streaming(owl_file):
+    """Streaming extractor for Turtle and N-Triples files.
+
+    Produces the same term records as extract_terms_rdflib (named owl:Class
+    subjects only) without building an in-memory graph. Memory is bounded by
+    the number of annotated subjects, not by the number of triples."""
+    state = {}
+    with io.TextIOWrapper(open_owl_source(owl_file), encoding="utf-8", errors="replace") as fh:
+        for subject, predicate, kind, obj in _iter_turtle_triples(fh):
+            if predicate == RDF_TYPE_IRI:
+                if kind == "iri" and obj == OWL_CLASS_IRI:
+                    _term_state(state, subject)[0] = True
+            elif predicate == RDFS_SUBCLASS_OF_IRI:
+                if kind == "iri":
+                    _add_parent(_term_state(state, subject)[6], obj)
+            elif kind == "literal":
+                _fold_annotation(state, subject, iri_localname(predicate), obj)
+    return _terms_from_state(state)
+
+
+# ============================================================
+# Streaming OWL/XML
+# ============================================================
+#
+# OWL/XML states everything as top-level axioms under <Ontology>:
+#   <Declaration><Class IRI="..."/></Declaration>
+#   <AnnotationAssertion>
+#       <AnnotationProperty abbreviatedIRI="rdfs:label"/>
+#       <IRI>...</IRI>                      (or <AbbreviatedIRI>)
+#       <Literal xml:lang="en">...</Literal>
+#   </AnnotationAssertion>
+#   <SubClassOf><Class IRI="child"/><Class IRI="parent"/></SubClassOf>
+# Each axiom is folded into the per-IRI state as soon as it ends and then
+# dropped from the tree, so memory stays bounded by the annotated IRIs.
+
+def _owl_xml_tag(name):
+    return "{http://www.w3.org/2002/07/owl#}" + name
+
+
+OWLXML_PREFIX = _owl_xml_tag("Prefix")
+OWLXML_DECLARATION = _owl_xml_tag("Declaration")
+OWLXML_ANNOTATION_ASSERTION = _owl_xml_tag("AnnotationAssertion")
+OWLXML_SUB_CLASS_OF = _owl_xml_tag("SubClassOf")
+OWLXML_ANNOTATION = _owl_xml_tag("Annotation")
+OWLXML_CLASS = _owl_xml_tag("Class")
+OWLXML_IRI = _owl_xml_tag("IRI")
+OWLXML_ABBREVIATED_IRI = _owl_xml_tag("AbbreviatedIRI")
+OWLXML_LITERAL = _owl_xml_tag("Literal")
+XML_BASE_ATTR = "{http://www.w3.org/XML/1998/namespace}base"
+
+# Prefixes every OWL/XML document may use without declaring them.
+OWLXML_STANDARD_PREFIXES = {
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": "http://www.w3.org/2001/XMLSchema#",
+    "xml": "http://www.w3.org/XML/1998/namespace",
+}
+
+_OWLXML_ROOT_RE = re.compile(rb"<(?:[\w.-]+:)?ontology[\s>]", re.IGNORECASE)
+
+
+def looks_like_owl_xml(owl_file):
+    """True for the OWL/XML serialization (root <Ontology> in the OWL
+    namespace), the format extract_terms_owl_xml supports."""
+    head = _read_head(owl_file)
+    if head is None:
+        return False
+    head_lower = head.lower()
+    if b"<rdf:rdf" in head_lower:
+        return False
+    return (_OWLXML_ROOT_RE.search(head) is not None
+            and b"http://www.w3.org/2002/07/owl#" in head)
+
+
+def extract_terms_owl_xml(owl_file):
+    """Streaming extractor for OWL/XML files (Declaration, AnnotationAssertion
+    and SubClassOf between named classes).
+
+    Produces the same term records as the other extractors for every declared
+    class. Deprecation is read from owl:deprecated annotation assertions."""
+    state = {}
+    prefixes = dict(OWLXML_STANDARD_PREFIXES)
+    base = ""
+
+    def expand(abbreviated):
+        prefix, _, local = abbreviated.partition(":")
+        if prefix not in prefixes:
+            raise ValueError("undefined OWL/XML prefix " + repr(prefix))
+        return prefixes[prefix] + local
+
+    def entity_iri(elem):
+        # Entity elements carry the IRI as an attribute (<Class IRI="..."/>);
+        # annotation subjects carry it as text (<IRI>...</IRI>).
+        iri = elem.get("IRI")
+        if iri is None and elem.tag == OWLXML_IRI:
+            iri = (elem.text or "").strip()
+        if iri is not None:
+            return urljoin(base, iri) if base else iri
+        abbreviated = elem.get("abbreviatedIRI")
+        if abbreviated is None and elem.tag == OWLXML_ABBREVIATED_IRI:
+            abbreviated = (elem.text or "").strip()
+        if abbreviated is not None:
+            return expand(abbreviated)
+        return None
+
+    with open_owl_source(owl_file) as fh:
+        context = ET.iterparse(fh, events=("start", "end"))
+        _, root = next(context)
+        base = root.get(XML_BASE_ATTR) or root.get("ontologyIRI") or ""
+        depth = 1
+
+        for event, elem in context:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue  # only whole top-level axioms are handled
+
+            tag = elem.tag
+            if tag == OWLXML_PREFIX:
+                prefixes[elem.get("name", "")] = elem.get("IRI", "")
+            elif tag == OWLXML_DECLARATION:
+                for entity in elem:
+                    if entity.tag == OWLXML_CLASS:
+                        iri = entity_iri(entity)
+                        if iri:
+                            _term_state(state, iri)[0] = True
+            elif tag == OWLXML_ANNOTATION_ASSERTION:
+                # Optional axiom <Annotation>s come first; then property, subject, value.
+                parts = [child for child in elem if child.tag != OWLXML_ANNOTATION]
+                if len(parts) == 3 and parts[2].tag == OWLXML_LITERAL:
+                    prop_iri = entity_iri(parts[0])
+                    subject = entity_iri(parts[1])
+                    if prop_iri and subject:
+                        _fold_annotation(state, subject, iri_localname(prop_iri),
+                                         parts[2].text or "")
+            elif tag == OWLXML_SUB_CLASS_OF:
+                # Named superclasses only; class expressions are skipped.
+                parts = [child for child in elem if child.tag != OWLXML_ANNOTATION]
+                if len(parts) == 2 and parts[0].tag == OWLXML_CLASS and parts[1].tag == OWLXML_CLASS:
+                    subject = entity_iri(parts[0])
+                    if subject:
+                        _add_parent(_term_state(state, subject)[6], entity_iri(parts[1]))
+
+            # The axiom has been folded into state; drop it from the tree.
             root.clear()
 
-    return list(terms_by_iri.values()), deprecated_count
+    return _terms_from_state(state)
 
 
 def extract_terms_rdflib(owl_file):
@@ -170,8 +1015,18 @@ def extract_terms_rdflib(owl_file):
     Turtle (very common in OBO-style ontologies)."""
     from rdflib import Graph, RDF, RDFS, OWL, URIRef, Literal
 
+    # rdflib cannot read .gz/.zst itself (nor guess the format from the file
+    # name), so compressed sources are decompressed into memory first and
+    # parsed with explicit formats only.
+    source = {"source": owl_file}
+    if is_compressed_source(owl_file):
+        with open_owl_source(owl_file) as fh:
+            source = {"data": fh.read()}
+
     g = Graph()
     try:
+        if "data" in source:
+            raise ValueError("format auto-detection needs a file name")
         g.parse(owl_file)
     except Exception:
         # rdflib auto-detect failed; try common serializations explicitly.
@@ -179,7 +1034,7 @@ def extract_terms_rdflib(owl_file):
         for fmt in ("turtle", "xml", "nt", "n3", "json-ld"):
             try:
                 g = Graph()
-                g.parse(owl_file, format=fmt)
+                g.parse(format=fmt, **source)
                 last_err = None
                 break
             except Exception as e:
@@ -221,9 +1076,14 @@ def extract_terms_rdflib(owl_file):
         def_primary = None
         def_alt = None
         synonyms = []
+        parents = []
         is_dep = False
 
         for p, o in g.predicate_objects(cls):
+            if p == RDFS.subClassOf:
+                if isinstance(o, URIRef):
+                    _add_parent(parents, str(o))
+                continue
             pn = local(p)
             if pn == "deprecated":
                 if isinstance(o, Literal) and str(o).lower() == "true":
@@ -255,6 +1115,7 @@ def extract_terms_rdflib(owl_file):
             "iri": iri,
             "synonyms": synonyms,
             "definition": definition,
+            "parents": parents,
         })
 
     return terms, deprecated_count
@@ -266,7 +1127,13 @@ def extract_terms_owlready(owl_file):
 
     world = World()
     try:
-        onto = world.get_ontology(owl_file).load()
+        if is_compressed_source(owl_file):
+            # owlready2 sniffs the format by seeking, so give it an in-memory copy.
+            with open_owl_source(owl_file) as fh:
+                fileobj = io.BytesIO(fh.read())
+            onto = world.get_ontology("file://" + os.path.abspath(owl_file)).load(fileobj=fileobj)
+        else:
+            onto = world.get_ontology(owl_file).load()
     except Exception:
         try:
             world.close()
@@ -322,11 +1189,22 @@ def extract_terms_owlready(owl_file):
                         definition = first
                         break
 
+            # Named superclasses (is_a also holds restrictions, which have no IRI)
+            parents = []
+            try:
+                for parent in cls.is_a:
+                    parent_iri = getattr(parent, "iri", None)
+                    if isinstance(parent_iri, str):
+                        _add_parent(parents, parent_iri)
+            except Exception:
+                pass
+
             terms.append({
                 "label": str(label),
                 "iri": str(cls.iri),
                 "synonyms": synonyms,
                 "definition": definition,
+                "parents": parents,
             })
     finally:
         try:
@@ -337,70 +1215,633 @@ def extract_terms_owlready(owl_file):
     return terms, deprecated_count
 
 
-def build_and_save(acronym, terms):
-    if not terms:
-        raise RuntimeError("0 terms extracted")
+def _maxrss_mb(maxrss):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return round(maxrss / 1024.0 / 1024.0, 1)
+    return round(maxrss / 1024.0, 1)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None if unknown."""
+    if not RESOURCE_AVAILABLE:
+        return None
+    return _maxrss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def file_sha256(path):
+    """Stream-hash a file (the bytes on disk, i.e. compressed sources are
+    hashed compressed)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _repo_relative(path):
+    """Store paths inside the repo relative to it, so a manifest stays valid
+    when the checkout moves."""
+    path = os.path.abspath(path)
+    if path.startswith(_REPO_ROOT + os.sep):
+        return os.path.relpath(path, _REPO_ROOT)
+    return path
+
+
+def write_manifest(acronym, folder, owl_file, n_terms, extra=None):
+    """Record what a generation was built from and checksums of its files.
+    `extra` entries (build options, statistics) are added at the top level."""
+    artifacts = {}
+    for fname in sorted(os.listdir(folder)):
+        path = os.path.join(folder, fname)
+        artifacts[fname] = {"sha256": file_sha256(path), "bytes": os.path.getsize(path)}
+    manifest = {
+        "acronym": acronym,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "n_terms": n_terms,
+        "source": _repo_relative(owl_file) if owl_file else None,
+        "source_sha256": file_sha256(owl_file) if owl_file else None,
+        "source_bytes": os.path.getsize(owl_file) if owl_file else None,
+        "artifacts": artifacts,
+    }
+    manifest.update(extra or {})
+    with open(os.path.join(folder, acronym + MANIFEST_SUFFIX), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
 
+
+def load_build_options(acronym):
+    """Build options for one ontology from BUILD_OPTIONS_FILE ("*" entry, then
+    the ontology's own entry on top). Missing or unreadable file -> {}."""
+    try:
+        with open(BUILD_OPTIONS_FILE, "r", encoding="utf-8") as f:
+            all_options = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    options = dict(all_options.get("*") or {})
+    options.update(all_options.get(acronym) or {})
+    return options
+
+
+def term_documents(terms):
+    """The text indexed for each term: label plus synonyms."""
     documents = []
     for t in terms:
         text = t["label"]
         if t["synonyms"]:
             text = text + " " + " ".join(t["synonyms"])
         documents.append(text)
-
-    vectorizer = TfidfVectorizer(
+    return documents
+
+
+def make_vectorizer(mode="tfidf", n_features=HASHING_N_FEATURES, dtype=MATRIX_DTYPE):
+    if mode == "hashing":
+        return make_pipeline(
+            HashingVectorizer(
+                analyzer="word",
+                ngram_range=(1, 2),
+                lowercase=True,
+                stop_words="english",
+                n_features=n_features,
+                alternate_sign=False,
+                norm=None,
+                dtype=dtype,
+            ),
+            TfidfTransformer(),
+        )
+    if mode != "tfidf":
+        raise ValueError("unknown vectorizer mode: " + str(mode))
+    return TfidfVectorizer(
         analyzer="word",
         ngram_range=(1, 2),
         lowercase=True,
         stop_words="english",
+        dtype=dtype,
     )
-    tfidf_matrix = vectorizer.fit_transform(documents)
 
-    folder = os.path.join(CACHE_DIR, acronym)
-    os.makedirs(folder, exist_ok=True)
-    sparse.save_npz(os.path.join(folder, acronym + "_tfidf_matrix.npz"), tfidf_matrix)
-    with open(os.path.join(folder, acronym + "_vectorizer.pkl"), "wb") as f:
+
+def compact_matrix(tfidf_matrix, dtype=MATRIX_DTYPE):
+    """CSR with `dtype` weights and int32 indices/indptr (when nnz and the
+    column count fit, which they do for any ontology)."""
+    matrix = tfidf_matrix.tocsr().astype(dtype, copy=False)
+    if matrix.nnz < 2 ** 31 and matrix.shape[1] < 2 ** 31:
+        matrix.indices = matrix.indices.astype(np.int32, copy=False)
+        matrix.indptr = matrix.indptr.astype(np.int32, copy=False)
+    return matrix
+
+
+def prune_matrix(tfidf_matrix, top_k=None, threshold=None):
+    """Static index pruning: keep each row's `top_k` largest weights and/or
+    the weights >= `threshold`. A row never loses its largest weight."""
+    matrix = tfidf_matrix.tocsr()
+    if not top_k and not threshold:
+        return matrix
+    n_rows = matrix.shape[0]
+    row_lengths = np.diff(matrix.indptr)
+    row_ids = np.repeat(np.arange(n_rows), row_lengths)
+
+    # Rank of every posting within its row, largest weight first.
+    order = np.lexsort((-matrix.data, row_ids))
+    rank = np.empty(matrix.nnz, dtype=np.int64)
+    rank[order] = np.arange(matrix.nnz) - np.repeat(matrix.indptr[:-1], row_lengths)
+
+    keep = np.ones(matrix.nnz, dtype=bool)
+    if top_k:
+        keep &= rank < int(top_k)
+    if threshold:
+        keep &= (matrix.data >= float(threshold)) | (rank == 0)
+
+    indptr = np.zeros(n_rows + 1, dtype=matrix.indptr.dtype)
+    np.cumsum(np.bincount(row_ids[keep], minlength=n_rows), out=indptr[1:])
+    return sparse.csr_matrix((matrix.data[keep], matrix.indices[keep], indptr),
+                             shape=matrix.shape)
+
+
+def write_fts_index(path, terms):
+    """Write the terms into a SQLite file with an FTS5 index over label,
+    synonyms and definition (see src/Maptology/fts_search.py)."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TABLE terms (row INTEGER PRIMARY KEY, iri TEXT, label TEXT,"
+                     " synonyms TEXT, definition TEXT)")
+        conn.executemany(
+            "INSERT INTO terms VALUES (?, ?, ?, ?, ?)",
+            ((i, t.get("iri"), t.get("label"), json.dumps(t.get("synonyms") or [], ensure_ascii=False),
+              t.get("definition")) for i, t in enumerate(terms)))
+        conn.execute("CREATE INDEX terms_iri ON terms(iri)")
+        conn.execute("CREATE VIRTUAL TABLE terms_fts USING fts5(label, synonyms, definition,"
+                     " content='terms', content_rowid='row',"
+                     " tokenize='unicode61 remove_diacritics 2')")
+        conn.execute("INSERT INTO terms_fts(terms_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO terms_fts(terms_fts) VALUES ('optimize')")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def fit_lsa(tfidf_matrix, dim, int8=False):
+    """Truncated SVD term embeddings of a TF-IDF matrix, as the arrays of an
+    <ACR>_lsa.npz (see src/Maptology/semantic.py), plus the explained
+    variance ratio. Rows are unit length; int8 rows come with a scale."""
+    matrix = tfidf_matrix.tocsr()
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    candidates = np.flatnonzero(df >= LSA_MIN_DF)
+    if len(candidates) > LSA_MAX_FEATURES:
+        candidates = candidates[np.argsort(-df[candidates], kind="stable")[:LSA_MAX_FEATURES]]
+    feature_index = np.sort(candidates).astype(np.int32)
+    dim = min(int(dim), len(feature_index) - 1, matrix.shape[0] - 1)
+    if dim < 1:
+        raise ValueError("too few terms or shared features for LSA")
+
+    selected = matrix[:, feature_index].astype(np.float32)
+    svd = TruncatedSVD(n_components=dim, algorithm="randomized", n_iter=5, random_state=0)
+    embeddings = svd.fit_transform(selected).astype(np.float32)
+    norms = np.linalg.norm(embeddings, axis=1)
+    norms[norms == 0] = 1.0
+    embeddings /= norms[:, None]
+
+    lsa = {"feature_index": feature_index,
+           "components": np.ascontiguousarray(svd.components_.T, dtype=np.float32)}
+    if int8:
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        lsa["embeddings"] = np.round(embeddings / scales[:, None]).astype(np.int8)
+        lsa["scales"] = scales.astype(np.float32)
+    else:
+        lsa["embeddings"] = embeddings
+    return lsa, float(svd.explained_variance_ratio_.sum())
+
+
+def build_hierarchy(terms):
+    """Parent links and ancestor closure of the terms, as the arrays of an
+    <ACR>_hierarchy.npz (see src/Maptology/hierarchy.py), or None if no term
+    has a parent among the terms (parents are read from the terms'
+    "parents" IRIs; parents that are not terms themselves are ignored).
+
+    Terms on a subclass cycle are equivalent, so each strongly connected
+    component is numbered as one block. A depth-first search over the
+    components from the roots numbers every row in postorder; a row's
+    descendants-or-self are then a few closed ranges of postorder numbers:
+    its DFS subtree plus the ranges of children reached through a second
+    parent, merged."""
+    row_of = {}
+    for i, t in enumerate(terms):
+        row_of.setdefault(t["iri"], i)
+    n = len(terms)
+    child_rows = []
+    parent_rows = []
+    for i, t in enumerate(terms):
+        for iri in t.get("parents") or ():
+            j = row_of.get(iri)
+            if j is not None and j != i:
+                child_rows.append(i)
+                parent_rows.append(j)
+    if not child_rows:
+        return None
+
+    up = sparse.csr_matrix((np.ones(len(child_rows), dtype=np.int8), (child_rows, parent_rows)),
+                           shape=(n, n))
+    up.sum_duplicates()
+    n_comp, comp = connected_components(up, directed=True, connection="strong")
+    size = np.bincount(comp, minlength=n_comp)
+    up_rows = np.repeat(np.arange(n), np.diff(up.indptr))
+    child_comp, parent_comp = comp[up_rows], comp[up.indices]
+    between = child_comp != parent_comp
+    comp_up = sparse.csr_matrix((np.ones(int(between.sum()), dtype=np.int8),
+                                 (child_comp[between], parent_comp[between])),
+                                shape=(n_comp, n_comp))
+    comp_up.sum_duplicates()
+    down = comp_up.T.tocsr()
+    child_indptr, child_indices = down.indptr, down.indices
+
+    # Iterative DFS over the components (a DAG). low[c] is the first number
+    # in c's DFS subtree; c's own rows get the size[c] numbers from first[c].
+    first = np.zeros(n_comp, dtype=np.int64)
+    low = np.zeros(n_comp, dtype=np.int64)
+    visited = np.zeros(n_comp, dtype=bool)
+    finished = []
+    counter = 0
+    roots = np.flatnonzero(np.diff(comp_up.indptr) == 0)
+    for start in np.concatenate([roots, np.arange(n_comp)]):
+        if visited[start]:
+            continue
+        visited[start] = True
+        low[start] = counter
+        stack = [(start, child_indptr[start])]
+        while stack:
+            v, k = stack[-1]
+            if k < child_indptr[v + 1]:
+                stack[-1] = (v, k + 1)
+                c = child_indices[k]
+                if not visited[c]:
+                    visited[c] = True
+                    low[c] = counter
+                    stack.append((c, child_indptr[c]))
+            else:
+                stack.pop()
+                first[v] = counter
+                counter += size[v]
+                finished.append(v)
+
+    # Children finish before their parents, so their ranges are ready.
+    intervals = [None] * n_comp
+    for v in finished:
+        merged = [(int(low[v]), int(first[v] + size[v] - 1))]
+        for c in child_indices[child_indptr[v]:child_indptr[v + 1]]:
+            merged.extend(intervals[c])
+        if len(merged) > 1:
+            merged.sort()
+            out = [merged[0]]
+            for lo, hi in merged[1:]:
+                if lo <= out[-1][1] + 1:
+                    if hi > out[-1][1]:
+                        out[-1] = (out[-1][0], hi)
+                else:
+                    out.append((lo, hi))
+            merged = out
+        intervals[v] = merged
+    comp_indptr = np.zeros(n_comp + 1, dtype=np.int64)
+    comp_indptr[1:] = np.cumsum([len(iv) for iv in intervals])
+    flat = np.array([pair for iv in intervals for pair in iv], dtype=np.int32).reshape(-1, 2)
+
+    # Rows: numbered by component block, then row; each row gets the ranges
+    # of its component.
+    order = np.lexsort((np.arange(n), first[comp])).astype(np.int32)
+    post = np.empty(n, dtype=np.int32)
+    post[order] = np.arange(n, dtype=np.int32)
+    counts = np.diff(comp_indptr)[comp]
+    interval_indptr = np.zeros(n + 1, dtype=np.int32)
+    interval_indptr[1:] = np.cumsum(counts)
+    take = np.arange(interval_indptr[-1]) - np.repeat(interval_indptr[:-1] - comp_indptr[comp], counts)
+
+    # Depth: fewest subClassOf steps up to a root (BFS down from the roots).
+    row_down = up.T.tocsr()
+    depth = np.full(n, -1, dtype=np.int32)
+    frontier = np.flatnonzero(np.diff(up.indptr) == 0)
+    depth[frontier] = 0
+    level = 0
+    while len(frontier):
+        level += 1
+        reached = np.unique(np.concatenate(
+            [row_down.indices[row_down.indptr[v]:row_down.indptr[v + 1]] for v in frontier]))
+        frontier = reached[depth[reached] < 0]
+        depth[frontier] = level
+    depth[depth < 0] = 0  # on a cycle with no root above it
+
+    return {
+        "parent_indptr": up.indptr.astype(np.int32),
+        "parent_indices": up.indices.astype(np.int32),
+        "post": post,
+        "order": order,
+        "interval_indptr": interval_indptr,
+        "interval_lo": flat[take, 0],
+        "interval_hi": flat[take, 1],
+        "depth": depth,
+    }
+
+
+def _iri_order(terms):
+    """Rows sorted by IRI, keeping only the first row of a repeated IRI."""
+    rows = []
+    previous = None
+    for i in sorted(range(len(terms)), key=lambda i: terms[i]["iri"]):
+        iri = terms[i]["iri"]
+        if iri != previous:
+            rows.append(i)
+            previous = iri
+    return rows
+
+
+def compute_delta(old_terms, new_terms):
+    """What changed between two term sets, matched by IRI: one merge pass
+    over both sets in IRI order. Returns {"added": [[iri, label]],
+    "removed": [[iri, label]], "label_changed": [[iri, old, new]],
+    "definition_changed": [iri]}, each sorted by IRI."""
+    old_rows = _iri_order(old_terms)
+    new_rows = _iri_order(new_terms)
+    delta = {"added": [], "removed": [], "label_changed": [], "definition_changed": []}
+    i = j = 0
+    while i < len(old_rows) or j < len(new_rows):
+        old = old_terms[old_rows[i]] if i < len(old_rows) else None
+        new = new_terms[new_rows[j]] if j < len(new_rows) else None
+        if new is None or (old is not None and old["iri"] < new["iri"]):
+            delta["removed"].append([old["iri"], old["label"]])
+            i += 1
+        elif old is None or new["iri"] < old["iri"]:
+            delta["added"].append([new["iri"], new["label"]])
+            j += 1
+        else:
+            if old["label"] != new["label"]:
+                delta["label_changed"].append([new["iri"], old["label"], new["label"]])
+            if old.get("definition") != new.get("definition"):
+                delta["definition_changed"].append(new["iri"])
+            i += 1
+            j += 1
+    return delta
+
+
+def _published_terms(acronym):
+    """(generation, terms) of the published cache, or (None, None)."""
+    generation = current_generation(acronym)
+    if generation is None:
+        return None, None
+    path = os.path.join(current_cache_dir(acronym), acronym + "_terms.ormsgpack")
+    try:
+        with open(path, "rb") as f:
+            return generation, ormsgpack.unpackb(f.read())
+    except (OSError, ValueError) as e:
+        print("  Note: no previous terms for the release delta of " + acronym + ": " + str(e))
+        return None, None
+
+
+def vectorizer_mode(n_terms, options):
+    mode = options.get("vectorizer", "auto")
+    if mode == "auto":
+        mode = "hashing" if n_terms > HASHING_THRESHOLD_TERMS else "tfidf"
+    return mode
+
+
+def fit_index(terms, mode="tfidf", n_features=HASHING_N_FEATURES, dtype=MATRIX_DTYPE):
+    """Fit a vectorizer of the given mode on the terms. Returns
+    (vectorizer, tfidf_matrix); vectorizer.transform() embeds queries."""
+    vectorizer = make_vectorizer(mode, n_features, dtype)
+    tfidf_matrix = compact_matrix(vectorizer.fit_transform(term_documents(terms)), dtype)
+    return vectorizer, tfidf_matrix
+
+
+def vocabulary_size(vectorizer, tfidf_matrix):
+    """Distinct features: the vocabulary for tfidf mode, the used hash buckets
+    for hashing mode."""
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is not None:
+        return len(vocabulary)
+    return int((tfidf_matrix.getnnz(axis=0) > 0).sum())
+
+
+def resident_bytes(acronym, folder, tfidf_matrix):
+    """Memory the app holds for one loaded generation: the matrix arrays plus
+    the Python objects of the vectorizer and terms, measured (tracemalloc)
+    while reading them back the way the app does."""
+    total = tfidf_matrix.data.nbytes + tfidf_matrix.indices.nbytes + tfidf_matrix.indptr.nbytes
+    loaded = []  # kept alive until measured
+    tracemalloc.start()
+    try:
+        with open(os.path.join(folder, acronym + "_vectorizer.pkl"), "rb") as f:
+            loaded.append(pickle.load(f))
+        with open(os.path.join(folder, acronym + "_terms.ormsgpack"), "rb") as f:
+            loaded.append(ormsgpack.unpackb(f.read()))
+        lsa_path = os.path.join(folder, acronym + "_lsa.npz")
+        if os.path.exists(lsa_path):
+            with np.load(lsa_path) as npz:
+                loaded.append({name: npz[name] for name in npz.files})
+        total += tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del loaded
+    return int(total)
+
+
+def build_and_save(acronym, terms, owl_file=None, stats=None):
+    """Vectorize the terms and publish them as a new generation. `stats`, if
+    given, is filled with index statistics and stage timings and recorded in
+    the manifest. Returns (shape, generation)."""
+    if not terms:
+        raise RuntimeError("0 terms extracted")
+    stats = {} if stats is None else stats
+    timings = stats.setdefault("timings", {})
+
+    t = time.perf_counter()
+    options = load_build_options(acronym)
+    mode = vectorizer_mode(len(terms), options)
+    n_features = int(options.get("n_features", HASHING_N_FEATURES))
+    vectorizer, tfidf_matrix = fit_index(terms, mode, n_features)
+    unpruned = tfidf_matrix
+    top_k = options.get("prune_top_k")
+    threshold = options.get("prune_threshold")
+    if top_k or threshold:
+        stats["pruning"] = {"top_k": top_k, "threshold": threshold,
+                            "nnz_before": int(tfidf_matrix.nnz)}
+        tfidf_matrix = compact_matrix(prune_matrix(tfidf_matrix, top_k, threshold))
+    timings["vectorize"] = round(time.perf_counter() - t, 3)
+
+    lsa = None
+    if options.get("lsa_dim"):
+        t = time.perf_counter()
+        lsa, explained = fit_lsa(unpruned, options["lsa_dim"], bool(options.get("lsa_int8")))
+        timings["lsa"] = round(time.perf_counter() - t, 3)
+        stats["lsa"] = {"dim": int(lsa["components"].shape[1]),
+                        "features": int(len(lsa["feature_index"])),
+                        "int8": "scales" in lsa, "explained_variance": round(explained, 4)}
+    del unpruned
+
+    hierarchy = None
+    if options.get("hierarchy", True):
+        t = time.perf_counter()
+        hierarchy = build_hierarchy(terms)
+        timings["hierarchy"] = round(time.perf_counter() - t, 3)
+        if hierarchy is not None:
+            stats["hierarchy"] = {"edges": int(len(hierarchy["parent_indices"])),
+                                  "roots": int((np.diff(hierarchy["parent_indptr"]) == 0).sum()),
+                                  "intervals": int(len(hierarchy["interval_lo"])),
+                                  "max_depth": int(hierarchy["depth"].max())}
+    for term in terms:
+        term.pop("parents", None)  # stored in the hierarchy file, not with the terms
+
+    stats["n_terms"] = len(terms)
+    stats["shape"] = list(tfidf_matrix.shape)
+    stats["nnz"] = int(tfidf_matrix.nnz)
+    stats["vocabulary_size"] = vocabulary_size(vectorizer, tfidf_matrix)
+
+    t = time.perf_counter()
+
+    # Write a complete set into a private staging directory, then publish it.
+    staging = os.path.join(CACHE_DIR, acronym, STAGING_PREFIX + str(os.getpid()))
+    os.makedirs(staging, exist_ok=True)
+    sparse.save_npz(os.path.join(staging, acronym + "_tfidf_matrix.npz"), tfidf_matrix)
+    with open(os.path.join(staging, acronym + "_vectorizer.pkl"), "wb") as f:
         pickle.dump(vectorizer, f)
-    with open(os.path.join(folder, acronym + "_terms.ormsgpack"), "wb") as f:
+    with open(os.path.join(staging, acronym + "_terms.ormsgpack"), "wb") as f:
         f.write(ormsgpack.packb(terms))
-
-    return tfidf_matrix.shape
+    if lsa is not None:
+        np.savez(os.path.join(staging, acronym + "_lsa.npz"), **lsa)
+    if hierarchy is not None:
+        np.savez(os.path.join(staging, acronym + HIERARCHY_SUFFIX), **hierarchy)
+    timings["save"] = round(time.perf_counter() - t, 3)
+    t = time.perf_counter()
+    previous_generation, previous_terms = _published_terms(acronym)
+    if previous_terms is not None:
+        delta = compute_delta(previous_terms, terms)
+        del previous_terms
+        counts = {kind: len(entries) for kind, entries in delta.items()}
+        with open(os.path.join(staging, acronym + DELTA_SUFFIX), "w", encoding="utf-8") as f:
+            json.dump({"acronym": acronym, "from_generation": previous_generation,
+                       "counts": counts, **delta}, f, ensure_ascii=False, separators=(",", ":"))
+        stats["delta"] = dict(counts, from_generation=previous_generation)
+        timings["delta"] = round(time.perf_counter() - t, 3)
+    if options.get("fts"):
+        t = time.perf_counter()
+        write_fts_index(os.path.join(staging, acronym + FTS_SUFFIX), terms)
+        timings["fts"] = round(time.perf_counter() - t, 3)
+    stats["artifact_bytes"] = {fname: os.path.getsize(os.path.join(staging, fname))
+                               for fname in sorted(os.listdir(staging))}
+    stats["resident_bytes"] = resident_bytes(acronym, staging, tfidf_matrix)
+    stats["peak_rss_mb"] = peak_rss_mb()
+
+    build_info = {"vectorizer": mode, "stats": stats}
+    if mode == "hashing":
+        build_info["n_features"] = n_features
+    write_manifest(acronym, staging, owl_file, len(terms), build_info)
+    generation = publish_generation(acronym, staging)
+
+    return tfidf_matrix.shape, generation
 
 
 def cleanup_partial_cache(acronym):
+    """Remove the staging directories left by a failed or killed build. The
+    published generations are never touched, so a failed rebuild keeps
+    serving the previous cache."""
     folder = os.path.join(CACHE_DIR, acronym)
     if not os.path.isdir(folder):
         return
-    for fname in os.listdir(folder):
-        try:
-            os.remove(os.path.join(folder, fname))
-        except OSError:
-            pass
+    for name in os.listdir(folder):
+        if name.startswith(STAGING_PREFIX) or name.startswith(CURRENT_FILE + ".tmp-"):
+            path = os.path.join(folder, name)
+            if os.path.isdir(path):
+                _remove_tree(path)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
     try:
-        os.rmdir(folder)
+        os.rmdir(folder)  # only succeeds if nothing was ever published
     except OSError:
         pass
 
 
-def build_one(acronym, owl_file, size_mb):
+def streaming_extractor(owl_file):
+    """(label, function) of the streaming extractor for the file's format, or
+    (None, None) if it has none."""
+    if looks_like_rdf_xml(owl_file):
+        return "stream", extract_terms_streaming
+    if looks_like_turtle(owl_file):
+        return "ttl", extract_terms_turtle_streaming
+    if looks_like_owl_xml(owl_file):
+        return "owlxml", extract_terms_owl_xml
+    return None, None
+
+
+def build_timeout(owl_file, size_mb, extractor="auto"):
+    """Worker timeout scaled by source size and the primary extractor."""
+    stream_label, _ = streaming_extractor(owl_file)
+    streaming = stream_label is not None and (extractor == "stream" or size_mb > STREAM_THRESHOLD_MB)
+    rate = TIMEOUT_SEC_PER_MB["stream" if streaming else "owlready"]
+    return int(min(MAX_TIMEOUT_SEC, PER_ONTOLOGY_TIMEOUT_SEC + size_mb * rate))
+
+
+def default_memory_limit_mb():
+    """Worker address-space limit: MAPTOLOGY_BUILD_MEMORY_MB if set (0 = no
+    limit), else MEMORY_LIMIT_RAM_MULTIPLE times physical memory, else None
+    (unknown platform)."""
+    configured = os.environ.get(MEMORY_LIMIT_ENV, "").strip()
+    if configured:
+        return int(configured)
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+    return int(physical * MEMORY_LIMIT_RAM_MULTIPLE / 1024 / 1024)
+
+
+def apply_memory_limit(limit_mb):
+    """Cap this process's address space (RLIMIT_AS) so a runaway extractor
+    raises MemoryError instead of taking the machine down. The cap is on
+    virtual memory, which allocator and thread-pool reservations inflate well
+    beyond what is resident, so it must be generous."""
+    if not RESOURCE_AVAILABLE or not limit_mb:
+        return
+    limit = int(limit_mb) * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def extract_terms(owl_file, size_mb, timings=None, extractor="auto"):
     """Try several extractors in order until one returns a non-empty term list.
+    Returns (method, terms, deprecated_count). Stage times ("detect",
+    "extract") are added to `timings` if given.
 
     Order:
-      1. Primary: streaming (for big RDF/XML) OR owlready2 (everything else).
-      2. Streaming fallback if file looks like RDF/XML and wasn't already tried.
+      1. Primary: a streaming extractor (for big RDF/XML, Turtle / N-Triples
+         or OWL/XML) OR owlready2 (everything else).
+      2. Streaming fallback if the file has a streamable format and wasn't
+         already tried.
       3. rdflib fallback (handles Turtle / N3 / JSON-LD / RDF/XML).
-    """
-    is_xml = looks_like_rdf_xml(owl_file)
-    use_streaming_primary = size_mb > STREAM_THRESHOLD_MB and is_xml
 
+    With extractor="stream" only the streaming extractor is tried (used to
+    retry a build whose owlready2 attempt was killed for time or memory).
+    """
+    timings = {} if timings is None else timings
+    t_stage = time.perf_counter()
+    stream_label, stream_fn = streaming_extractor(owl_file)
+    use_streaming_primary = size_mb > STREAM_THRESHOLD_MB and stream_fn is not None
+    timings["detect"] = round(time.perf_counter() - t_stage, 3)
+    if extractor == "stream" and stream_fn is None:
+        raise RuntimeError("no streaming extractor for this format")
+
+    t_stage = time.perf_counter()
     attempts = []
-    if use_streaming_primary:
-        attempts.append(("stream", lambda: extract_terms_streaming(owl_file)))
+    if extractor == "stream" or use_streaming_primary:
+        attempts.append((stream_label, lambda: stream_fn(owl_file)))
     else:
         attempts.append(("owlready", lambda: extract_terms_owlready(owl_file)))
-    if not use_streaming_primary and is_xml:
-        attempts.append(("stream(fb)", lambda: extract_terms_streaming(owl_file)))
-    attempts.append(("rdflib(fb)", lambda: extract_terms_rdflib(owl_file)))
+    if extractor != "stream":
+        if not use_streaming_primary and stream_fn is not None:
+            attempts.append((stream_label + "(fb)", lambda: stream_fn(owl_file)))
+        attempts.append(("rdflib(fb)", lambda: extract_terms_rdflib(owl_file)))
 
     method = None
     terms = None
@@ -419,22 +1860,80 @@ def build_one(acronym, owl_file, size_mb):
             break
         last_err = RuntimeError("0 terms extracted via " + label)
 
+    timings["extract"] = round(time.perf_counter() - t_stage, 3)
     if not terms:
         raise last_err if last_err is not None else RuntimeError("all extractors failed")
-
-    shape = build_and_save(acronym, terms)
-    n_def = sum(1 for t in terms if t["definition"] != "No definition available")
-    n_syn = sum(1 for t in terms if t["synonyms"])
-    return method, len(terms), dep, n_def, n_syn, shape
+    return method, terms, dep
+
+
+def build_one(acronym, owl_file, size_mb, extractor="auto"):
+    """Extract the terms of one ontology and publish a new cache generation.
+    Returns the build stats (method, counts, index statistics, timings,
+    peak RSS, generation) as a JSON-serialisable dict."""
+    stats = {"timings": {}}
+    method, terms, dep = extract_terms(owl_file, size_mb, stats["timings"], extractor)
+    stats["method"] = method
+    stats["deprecated"] = dep
+    stats["n_def"] = sum(1 for t in terms if t["definition"] != "No definition available")
+    stats["n_syn"] = sum(1 for t in terms if t["synonyms"])
+    _, generation = build_and_save(acronym, terms, owl_file, stats)
+    stats["generation"] = generation
+    return stats
+
+
+class WorkerFailed(RuntimeError):
+    """A build worker failed. `telemetry` holds what is known about the run
+    (exit code, timed_out, peak RSS, stderr tail)."""
+
+    def __init__(self, message, telemetry=None):
+        RuntimeError.__init__(self, message)
+        self.telemetry = telemetry or {}
+
+
+def _run_worker(cmd, timeout_seconds):
+    """Run a worker process with a hard timeout. Returns (exit_code,
+    timed_out, peak_rss_mb, stderr_text); peak RSS comes from wait4 and is
+    None where that is unavailable."""
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=err)
+        timed_out = False
+        peak = None
+        if hasattr(os, "wait4"):
+            deadline = time.monotonic() + timeout_seconds
+            while True:
+                pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+                if pid:
+                    break
+                if time.monotonic() >= deadline:
+                    timed_out = True
+                    proc.kill()
+                    _, status, usage = os.wait4(proc.pid, 0)
+                    break
+                time.sleep(0.05)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            peak = _maxrss_mb(usage.ru_maxrss)
+        else:
+            try:
+                proc.wait(timeout=timeout_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                proc.kill()
+                proc.wait()
+        err.seek(0)
+        return proc.returncode, timed_out, peak, err.read()
 
 
-def build_one_with_timeout(acronym, owl_file, size_mb, timeout_seconds=PER_ONTOLOGY_TIMEOUT_SEC):
-    """Run build_one in a child subprocess with a hard timeout.
+def build_one_with_timeout(acronym, owl_file, size_mb, timeout_seconds=None,
+                           extractor="auto", memory_limit_mb=None):
+    """Run build_one in a child subprocess with a hard timeout and an optional
+    address-space limit. The timeout defaults to build_timeout().
 
     Some ontologies cause owlready2 to enter pathological cyclic-resolution
     loops (e.g. MGBD spamming "ignoring cyclic type of" warnings for hours).
     Running each build in its own process means we can kill it cleanly.
     """
+    if timeout_seconds is None:
+        timeout_seconds = build_timeout(owl_file, size_mb, extractor)
     if os.path.exists(WORKER_STATUS_FILE):
         try:
             os.remove(WORKER_STATUS_FILE)
@@ -442,35 +1941,37 @@ def build_one_with_timeout(acronym, owl_file, size_mb, timeout_seconds=PER_ONTOL
             pass
 
     cmd = [sys.executable, "-u", __file__, "--worker-build",
-           acronym, owl_file, str(size_mb)]
-    try:
-        proc = subprocess.run(
-            cmd,
-            timeout=timeout_seconds,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-    except subprocess.TimeoutExpired:
+           acronym, owl_file, str(size_mb), extractor, str(memory_limit_mb or 0)]
+    returncode, timed_out, peak, stderr = _run_worker(cmd, timeout_seconds)
+    tail = (stderr or "")[-STDERR_TAIL_CHARS:].strip().replace("\n", " | ")
+    telemetry = {"exit_code": returncode, "timed_out": timed_out, "timeout_s": timeout_seconds,
+                 "memory_limit_mb": memory_limit_mb, "extractor": extractor,
+                 "peak_rss_mb": peak, "stderr_tail": tail}
+
+    if timed_out:
         cleanup_partial_cache(acronym)
-        raise RuntimeError("build timed out after " + str(timeout_seconds) + "s")
+        raise WorkerFailed("build timed out after " + str(timeout_seconds) + "s", telemetry)
 
     if not os.path.exists(WORKER_STATUS_FILE):
         cleanup_partial_cache(acronym)
-        tail = (proc.stderr or "")[-300:].strip().replace("\n", " | ")
-        raise RuntimeError("worker died (exit " + str(proc.returncode) +
-                           ") without status; stderr: " + tail)
+        # Killed by a signal (e.g. the kernel OOM killer) or a MemoryError
+        # escaping before the status could be written.
+        telemetry["out_of_memory"] = returncode < 0 or "MemoryError" in tail
+        raise WorkerFailed("worker died (exit " + str(returncode) +
+                           ") without status; stderr: " + tail, telemetry)
 
     with open(WORKER_STATUS_FILE, "r", encoding="utf-8") as fh:
         status = json.load(fh)
 
-    if proc.returncode != 0 or "error" in status:
+    if returncode != 0 or "error" in status:
         cleanup_partial_cache(acronym)
-        raise RuntimeError(status.get("error", "worker failed (exit " + str(proc.returncode) + ")"))
+        telemetry["out_of_memory"] = bool(status.get("out_of_memory"))
+        raise WorkerFailed(status.get("error", "worker failed (exit " + str(returncode) + ")"),
+                           telemetry)
 
-    return (status["method"], status["n"], status["dep"],
-            status["n_def"], status["n_syn"], tuple(status["shape"]))
+    if peak is not None:
+        status["peak_rss_mb"] = peak  # whole worker lifetime, not just until the save
+    return status
 
 
 def worker_main():
@@ -478,20 +1979,361 @@ def worker_main():
     acronym = sys.argv[2]
     owl_file = sys.argv[3]
     size_mb = float(sys.argv[4])
+    extractor = sys.argv[5] if len(sys.argv) > 5 else "auto"
+    memory_limit_mb = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+    apply_memory_limit(memory_limit_mb)
     try:
-        method, n, dep, n_def, n_syn, shape = build_one(acronym, owl_file, size_mb)
+        stats = build_one(acronym, owl_file, size_mb, extractor)
         with open(WORKER_STATUS_FILE, "w", encoding="utf-8") as fh:
-            json.dump({"method": method, "n": n, "dep": dep,
-                       "n_def": n_def, "n_syn": n_syn,
-                       "shape": list(shape)}, fh)
+            json.dump(stats, fh)
         sys.exit(0)
     except Exception as e:
-        cleanup_partial_cache(acronym)
+        # Report first: after a MemoryError even listing a directory can fail.
+        gc.collect()
+        out_of_memory = isinstance(e, MemoryError) or getattr(e, "errno", None) == errno.ENOMEM
         with open(WORKER_STATUS_FILE, "w", encoding="utf-8") as fh:
-            json.dump({"error": type(e).__name__ + ": " + str(e)}, fh)
+            json.dump({"error": type(e).__name__ + ": " + str(e),
+                       "out_of_memory": out_of_memory}, fh)
+        try:
+            cleanup_partial_cache(acronym)
+        except OSError:
+            pass  # the parent cleans up too
         sys.exit(1)
 
 
+def should_retry_streaming(error, owl_file, size_mb):
+    """Retry with the streaming extractor if the worker was killed for time or
+    memory and the first attempt was not already streaming."""
+    telemetry = getattr(error, "telemetry", {})
+    if not (telemetry.get("timed_out") or telemetry.get("out_of_memory")):
+        return False
+    if telemetry.get("extractor") == "stream":
+        return False
+    stream_label, _ = streaming_extractor(owl_file)
+    return stream_label is not None and size_mb <= STREAM_THRESHOLD_MB
+
+
+def published_acronyms():
+    """Acronyms with a published cache generation in CACHE_DIR."""
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    out = []
+    for name in sorted(os.listdir(CACHE_DIR)):
+        if name.startswith(".") or name.endswith(".bak") or name == SHARED_BLOCK:
+            continue
+        if os.path.isdir(os.path.join(CACHE_DIR, name)) and current_generation(name) is not None:
+            out.append(name)
+    return out
+
+
+def _iri_hashes(iris):
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(iri.encode("utf-8"), digest_size=8).digest(), "little")
+         for iri in iris),
+        dtype=np.uint64, count=len(iris))
+
+
+def _published_iris(acronym):
+    folder = current_cache_dir(acronym)
+    with open(os.path.join(folder, acronym + "_terms.ormsgpack"), "rb") as f:
+        return [t["iri"] for t in ormsgpack.unpackb(f.read())]
+
+
+def build_shared_iri_index():
+    """Write SHARED_IRIS_FILE: {iri: [owning acronyms]} for every IRI that
+    more than one published ontology contains, and publish the shared-term
+    block that holds those terms (build_shared_block).
+
+    Two passes keep memory bounded by 8 bytes per term rather than by the
+    IRI strings of every ontology: first 64-bit hashes of all IRIs are
+    sorted to find the repeated ones, then only those IRIs are collected
+    (exactly, so a hash collision cannot create a false owner)."""
+    acronyms = published_acronyms()
+    hashes = []
+    for acronym in acronyms:
+        try:
+            hashes.append(np.unique(_iri_hashes(_published_iris(acronym))))
+        except (OSError, ValueError) as e:
+            print("  shared index: skipping " + acronym + " (" + str(e) + ")", flush=True)
+            hashes.append(np.empty(0, dtype=np.uint64))
+    all_hashes = np.sort(np.concatenate(hashes)) if hashes else np.empty(0, dtype=np.uint64)
+    repeated = np.unique(all_hashes[1:][all_hashes[1:] == all_hashes[:-1]])
+
+    owners = {}
+    for acronym, own_hashes in zip(acronyms, hashes):
+        if not len(np.intersect1d(own_hashes, repeated, assume_unique=True)):
+            continue
+        iris = _published_iris(acronym)
+        for iri, shared in zip(iris, np.isin(_iri_hashes(iris), repeated)):
+            if shared:
+                acr_list = owners.setdefault(iri, [])
+                if acronym not in acr_list:
+                    acr_list.append(acronym)
+    shared = {iri: acr_list for iri, acr_list in owners.items() if len(acr_list) > 1}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = SHARED_IRIS_FILE + ".tmp-" + str(os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(ormsgpack.packb(shared))
+    os.replace(tmp, SHARED_IRIS_FILE)
+    print("Shared IRI index: " + str(len(shared)) + " IRIs in more than one of "
+          + str(len(acronyms)) + " ontologies -> " + SHARED_IRIS_FILE, flush=True)
+    build_shared_block(shared)
+    return shared
+
+
+def canonical_owner(iri, owners):
+    """The ontology a shared term is taken from: the one named by the IRI's
+    OBO prefix (GO for .../obo/GO_0008150) if it is an owner, else the first
+    owner alphabetically."""
+    local = iri.rsplit("/", 1)[-1].rsplit("#", 1)[-1]
+    if "_" in local:
+        prefix = local.split("_", 1)[0].upper()
+        for acronym in owners:
+            if acronym.upper() == prefix:
+                return acronym
+    return min(owners)
+
+
+def build_shared_block(shared):
+    """Publish SHARED_BLOCK: the term of every shared IRI once, taken from
+    its canonical owner, with "owners" (canonical owner first). The app
+    drops the owning ontologies' copies when it loads them and scores this
+    block once per query instead. Built like an ontology (its own
+    vectorizer; build options under "_shared"). Returns the number of
+    terms; with no shared IRIs the published block is withdrawn."""
+    wanted = {}
+    for iri, owners in shared.items():
+        first = canonical_owner(iri, owners)
+        wanted.setdefault(first, {})[iri] = [first] + sorted(o for o in owners if o != first)
+    terms = []
+    for acronym in sorted(wanted):
+        iris = wanted[acronym]
+        with open(os.path.join(current_cache_dir(acronym), acronym + "_terms.ormsgpack"), "rb") as f:
+            for term in ormsgpack.unpackb(f.read()):
+                owners = iris.pop(term.get("iri"), None)
+                if owners is not None:
+                    term["owners"] = owners
+                    terms.append(term)
+    if not terms:
+        try:
+            os.remove(os.path.join(CACHE_DIR, SHARED_BLOCK, CURRENT_FILE))
+        except OSError:
+            pass
+        return 0
+    _, generation = build_and_save(SHARED_BLOCK, terms)
+    print("Shared-term block: " + str(len(terms)) + " terms -> "
+          + generation_dir(SHARED_BLOCK, generation), flush=True)
+    return len(terms)
+
+
+def _read_manifest(acronym):
+    folder = current_cache_dir(acronym)
+    try:
+        with open(os.path.join(folder, acronym + MANIFEST_SUFFIX), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def catalog_entry(acronym, name=None):
+    """Catalog record of one published ontology, from its manifest.
+    matrix_bytes is the in-memory size of the loaded matrix (float32 data,
+    int32 indices and indptr), memory_bytes that of everything the app loads
+    (resident_bytes). Caches without build statistics fall back to estimates
+    from the file sizes on disk."""
+    manifest = _read_manifest(acronym)
+    stats = manifest.get("stats") or {}
+    shape = stats.get("shape")
+    folder = current_cache_dir(acronym)
+    if shape and stats.get("nnz") is not None:
+        matrix_bytes = int(stats["nnz"]) * 8 + (int(shape[0]) + 1) * 4
+    else:
+        npz = os.path.join(folder, acronym + "_tfidf_matrix.npz")
+        matrix_bytes = os.path.getsize(npz) if os.path.exists(npz) else None
+    memory_bytes = stats.get("resident_bytes")
+    if memory_bytes is None and matrix_bytes is not None:
+        memory_bytes = matrix_bytes
+        for suffix in ("_vectorizer.pkl", "_terms.ormsgpack"):
+            path = os.path.join(folder, acronym + suffix)
+            if os.path.exists(path):
+                memory_bytes += os.path.getsize(path) * RESIDENT_SIZE_FACTOR
+    return {
+        "acronym": acronym,
+        "name": name or acronym,
+        "n_terms": manifest.get("n_terms"),
+        "matrix_bytes": matrix_bytes,
+        "memory_bytes": memory_bytes,
+        "generation": current_generation(acronym),
+        "built_at": manifest.get("built_at"),
+    }
+
+
+def write_catalog(names=None):
+    """Write CATALOG_FILE: one record per published ontology (see
+    catalog_entry), which the app reads instead of the TSV and the cache
+    folders. `names` maps acronym -> full name (default: from TSV_FILE)."""
+    if names is None:
+        names = {}
+        if os.path.exists(TSV_FILE):
+            df = pd.read_csv(TSV_FILE, sep="\t")
+            names = dict(zip(df["abbreviation"].astype(str), df["name"].astype(str)))
+    entries = [catalog_entry(acronym, names.get(acronym)) for acronym in published_acronyms()]
+    catalog = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+               "ontologies": entries}
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = CATALOG_FILE + ".tmp-" + str(os.getpid())
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, indent=1)
+    os.replace(tmp, CATALOG_FILE)
+    print("Catalog: " + str(len(entries)) + " ontologies -> " + CATALOG_FILE, flush=True)
+    return catalog
+
+
+def _vectorizer_spec(vectorizer):
+    """Settings the app needs to vectorize queries like `vectorizer` without
+    unpickling it. Raises ValueError for settings a bundle cannot hold
+    (custom tokenizer/preprocessor callables)."""
+    if hasattr(vectorizer, "steps"):
+        hashing, transformer = vectorizer.steps[0][1], vectorizer.steps[-1][1]
+        params = hashing.get_params()
+        spec = {"kind": "hashing", "n_features": int(params["n_features"]),
+                "norm": transformer.norm, "use_idf": transformer.use_idf,
+                "sublinear_tf": transformer.sublinear_tf}
+        idf = transformer.idf_
+    else:
+        params = vectorizer.get_params()
+        params.pop("vocabulary", None)
+        spec = {"kind": "tfidf", "n_features": len(vectorizer.vocabulary_),
+                "norm": vectorizer.norm, "use_idf": vectorizer.use_idf,
+                "sublinear_tf": vectorizer.sublinear_tf, "binary": vectorizer.binary}
+        idf = vectorizer.idf_
+    params.pop("dtype", None)
+    for key, value in params.items():
+        if isinstance(value, tuple):
+            params[key] = list(value)
+        elif value is not None and not isinstance(value, (str, int, float, bool)):
+            raise ValueError("vectorizer setting " + key + " cannot be bundled")
+    spec["params"] = params
+    return spec, idf
+
+
+def _string_column(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _write_section(f, array):
+    """Append one array at the next aligned offset; returns its table entry."""
+    pad = -f.tell() % WARM_BUNDLE_ALIGN
+    f.write(b"\0" * pad)
+    offset = f.tell()
+    array = np.ascontiguousarray(array)
+    f.write(array.astype(array.dtype.newbyteorder("<"), copy=False).tobytes())
+    return [offset, int(array.nbytes), array.dtype.newbyteorder("<").str]
+
+
+def _bundle_sections(f, acronym):
+    folder = current_cache_dir(acronym)
+    matrix = compact_matrix(sparse.load_npz(os.path.join(folder, acronym + "_tfidf_matrix.npz")))
+    with open(os.path.join(folder, acronym + "_vectorizer.pkl"), "rb") as fh:
+        vectorizer = pickle.load(fh)
+    with open(os.path.join(folder, acronym + "_terms.ormsgpack"), "rb") as fh:
+        terms = ormsgpack.unpackb(fh.read())
+    spec, idf = _vectorizer_spec(vectorizer)
+
+    sections = {}
+    sections["matrix_data"] = _write_section(f, matrix.data)
+    sections["matrix_indices"] = _write_section(f, matrix.indices)
+    sections["matrix_indptr"] = _write_section(f, matrix.indptr)
+    sections["idf"] = _write_section(f, np.asarray(idf))
+    if spec["kind"] == "tfidf":
+        # TfidfVectorizer numbers its features in sorted order, so the app can
+        # binary-search this column for a token's feature index.
+        offsets, blob = _string_column(vectorizer.get_feature_names_out())
+        sections["vocab_offsets"] = _write_section(f, offsets)
+        sections["vocab_blob"] = _write_section(f, blob)
+    columns = {
+        "label": [str(t.get("label", "")) for t in terms],
+        "iri": [str(t.get("iri", "")) for t in terms],
+        "definition": [str(t.get("definition", "")) for t in terms],
+        "synonyms": [SYNONYM_SEPARATOR.join(t.get("synonyms") or []) for t in terms],
+    }
+    for field, values in columns.items():
+        offsets, blob = _string_column(values)
+        sections[field + "_offsets"] = _write_section(f, offsets)
+        sections[field + "_blob"] = _write_section(f, blob)
+    iri_order = sorted(range(len(terms)), key=lambda i: columns["iri"][i].encode("utf-8"))
+    sections["iri_order"] = _write_section(f, np.array(iri_order, dtype=np.int32))
+    entry = {"generation": current_generation(acronym), "n_terms": len(terms),
+             "shape": list(matrix.shape), "vectorizer": spec, "sections": sections}
+
+    lsa_path = os.path.join(folder, acronym + "_lsa.npz")
+    if os.path.exists(lsa_path):
+        with np.load(lsa_path) as npz:
+            for name in npz.files:
+                sections["lsa_" + name] = _write_section(f, npz[name])
+            entry["lsa_dim"] = int(npz["components"].shape[1])
+    return entry
+
+
+def write_warm_bundle():
+    """Pack the published caches of the ontologies with "warm_start": true
+    in their build options into WARM_BUNDLE_FILE. Removes the bundle if no
+    ontology is configured."""
+    acronyms = [a for a in published_acronyms() if load_build_options(a).get("warm_start")]
+    if not acronyms:
+        if os.path.exists(WARM_BUNDLE_FILE):
+            os.remove(WARM_BUNDLE_FILE)
+        return None
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = WARM_BUNDLE_FILE + ".tmp-" + str(os.getpid())
+    entries = {}
+    with open(tmp, "wb") as f:
+        f.write(b"\0" * WARM_BUNDLE_ALIGN)
+        for acronym in acronyms:
+            start = f.tell()
+            try:
+                entries[acronym] = _bundle_sections(f, acronym)
+            except (OSError, ValueError) as e:
+                print("  warm bundle: skipping " + acronym + " (" + str(e) + ")", flush=True)
+                f.seek(start)
+                f.truncate()
+        header = json.dumps({"created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                             "ontologies": entries}).encode("utf-8")
+        header_offset = f.tell()
+        f.write(header)
+        f.seek(0)
+        f.write(WARM_BUNDLE_PREAMBLE.pack(WARM_BUNDLE_MAGIC, header_offset, len(header)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, WARM_BUNDLE_FILE)
+    print("Warm-start bundle: " + ", ".join(sorted(entries)) + " ("
+          + str(round(os.path.getsize(WARM_BUNDLE_FILE) / 1024.0 / 1024.0, 1)) + " MB) -> "
+          + WARM_BUNDLE_FILE, flush=True)
+    return entries
+
+
+def load_build_report():
+    try:
+        with open(BUILD_REPORT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_report(report):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = BUILD_REPORT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    os.replace(tmp, BUILD_REPORT_FILE)
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--only", help="Build only these acronyms (comma-separated)")
@@ -499,7 +2341,32 @@ def main():
                         help="Stop after building this many (sample run)")
     parser.add_argument("--list-only", action="store_true",
                         help="Print the plan, don't build")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Rebuild even if a cache exists (publishes a new generation)")
+    parser.add_argument("--shared-index-only", action="store_true",
+                        help="Only rebuild the cross-ontology shared IRI index")
+    parser.add_argument("--catalog-only", action="store_true",
+                        help="Only rewrite the catalog of published ontologies")
+    parser.add_argument("--bundle-only", action="store_true",
+                        help="Only rewrite the warm-start bundle")
+    parser.add_argument("--memory-limit-mb", type=int, default=None,
+                        help="Worker address-space (virtual memory) limit; 0 = no limit (default: $"
+                             + MEMORY_LIMIT_ENV + ", else " + str(MEMORY_LIMIT_RAM_MULTIPLE)
+                             + "x physical memory)")
     args = parser.parse_args()
+    memory_limit_mb = args.memory_limit_mb
+    if memory_limit_mb is None:
+        memory_limit_mb = default_memory_limit_mb()
+
+    if args.shared_index_only:
+        build_shared_iri_index()
+        return
+    if args.catalog_only:
+        write_catalog()
+        return
+    if args.bundle_only:
+        write_warm_bundle()
+        return
 
     df = pd.read_csv(TSV_FILE, sep="\t")
     only = None
@@ -515,6 +2382,7 @@ def main():
         plan.append((acronym, owl_file))
 
     total = len(plan)
+    report = load_build_report()
     failures = []
     skipped = 0
     built = 0
@@ -528,38 +2396,65 @@ def main():
         return
 
     for i, (acronym, owl_file) in enumerate(plan, start=1):
-        if is_cache_built(acronym):
+        if not args.rebuild and is_cache_built(acronym):
             skipped += 1
             continue
 
         if not os.path.exists(owl_file):
             msg = "OWL file missing: " + owl_file
             failures.append((acronym, msg))
+            report[acronym] = {"status": "failed", "error": msg,
+                               "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+            save_build_report(report)
             print("[" + str(i) + "/" + str(total) + "] FAIL " + acronym + " -- " + msg, flush=True)
             continue
 
-        size_mb = os.path.getsize(owl_file) / 1024.0 / 1024.0
+        size_mb = source_size_mb(owl_file)
         tstart = time.time()
+        entry = {"size_mb": round(size_mb, 2),
+                 "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
         try:
-            method, n, dep, n_def, n_syn, shape = build_one_with_timeout(acronym, owl_file, size_mb)
+            try:
+                stats = build_one_with_timeout(acronym, owl_file, size_mb,
+                                               memory_limit_mb=memory_limit_mb)
+            except WorkerFailed as first:
+                if not should_retry_streaming(first, owl_file, size_mb):
+                    raise
+                print("[" + str(i) + "/" + str(total) + "] RETRY "
+                      + acronym.ljust(14) + " -> " + str(first)
+                      + "; retrying with the streaming extractor", flush=True)
+                entry["first_attempt"] = dict(first.telemetry, error=str(first))
+                stats = build_one_with_timeout(acronym, owl_file, size_mb, extractor="stream",
+                                               memory_limit_mb=memory_limit_mb)
             elapsed = time.time() - tstart
             built += 1
+            entry.update(stats)
+            entry["status"] = "ok"
             print("[" + str(i) + "/" + str(total) + "] OK   "
                   + acronym.ljust(15)
                   + (str(round(size_mb, 1)) + "MB").rjust(10) + "  "
-                  + method.ljust(8) + "  "
-                  + str(n).rjust(7) + " terms  "
-                  + "def=" + str(n_def) + " syn=" + str(n_syn)
-                  + "  shape=" + str(shape)
+                  + stats["method"].ljust(8) + "  "
+                  + str(stats["n_terms"]).rjust(7) + " terms  "
+                  + "def=" + str(stats["n_def"]) + " syn=" + str(stats["n_syn"])
+                  + "  shape=" + str(tuple(stats["shape"]))
+                  + "  gen=" + str(stats["generation"])
+                  + "  rss=" + str(stats.get("peak_rss_mb")) + "MB"
                   + "  (" + str(round(elapsed, 1)) + "s)", flush=True)
         except Exception as e:
+            elapsed = time.time() - tstart
             cleanup_partial_cache(acronym)
             err = type(e).__name__ + ": " + str(e)
             failures.append((acronym, err))
+            entry.update(getattr(e, "telemetry", {}))
+            entry["status"] = "failed"
+            entry["error"] = err
             print("[" + str(i) + "/" + str(total) + "] FAIL "
                   + acronym.ljust(15)
                   + (str(round(size_mb, 1)) + "MB").rjust(10) + "  "
                   + "-> " + err, flush=True)
+        entry["elapsed_s"] = round(elapsed, 1)
+        report[acronym] = entry
+        save_build_report(report)
 
         gc.collect()
 
@@ -575,6 +2470,13 @@ def main():
           + "skipped(already cached)=" + str(skipped) + "  "
           + "failed=" + str(len(failures)), flush=True)
 
+    if built or not os.path.exists(SHARED_IRIS_FILE):
+        build_shared_iri_index()
+    if built or not os.path.exists(CATALOG_FILE):
+        write_catalog(dict(zip(df["abbreviation"].astype(str), df["name"].astype(str))))
+    if built or not os.path.exists(WARM_BUNDLE_FILE):
+        write_warm_bundle()
+
     if failures:
         with open(FAILURE_LOG, "w", encoding="utf-8") as fh:
             for a, e in failures:
@@ -13,13 +13,47 @@ This script is used during the Maptology app build process.
 
 사용법 / Usage:
     python download_owl_files.py
+    python download_owl_files.py --workers 8 --rate 10   # 동시 다운로드 / parallel
+    python download_owl_files.py --compress gzip   # store ACRONYM.owl.gz
+    python download_owl_files.py --compress zstd   # store ACRONYM.owl.zst
+                                                   # (needs zstandard)
+
+압축 저장 시 디스크 사용량과 빌드 I/O가 크게 줄어듭니다. build_all_caches.py는
+압축 파일을 그대로 읽습니다.
+Compressed storage cuts disk usage and build I/O; build_all_caches.py reads
+the compressed files directly.
+
+다운로드는 재사용되는 연결(Session)로 병렬 수행되며, 중단된 파일은 이어받고
+(HTTP Range), 변경되지 않은 파일은 건너뜁니다 (ETag/Last-Modified).
+Downloads run in parallel over one pooled session with a shared rate limit.
+An interrupted file resumes from its raw ACRONYM.owl.part (Range + If-Range);
+a file already on disk is re-validated with If-None-Match/If-Modified-Since
+using the validators saved in ACRONYM.owl.meta.json, and skipped on 304.
+Compression, if any, is applied once the raw download is complete.
+
+Every network function takes a `session` and `base_url`, so the whole flow
+can run offline against requests-mock:
+
+    adapter = requests_mock.Adapter()
+    session = make_session(api_key)
+    session.mount("mock://", adapter)
+    download_files(ontologies, api_key, session=session, base_url="mock://bioportal")
 """
 
+import argparse
 import os
 import sys
 import csv
+import gzip
+import json
+import shutil
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 # BioPortal API 기본 URL / BioPortal API base URL
@@ -35,6 +69,130 @@ CACHE_DIR = os.path.join(_REPO_ROOT, "ontology_cache")
 # TSV 파일 경로 / TSV file path
 TSV_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_list.tsv")
 
+# 압축 형식별 파일 확장자 / File suffix per compression format
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# 동시 작업 수와 초당 요청 수 / Concurrent workers and API requests per second
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0
+
+# 일시적 오류 재시도 / Retry transient failures (honours Retry-After)
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 1.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DOWNLOAD_CHUNK = 65536
+
+
+def make_session(api_key, pool_size=DEFAULT_WORKERS):
+    """
+    연결 재사용 세션 / A pooled session with the API key and retry policy
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Authorization"] = f"apikey token={api_key}"
+    return session
+
+
+class RateLimiter:
+    """
+    스레드 간 공유 요청 속도 제한 / Request rate limit shared by all workers
+    (replaces the fixed sleep after every request)
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def source_path(acronym, compression="none"):
+    """
+    온톨로지 파일 경로 / Path of an ontology source file
+    """
+    return os.path.join(CACHE_DIR, f"{acronym}.owl{COMPRESSION_SUFFIXES[compression]}")
+
+
+def existing_source(acronym):
+    """
+    이미 다운로드된 파일 (압축 여부 무관) / An already-downloaded file in any
+    compression format, or None
+    """
+    for compression in COMPRESSION_SUFFIXES:
+        path = source_path(acronym, compression)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            return path
+    return None
+
+
+def part_path(acronym):
+    """
+    이어받기용 원본 임시 파일 / Raw (uncompressed) partial download
+    """
+    return os.path.join(CACHE_DIR, f"{acronym}.owl.part")
+
+
+def meta_path(acronym):
+    """
+    ETag/Last-Modified 저장 파일 / Sidecar with the HTTP validators
+    """
+    return os.path.join(CACHE_DIR, f"{acronym}.owl.meta.json")
+
+
+def read_meta(acronym):
+    try:
+        with open(meta_path(acronym), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(acronym, meta):
+    path = meta_path(acronym)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _validators(response):
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def open_for_write(file_path, compression="none"):
+    """
+    압축하면서 쓰기 / Open a file for writing, compressing on the fly
+    """
+    if compression == "gzip":
+        return gzip.open(file_path, "wb", compresslevel=6)
+    if compression == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(file_path, "wb"), closefd=True)
+    return open(file_path, "wb")
+
 
 def get_api_key():
     """
@@ -63,17 +221,17 @@ def get_api_key():
     return api_key
 
 
-def get_all_ontologies(api_key):
+def get_all_ontologies(api_key, session=None, base_url=BIOPORTAL_API_URL):
     """
     BioPortal에서 모든 온톨로지 목록을 가져옴 / Fetch all ontologies from BioPortal
     """
     print("\n[1/4] 온톨로지 목록을 가져오는 중... / Fetching ontology list...")
 
-    url = f"{BIOPORTAL_API_URL}/ontologies"
-    headers = {"Authorization": f"apikey token={api_key}"}
+    session = session or make_session(api_key)
+    url = f"{base_url}/ontologies"
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = session.get(url, timeout=60)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"오류: 온톨로지 목록을 가져올 수 없습니다. / Error: Could not fetch ontology list.")
@@ -86,39 +244,57 @@ def get_all_ontologies(api_key):
     return ontologies
 
 
-def filter_ontologies(ontologies, api_key):
+def check_language(session, limiter, acronym, base_url=BIOPORTAL_API_URL):
+    """
+    최신 제출본의 온톨로지 언어 / Ontology language of the latest submission,
+    or None if it could not be fetched
+    """
+    url = f"{base_url}/ontologies/{acronym}/latest_submission"
+    params = {"include": "hasOntologyLanguage"}
+
+    limiter.wait()
+    try:
+        response = session.get(url, params=params, timeout=30)
+    except requests.exceptions.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    try:
+        submission = response.json()
+    except ValueError:
+        return None
+    return str(submission.get("hasOntologyLanguage", "")).upper()
+
+
+def filter_ontologies(ontologies, api_key, session=None, base_url=BIOPORTAL_API_URL,
+                      workers=DEFAULT_WORKERS, rate=DEFAULT_RATE):
     """
     OWL/OBO 형식 온톨로지만 필터링 / Filter OWL and OBO format ontologies
     SKOS, UMLS 등은 제외 / Exclude SKOS, UMLS, etc.
     """
     print("\n[2/4] 온톨로지 형식을 확인하는 중... / Checking ontology formats...")
 
+    session = session or make_session(api_key, workers)
+    limiter = RateLimiter(rate)
     filtered_ontologies = []
     skipped_formats = {}
     total = len(ontologies)
-    headers = {"Authorization": f"apikey token={api_key}"}
-
-    for i, ont in enumerate(ontologies):
-        acronym = ont.get("acronym", "")
-        name = ont.get("name", "")
+    acronyms = [ont.get("acronym", "") for ont in ontologies]
 
-        # 진행 상황 표시 / Show progress
-        if (i + 1) % 50 == 0 or (i + 1) == total:
-            print(f"  확인 중... {i + 1}/{total}")
+    # 병렬 확인, 결과는 원래 순서대로 / Check in parallel, keep the input order
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        languages = pool.map(lambda a: check_language(session, limiter, a, base_url), acronyms)
+        for i, (ont, language) in enumerate(zip(ontologies, languages)):
+            acronym = ont.get("acronym", "")
+            name = ont.get("name", "")
 
-        # latest_submission에서 온톨로지 언어 확인 / Check ontology language
-        url = f"{BIOPORTAL_API_URL}/ontologies/{acronym}/latest_submission"
-        params = {"include": "hasOntologyLanguage"}
+            # 진행 상황 표시 / Show progress
+            if (i + 1) % 50 == 0 or (i + 1) == total:
+                print(f"  확인 중... {i + 1}/{total}")
 
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=30)
-
-            if response.status_code != 200:
+            if language is None:
                 continue
 
-            submission = response.json()
-            language = str(submission.get("hasOntologyLanguage", "")).upper()
-
             # OWL 형식 → 네이티브 OWL로 다운로드 / OWL format → download native OWL
             if "OWL" in language:
                 filtered_ontologies.append({
@@ -142,12 +318,6 @@ def filter_ontologies(ontologies, api_key):
                 fmt = language if language else "UNKNOWN"
                 skipped_formats[fmt] = skipped_formats.get(fmt, 0) + 1
 
-        except requests.exceptions.RequestException:
-            continue
-
-        # API 요청 속도 제한 방지 / Avoid API rate limiting
-        time.sleep(0.1)
-
     # 결과 요약 / Summary
     owl_count = sum(1 for o in filtered_ontologies if o["download_format"] == "OWL")
     rdf_count = sum(1 for o in filtered_ontologies if o["download_format"] == "RDF/XML")
@@ -165,89 +335,161 @@ def filter_ontologies(ontologies, api_key):
     return filtered_ontologies
 
 
-def download_files(filtered_ontologies, api_key):
+def _finish_download(acronym, file_path, compression):
+    """
+    완료된 원본을 최종 위치로 (필요시 압축) / Move the completed raw .part into
+    place, compressing it if requested, and drop other-format copies
+    """
+    raw = part_path(acronym)
+    if compression == "none":
+        os.replace(raw, file_path)
+    else:
+        tmp = file_path + ".tmp"
+        with open(raw, "rb") as src, open_for_write(tmp, compression) as dst:
+            shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK * 16)
+        os.replace(tmp, file_path)
+        os.remove(raw)
+    for other in COMPRESSION_SUFFIXES:
+        other_path = source_path(acronym, other)
+        if other_path != file_path and os.path.exists(other_path):
+            os.remove(other_path)
+
+
+def download_one(session, limiter, ont, compression="none", base_url=BIOPORTAL_API_URL):
+    """
+    온톨로지 파일 하나 다운로드 / Download one ontology file.
+    Returns (status, file_path, message); status is "downloaded", "resumed",
+    "unchanged", "exists" or "failed".
+    """
+    acronym = ont["acronym"]
+    native_format = ont["native_format"]
+    file_path = source_path(acronym, compression)
+    raw = part_path(acronym)
+    meta = read_meta(acronym)
+
+    # 다운로드 URL 설정 / Set download URL
+    url = f"{base_url}/ontologies/{acronym}/download"
+
+    # OWL → 네이티브 다운로드 (파라미터 없음)
+    # OBO → RDF/XML로 변환 다운로드 (download_format=rdf)
+    if native_format == "OWL":
+        params = {}
+    else:
+        params = {"download_format": "rdf"}
+
+    # 바이트 범위가 원본 기준이 되도록 전송 압축 해제 안 함
+    # Ask for identity encoding so Range offsets match the bytes we store
+    headers = {"Accept-Encoding": "identity"}
+    offset = 0
+    existing = existing_source(acronym)
+    validator = meta.get("etag") or meta.get("last_modified")
+
+    if os.path.exists(raw) and os.path.getsize(raw) > 0 and validator:
+        # 중단된 다운로드 이어받기 / Resume; If-Range restarts it if the file changed
+        offset = os.path.getsize(raw)
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = validator
+    elif existing is not None:
+        if not meta.get("complete") or not validator:
+            # 검증 정보 없는 기존 파일은 그대로 둠 / No validators: keep as is
+            return "exists", existing, "이미 존재 (건너뜀) / Already exists (skipped)"
+        # 변경 여부 확인 / Conditional request: 304 if unchanged
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    limiter.wait()
+    try:
+        with session.get(url, headers=headers, params=params, timeout=300, stream=True) as response:
+            if response.status_code == 304:
+                return "unchanged", existing, "변경 없음 (건너뜀) / Not modified (skipped)"
+
+            if response.status_code == 206 and offset:
+                content_range = response.headers.get("Content-Range", "")
+                if not content_range.startswith(f"bytes {offset}-"):
+                    return "failed", None, f"실패 (잘못된 Content-Range: {content_range})"
+                mode = "ab"
+                status = "resumed"
+            elif response.status_code == 200:
+                # 처음부터 (또는 파일이 바뀌어 다시) / Full body: start the .part over
+                offset = 0
+                mode = "wb"
+                status = "downloaded"
+                meta = _validators(response)
+                meta["complete"] = False
+                write_meta(acronym, meta)
+            elif response.status_code == 416 and offset:
+                # 범위 불일치 → 다음 실행에서 처음부터 / Bad range: restart next run
+                os.remove(raw)
+                return "failed", None, "실패 (HTTP 416, .part 삭제) / Range not satisfiable"
+            else:
+                return "failed", None, f"실패 (HTTP {response.status_code})"
+
+            # 원본을 .part에 저장, 완료 후 (압축하며) 이동
+            # Raw bytes go to the .part file so an interrupted download can resume
+            with open(raw, mode) as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                    f.write(chunk)
+
+        _finish_download(acronym, file_path, compression)
+        meta["complete"] = True
+        write_meta(acronym, meta)
+
+    except requests.exceptions.RequestException as e:
+        return "failed", None, f"실패: {e}"
+
+    file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    if status == "resumed":
+        return status, file_path, f"이어받기 완료 ({file_size_mb:.1f} MB, {offset} bytes 재사용)"
+    return status, file_path, f"완료 ({file_size_mb:.1f} MB)"
+
+
+def download_files(filtered_ontologies, api_key, compression="none", session=None,
+                   base_url=BIOPORTAL_API_URL, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE):
     """
     온톨로지 파일을 다운로드하고 캐시에 저장 / Download ontology files and save to cache
     - OWL 형식: 네이티브 OWL 파일 / OWL format: native OWL file
     - OBO 형식: RDF/XML로 변환 / OBO format: converted to RDF/XML
+    - compression: "none" / "gzip" / "zstd" (저장 형식 / storage format)
+    - workers / rate: 동시 다운로드 수, 초당 요청 수 / parallelism and request rate
     """
     print(f"\n[3/4] 파일을 다운로드하는 중... / Downloading files...")
 
     # 캐시 디렉토리 생성 / Create cache directory
     os.makedirs(CACHE_DIR, exist_ok=True)
 
-    headers = {"Authorization": f"apikey token={api_key}"}
-    downloaded = []
-    failed = []
+    session = session or make_session(api_key, workers)
+    limiter = RateLimiter(rate)
+    print_lock = threading.Lock()
     total = len(filtered_ontologies)
+    done = [0]
 
-    for i, ont in enumerate(filtered_ontologies):
-        acronym = ont["acronym"]
-        name = ont["name"]
-        download_format = ont["download_format"]
-        native_format = ont["native_format"]
-        file_path = os.path.join(CACHE_DIR, f"{acronym}.owl")
-
-        format_label = f"[{download_format}]"
-        print(f"  [{i + 1}/{total}] {acronym} {format_label} 다운로드 중...", end="", flush=True)
-
-        # 이미 다운로드된 파일이 있으면 건너뜀 / Skip if already downloaded
-        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-            print(" 이미 존재 (건너뜀) / Already exists (skipped)")
-            downloaded.append({
-                "name": name,
-                "file_path": file_path,
-                "acronym": acronym,
-                "native_format": native_format,
-                "download_format": download_format
-            })
-            continue
-
-        # 다운로드 URL 설정 / Set download URL
-        url = f"{BIOPORTAL_API_URL}/ontologies/{acronym}/download"
+    def task(ont):
+        result = download_one(session, limiter, ont, compression, base_url)
+        with print_lock:
+            done[0] += 1
+            format_label = f"[{ont['download_format']}]"
+            print(f"  [{done[0]}/{total}] {ont['acronym']} {format_label} {result[2]}", flush=True)
+        return result
 
-        # OWL → 네이티브 다운로드 (파라미터 없음)
-        # OBO → RDF/XML로 변환 다운로드 (download_format=rdf)
-        if native_format == "OWL":
-            params = {}
-        else:
-            params = {"download_format": "rdf"}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(task, filtered_ontologies))
 
-        try:
-            response = requests.get(
-                url,
-                headers=headers,
-                params=params,
-                timeout=300,
-                stream=True
-            )
-
-            if response.status_code == 200:
-                # 스트리밍으로 파일 저장 / Save file with streaming
-                with open(file_path, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-
-                file_size_mb = os.path.getsize(file_path) / (1024 * 1024)
-                print(f" 완료 ({file_size_mb:.1f} MB)")
-
-                downloaded.append({
-                    "name": name,
-                    "file_path": file_path,
-                    "acronym": acronym,
-                    "native_format": native_format,
-                    "download_format": download_format
-                })
-            else:
-                print(f" 실패 (HTTP {response.status_code})")
-                failed.append(acronym)
-
-        except requests.exceptions.RequestException as e:
-            print(f" 실패: {e}")
-            failed.append(acronym)
-
-        # API 요청 속도 제한 방지 / Avoid API rate limiting
-        time.sleep(0.5)
+    # TSV는 원래 순서대로 / Keep the input order for the TSV
+    downloaded = []
+    failed = []
+    for ont, (status, file_path, _) in zip(filtered_ontologies, results):
+        if status == "failed":
+            failed.append(ont["acronym"])
+            continue
+        downloaded.append({
+            "name": ont["name"],
+            "file_path": file_path,
+            "acronym": ont["acronym"],
+            "native_format": ont["native_format"],
+            "download_format": ont["download_format"]
+        })
 
     # 결과 요약 / Summary
     owl_downloaded = sum(1 for d in downloaded if d["download_format"] == "OWL")
@@ -299,17 +541,39 @@ def main():
     """
     메인 함수 / Main function
     """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--compress", choices=sorted(COMPRESSION_SUFFIXES), default="none",
+                        help="Store downloaded files compressed (gzip or zstd)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent requests / downloads")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="Maximum API requests per second (all workers together)")
+    args = parser.parse_args()
+
+    if args.compress == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("오류: zstd 압축에는 zstandard 패키지가 필요합니다. / "
+                  "Error: --compress zstd needs the zstandard package.")
+            sys.exit(1)
+
     # 1. API 키 입력 / Get API key
     api_key = get_api_key()
 
+    # 연결 재사용 세션 / One pooled session for every request
+    session = make_session(api_key, args.workers)
+
     # 2. 전체 온톨로지 목록 가져오기 / Get all ontologies
-    ontologies = get_all_ontologies(api_key)
+    ontologies = get_all_ontologies(api_key, session)
 
     # 3. OWL/OBO 형식만 필터링 / Filter OWL and OBO ontologies
-    filtered_ontologies = filter_ontologies(ontologies, api_key)
+    filtered_ontologies = filter_ontologies(ontologies, api_key, session,
+                                            workers=args.workers, rate=args.rate)
 
     # 4. 파일 다운로드 / Download files
-    downloaded = download_files(filtered_ontologies, api_key)
+    downloaded = download_files(filtered_ontologies, api_key, args.compress, session,
+                                workers=args.workers, rate=args.rate)
 
     # 5. TSV 파일 생성 / Create TSV file
     create_tsv_file(downloaded)
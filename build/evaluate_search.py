@@ -0,0 +1,268 @@
+"""
+Measure how alternative index build modes change search results, against the
+exact TF-IDF index (float64, as built before float32 storage) as reference,
+on a fixed query set.
+
+For each ontology the terms are indexed once per variant, every query is run
+exactly the way tfidf_search.search_local runs it (vectorizer.transform +
+linear_kernel, top-N with score > 0), and the top-N IRIs are compared with
+the reference:
+
+  overlap@N   mean |variant top-N  &  reference top-N| / |reference top-N|
+  exact       share of queries whose top-N set is identical
+  nnz         stored weights in the matrix
+  matrix MB   in-memory size of the sparse matrix (data + indices + indptr)
+  npz MB      size of the compressed .npz the build writes
+  vec MB      pickled size of the vectorizer (what the app loads)
+  fit s       time to fit the vectorizer and build the matrix
+  query ms    mean query time
+
+Queries: a fixed list of typical metadata column names (DEFAULT_QUERIES),
+plus --sample N labels drawn from the ontology with a fixed seed, or
+--queries FILE (one query per line) instead.
+
+Usage:
+    python evaluate_search.py NCIT EFO                # terms from tfidf_cache/
+    python evaluate_search.py ../ontology_cache/X.owl # extract from a source
+    python evaluate_search.py NCIT --sample 200 --n-features 262144,1048576
+    python evaluate_search.py NCIT --prune-top-k 8,16 --prune-threshold 0.05
+    python evaluate_search.py NCIT --lsa-dim 64,128 --lsa-int8
+
+The "tfidf float32" row is the index exactly as the build now stores it;
+its overlap with the float64 reference is the float32 regression check.
+
+--lsa-dim adds a table for LSA embeddings of each given dimension (see
+build_all_caches.fit_lsa), queried through the app's semantic module:
+
+  blocked=exact  share of queries where the blocked top-N embedding search
+                 returns the same scores as the brute-force reference (rows
+                 may differ only among ties)
+  hybrid@N       overlap of the hybrid top-N (search_local's blend) with the
+                 TF-IDF top-N - how much the ranking moves
+  new            mean number of hybrid top-N terms with no TF-IDF score
+                 (reachable only through the embeddings)
+  emb MB         embeddings + components in memory
+  fit s, query ms  SVD time, mean hybrid query time
+"""
+
+import argparse
+import io
+import os
+import pickle
+import random
+import sys
+import time
+
+import numpy as np
+import ormsgpack
+from scipy import sparse
+from sklearn.metrics.pairwise import linear_kernel
+
+import build_all_caches as bac
+
+# The app's hybrid search code, so the evaluation scores exactly as it does.
+sys.path.insert(0, os.path.join(bac._REPO_ROOT, "src", "Maptology"))
+import semantic  # noqa: E402
+
+
+DEFAULT_QUERIES = [
+    "gender", "sex", "age", "date of birth", "body mass index", "height",
+    "weight", "blood pressure", "heart rate", "smoking status",
+    "diabetes mellitus", "hypertension", "race", "ethnicity", "country",
+    "education level", "income", "tumor stage", "breast carcinoma", "cancer",
+    "cell type", "tissue", "liver", "brain", "gene expression", "protein",
+    "disease", "treatment", "death", "survival time",
+]
+TOP_N = 10
+SAMPLE_SEED = 0
+
+
+def load_terms(source):
+    """Terms of an ontology: from its published cache if `source` is an
+    acronym, else extracted from the OWL file at that path."""
+    if os.path.exists(source):
+        _, terms, _ = bac.extract_terms(source, bac.source_size_mb(source))
+        return os.path.basename(source), terms
+    folder = bac.current_cache_dir(source)
+    if folder is None:
+        raise SystemExit("No cache for " + source + " and no such file")
+    with open(os.path.join(folder, source + "_terms.ormsgpack"), "rb") as f:
+        return source, ormsgpack.unpackb(f.read())
+
+
+def _pruned(terms, top_k=None, threshold=None):
+    vectorizer, matrix = bac.fit_index(terms, "tfidf")
+    return vectorizer, bac.compact_matrix(bac.prune_matrix(matrix, top_k, threshold))
+
+
+def build_variants(n_features_list, top_k_list=(), threshold_list=()):
+    """(name, fit function) pairs; the first one is the reference."""
+    variants = [("tfidf float64 (ref)", lambda terms: bac.fit_index(terms, "tfidf", dtype=np.float64)),
+                ("tfidf float32", lambda terms: bac.fit_index(terms, "tfidf"))]
+    for n_features in n_features_list:
+        variants.append(("hashing " + str(n_features),
+                         lambda terms, n=n_features: bac.fit_index(terms, "hashing", n)))
+    for top_k in top_k_list:
+        variants.append(("prune top-" + str(top_k),
+                         lambda terms, k=top_k: _pruned(terms, top_k=k)))
+    for threshold in threshold_list:
+        variants.append(("prune >= " + str(threshold),
+                         lambda terms, th=threshold: _pruned(terms, threshold=th)))
+    return variants
+
+
+def top_iris(vectorizer, matrix, terms, query, top_n=TOP_N):
+    scores = linear_kernel(vectorizer.transform([query]), matrix)[0]
+    order = scores.argsort()[::-1][:top_n]
+    return [terms[i]["iri"] for i in order if scores[i] > 0]
+
+
+def matrix_bytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def npz_bytes(matrix):
+    buf = io.BytesIO()
+    sparse.save_npz(buf, matrix)
+    return buf.tell()
+
+
+def evaluate(name, terms, queries, variants, top_n=TOP_N):
+    print(name + "  " + str(len(terms)) + " terms, " + str(len(queries)) + " queries", flush=True)
+    print("  " + "variant".ljust(22) + "overlap@" + str(top_n).ljust(4) + "exact".rjust(7)
+          + "nnz".rjust(11) + "matrix MB".rjust(11) + "npz MB".rjust(9) + "vec MB".rjust(9)
+          + "fit s".rjust(8) + "query ms".rjust(10))
+    reference = None
+    for variant_name, fit in variants:
+        t0 = time.perf_counter()
+        vectorizer, matrix = fit(terms)
+        fit_s = time.perf_counter() - t0
+        vec_mb = len(pickle.dumps(vectorizer)) / 1024.0 / 1024.0
+
+        t0 = time.perf_counter()
+        results = [top_iris(vectorizer, matrix, terms, q, top_n) for q in queries]
+        query_ms = (time.perf_counter() - t0) * 1000.0 / max(len(queries), 1)
+
+        if reference is None:
+            reference = results
+        overlaps = []
+        exact = 0
+        for mine, ref in zip(results, reference):
+            if not ref:
+                continue
+            overlaps.append(len(set(mine) & set(ref)) / float(len(ref)))
+            exact += set(mine) == set(ref)
+        overlap = sum(overlaps) / len(overlaps) if overlaps else 1.0
+        exact_share = exact / float(len(overlaps)) if overlaps else 1.0
+
+        print("  " + variant_name.ljust(22)
+              + str(round(overlap, 4)).ljust(12)
+              + str(round(exact_share, 3)).rjust(7)
+              + str(matrix.nnz).rjust(11)
+              + str(round(matrix_bytes(matrix) / 1024.0 / 1024.0, 1)).rjust(11)
+              + str(round(npz_bytes(matrix) / 1024.0 / 1024.0, 1)).rjust(9)
+              + str(round(vec_mb, 1)).rjust(9)
+              + str(round(fit_s, 1)).rjust(8)
+              + str(round(query_ms, 2)).rjust(10), flush=True)
+
+
+def lsa_bytes(lsa):
+    return sum(a.nbytes for a in lsa.values())
+
+
+def evaluate_lsa(name, terms, queries, dims, int8=False, top_n=TOP_N, weight=0.3):
+    print(name + "  LSA, hybrid weight " + str(weight), flush=True)
+    print("  " + "variant".ljust(22) + "blocked=exact".rjust(14) + ("hybrid@" + str(top_n)).rjust(11)
+          + "new".rjust(7) + "emb MB".rjust(9) + "fit s".rjust(8) + "query ms".rjust(10))
+    vectorizer, matrix = bac.fit_index(terms, "tfidf")
+    for dim in dims:
+        t0 = time.perf_counter()
+        lsa, _ = bac.fit_lsa(matrix, dim, int8)
+        fit_s = time.perf_counter() - t0
+
+        same = 0
+        overlaps = []
+        new = []
+        elapsed = 0.0
+        for query in queries:
+            query_vector = vectorizer.transform([query]).astype(np.float32, copy=False)
+            scores = linear_kernel(query_vector, matrix)[0]
+            lexical = [i for i in scores.argsort()[::-1][:top_n] if scores[i] > 0]
+            embedding = semantic.embed_query(lsa, query_vector)
+            if embedding is None:
+                same += 1
+                continue
+            _, blocked = semantic.top_k(lsa, embedding, top_n, block_rows=4096)
+            _, exact = semantic.top_k_exact(lsa, embedding, top_n)
+            same += len(blocked) == len(exact) and bool(np.allclose(blocked, exact))
+
+            t0 = time.perf_counter()
+            pool = top_n * 5
+            candidates = np.union1d(scores.argsort()[::-1][:pool],
+                                    semantic.top_k(lsa, embedding, pool)[0])
+            hybrid = semantic.hybrid_scores(scores[candidates],
+                                            semantic.scores_for_rows(lsa, embedding, candidates),
+                                            weight)
+            top = candidates[np.argsort(-hybrid)[:top_n]]
+            elapsed += time.perf_counter() - t0
+            if lexical:
+                overlaps.append(len(set(top.tolist()) & set(lexical)) / float(len(lexical)))
+            new.append(sum(1 for i in top if scores[i] <= 0))
+
+        label = "lsa " + str(dim) + (" int8" if int8 else "")
+        print("  " + label.ljust(22)
+              + str(round(same / float(max(len(queries), 1)), 3)).rjust(14)
+              + str(round(sum(overlaps) / len(overlaps), 3) if overlaps else "-").rjust(11)
+              + str(round(sum(new) / float(len(new)), 2) if new else "-").rjust(7)
+              + str(round(lsa_bytes(lsa) / 1024.0 / 1024.0, 1)).rjust(9)
+              + str(round(fit_s, 1)).rjust(8)
+              + str(round(elapsed * 1000.0 / max(len(new), 1), 2)).rjust(10), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sources", nargs="+", help="Acronyms (cached) or OWL file paths")
+    parser.add_argument("--queries", help="File with one query per line (replaces the default set)")
+    parser.add_argument("--sample", type=int, default=0,
+                        help="Also query this many labels sampled from each ontology")
+    parser.add_argument("--n-features", default=str(bac.HASHING_N_FEATURES),
+                        help="Comma-separated hashing bucket counts to evaluate")
+    parser.add_argument("--prune-top-k", default="",
+                        help="Comma-separated per-term top-k pruning levels to evaluate")
+    parser.add_argument("--prune-threshold", default="",
+                        help="Comma-separated global weight thresholds to evaluate")
+    parser.add_argument("--lsa-dim", default="",
+                        help="Comma-separated LSA embedding dimensions to evaluate")
+    parser.add_argument("--lsa-int8", action="store_true",
+                        help="Evaluate int8-quantized LSA embeddings")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            base_queries = [line.strip() for line in f if line.strip()]
+    else:
+        base_queries = list(DEFAULT_QUERIES)
+    n_features_list = [int(n) for n in args.n_features.split(",") if n.strip()]
+    top_k_list = [int(k) for k in args.prune_top_k.split(",") if k.strip()]
+    threshold_list = [float(t) for t in args.prune_threshold.split(",") if t.strip()]
+    variants = build_variants(n_features_list, top_k_list, threshold_list)
+    lsa_dims = [int(d) for d in args.lsa_dim.split(",") if d.strip()]
+
+    for source in args.sources:
+        name, terms = load_terms(source)
+        if not terms:
+            print(name + ": no terms", file=sys.stderr)
+            continue
+        queries = list(base_queries)
+        if args.sample:
+            rng = random.Random(SAMPLE_SEED)
+            picks = rng.sample(range(len(terms)), min(args.sample, len(terms)))
+            queries += [terms[i]["label"] for i in picks]
+        evaluate(name, terms, queries, variants, args.top_n)
+        if lsa_dims:
+            evaluate_lsa(name, terms, queries, lsa_dims, args.lsa_int8, args.top_n)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,19 +26,60 @@ BioPortal API (confirmed against https://data.bioontology.org/documentation):
 
 The API key is NOT hardcoded. Pass --apikey or set BIOPORTAL_APIKEY.
 
+Lookups run concurrently (--workers, default 8) over one pooled session that
+retries 429/5xx with backoff. --check answers are cached, keyed by request
+URL, in
+  ontology_cache/version_check_cache.json
+for --max-age seconds (default 6 hours), so a repeated --check is instant;
+--refresh ignores the cache. --record always asks BioPortal, since what it
+stores ends up in exported mappings. The session, base URL and cache file are
+parameters of every API function, so the checks can run against requests-mock:
+
+    session = make_session()
+    session.mount("http://bioportal.test/", requests_mock.Adapter())
+    check_for_updates(key, session=session, base_url="http://bioportal.test",
+                      cache_file="/tmp/version_check_cache.json")
+
 Usage:
     python version_check.py --record               # store versions for all
                                                    # ontologies in tfidf_cache/
     python version_check.py --record --only NCIT,EFO
     python version_check.py --check                # list ontologies that are
                                                    # newer on BioPortal
+    python version_check.py --check --refresh      # bypass the response cache
+    python version_check.py --verify               # offline: no API key needed
+
+--verify never talks to BioPortal. It stream-hashes every source OWL file and
+every cache file (in parallel) and compares them with the checksums that
+build_all_caches.py recorded in each generation's <ACRONYM>_manifest.json.
+It reports:
+  mismatched  source changed since the build (stale cache) or a cache file
+              whose checksum no longer matches (damaged cache)
+  missing     a listed source with no cache, a cache file or manifest missing
+  orphaned    a cache with no entry in ontology_list.tsv or whose source is gone
+and exits non-zero if anything was found, so it can gate a deploy.
+
+--delta (offline too) prints what the latest rebuild of each ontology
+changed: the <ACRONYM>_delta.json build_all_caches.py writes into a new
+generation (terms added, removed, relabeled, with a changed definition,
+compared by IRI with the generation it replaced).
+
+    python version_check.py --delta --only NCIT
 """
 
 import argparse
+import csv
+import hashlib
 import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_BASE = "https://data.bioontology.org"
 # Resolved against the repo root (this script lives in build/) rather than the
@@ -46,21 +87,49 @@ API_BASE = "https://data.bioontology.org"
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CACHE_DIR = os.path.join(_REPO_ROOT, "tfidf_cache")
 VERSIONS_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_versions.json")
+TSV_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_list.tsv")
+# Cache layout written by build_all_caches.py
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+MANIFEST_SUFFIX = "_manifest.json"
+DELTA_SUFFIX = "_delta.json"
+SHARED_BLOCK = "_shared"  # the shared-term block, not an ontology
+DELTA_SHOW = 10  # entries listed per kind of change
+HASH_CHUNK = 1024 * 1024
+RESPONSE_CACHE_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "version_check_cache.json")
 TIMEOUT = 30
+MAX_WORKERS = 8
+CACHE_MAX_AGE_SEC = 6 * 3600
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
 
 
 # ============================================================
 # BioPortal API
 # ============================================================
 
-def get_latest_submission(acronym, api_key):
+def make_session(pool_size=MAX_WORKERS):
+    """A session whose connection pool fits `pool_size` concurrent lookups and
+    which retries transient failures (honouring Retry-After)."""
+    session = requests.Session()
+    retry = Retry(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF,
+                  status_forcelist=RETRY_STATUSES, allowed_methods=("GET",),
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_latest_submission(acronym, api_key, session=None, base_url=API_BASE):
     """Return version info for the latest submission of one ontology, or None.
 
     Keys returned: submissionId, version, released, creationDate,
     submissionStatus (whatever BioPortal provides)."""
-    url = API_BASE + "/ontologies/" + acronym + "/latest_submission"
+    url = base_url + "/ontologies/" + acronym + "/latest_submission"
     try:
-        resp = requests.get(url, params={"apikey": api_key}, timeout=TIMEOUT)
+        resp = (session or requests).get(url, params={"apikey": api_key}, timeout=TIMEOUT)
     except requests.RequestException as e:
         print("  [" + acronym + "] request failed: " + str(e))
         return None
@@ -81,10 +150,49 @@ def get_latest_submission(acronym, api_key):
     }
 
 
-def list_ontologies(api_key):
+def get_latest_submissions(acronyms, api_key, session=None, base_url=API_BASE,
+                           max_age=CACHE_MAX_AGE_SEC, workers=MAX_WORKERS, cache_file=None):
+    """Latest-submission info for many ontologies: {acronym: info or None}.
+
+    Answers younger than `max_age` seconds come from the response cache
+    (`cache_file`, default RESPONSE_CACHE_FILE), keyed by request URL so
+    two endpoints never share answers; the rest are fetched concurrently
+    (at most `workers` at a time) and written back. Failed lookups are not
+    cached."""
+    cache_file = cache_file or RESPONSE_CACHE_FILE
+    cache = _load_response_cache(cache_file)
+    now = time.time()
+    results = {}
+    to_fetch = []
+    for acronym in acronyms:
+        entry = cache.get(_cache_key(base_url, acronym))
+        if entry is not None and max_age > 0 and now - entry.get("fetched_at", 0) < max_age:
+            results[acronym] = entry["info"]
+        else:
+            to_fetch.append(acronym)
+
+    if to_fetch:
+        session = session or make_session(workers)
+        lock = threading.Lock()
+
+        def fetch(acronym):
+            info = get_latest_submission(acronym, api_key, session, base_url)
+            with lock:
+                results[acronym] = info
+                if info is not None:
+                    cache[_cache_key(base_url, acronym)] = {"fetched_at": time.time(), "info": info}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(fetch, to_fetch))
+        _save_response_cache(cache, cache_file)
+
+    return results
+
+
+def list_ontologies(api_key, session=None, base_url=API_BASE):
     """Return the full list of ontologies (acronym + latest_submission link)."""
-    url = API_BASE + "/ontologies"
-    resp = requests.get(url, params={"apikey": api_key}, timeout=TIMEOUT)
+    url = base_url + "/ontologies"
+    resp = (session or requests).get(url, params={"apikey": api_key}, timeout=TIMEOUT)
     resp.raise_for_status()
     out = []
     for ont in resp.json():
@@ -116,12 +224,32 @@ def save_local_versions(versions):
         json.dump(versions, f, indent=2, ensure_ascii=False)
 
 
+def _cache_key(base_url, acronym):
+    return base_url + "/ontologies/" + acronym + "/latest_submission"
+
+
+def _load_response_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return {}
+
+
+def _save_response_cache(cache, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
 def _cached_acronyms():
     if not os.path.isdir(CACHE_DIR):
         return []
     out = []
     for name in os.listdir(CACHE_DIR):
-        if name.endswith(".bak"):
+        if name.endswith(".bak") or name == SHARED_BLOCK:
             continue
         if os.path.isdir(os.path.join(CACHE_DIR, name)):
             out.append(name)
@@ -132,15 +260,18 @@ def _cached_acronyms():
 # Operations
 # ============================================================
 
-def record_versions(api_key, acronyms=None):
+def record_versions(api_key, acronyms=None, session=None, base_url=API_BASE,
+                    workers=MAX_WORKERS, cache_file=None):
     """Fetch the current BioPortal version of each cached ontology and store it
-    locally. This is the version the exported LinkML files will reference."""
+    locally. This is the version the exported LinkML files will reference, so
+    it is always fetched fresh (the answers still refresh the response cache)."""
     if acronyms is None:
         acronyms = _cached_acronyms()
     versions = load_local_versions()
     print("Recording versions for " + str(len(acronyms)) + " ontologies...")
+    latest = get_latest_submissions(acronyms, api_key, session, base_url, 0, workers, cache_file)
     for acronym in acronyms:
-        info = get_latest_submission(acronym, api_key)
+        info = latest.get(acronym)
         if info is None:
             continue
         versions[acronym] = info
@@ -152,15 +283,17 @@ def record_versions(api_key, acronyms=None):
     return versions
 
 
-def check_for_updates(api_key, acronyms=None):
+def check_for_updates(api_key, acronyms=None, session=None, base_url=API_BASE,
+                      max_age=CACHE_MAX_AGE_SEC, workers=MAX_WORKERS, cache_file=None):
     """Compare locally-stored versions to the latest on BioPortal. Returns the
     list of acronyms that are out of date (or never recorded)."""
     if acronyms is None:
         acronyms = _cached_acronyms()
     local = load_local_versions()
+    latest = get_latest_submissions(acronyms, api_key, session, base_url, max_age, workers, cache_file)
     outdated = []
     for acronym in acronyms:
-        remote = get_latest_submission(acronym, api_key)
+        remote = latest.get(acronym)
         if remote is None:
             continue
         mine = local.get(acronym)
@@ -183,6 +316,150 @@ def check_for_updates(api_key, acronyms=None):
     return outdated
 
 
+# ============================================================
+# Offline verification (no BioPortal, no API key)
+# ============================================================
+
+def _published_dir(acronym):
+    """Folder of the generation currently published for an ontology, or None."""
+    folder = os.path.join(CACHE_DIR, acronym)
+    try:
+        with open(os.path.join(folder, CURRENT_FILE), "r", encoding="utf-8") as f:
+            generation = int(f.read().strip())
+        return os.path.join(folder, GENERATION_PREFIX + str(generation).zfill(6))
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(os.path.join(folder, acronym + "_tfidf_matrix.npz")):
+        return folder  # pre-generation layout
+    return None
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _listed_sources():
+    """{acronym: source file path} from ontology_list.tsv."""
+    if not os.path.exists(TSV_FILE):
+        return {}
+    out = {}
+    with open(TSV_FILE, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            acronym = (row.get("abbreviation") or "").strip()
+            if acronym:
+                out[acronym] = (row.get("file_path") or "").strip()
+    return out
+
+
+def _resolve(path):
+    if path and not os.path.isabs(path):
+        return os.path.join(_REPO_ROOT, path)
+    return path
+
+
+def verify_one(acronym, listed_source=None):
+    """Check one ontology's published cache. Returns a list of
+    (kind, message) with kind in mismatched / missing / orphaned."""
+    problems = []
+    folder = _published_dir(acronym)
+    if folder is None:
+        if listed_source and os.path.exists(_resolve(listed_source)):
+            problems.append(("missing", "no cache built for the listed source"))
+        return problems
+
+    manifest_path = os.path.join(folder, acronym + MANIFEST_SUFFIX)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        problems.append(("missing", "no build manifest (rebuild with build_all_caches.py --rebuild)"))
+        manifest = None
+
+    if manifest is not None:
+        for fname, expected in sorted((manifest.get("artifacts") or {}).items()):
+            path = os.path.join(folder, fname)
+            if not os.path.exists(path):
+                problems.append(("missing", "cache file missing: " + fname))
+            elif os.path.getsize(path) != expected.get("bytes") or _sha256(path) != expected.get("sha256"):
+                problems.append(("mismatched", "cache file checksum mismatch: " + fname))
+
+    if listed_source is None:
+        problems.append(("orphaned", "not listed in " + os.path.basename(TSV_FILE)))
+    source = _resolve(listed_source or (manifest or {}).get("source"))
+    if not source or not os.path.exists(source):
+        problems.append(("orphaned", "source file gone: " + str(source)))
+    elif manifest is not None and manifest.get("source_sha256"):
+        if os.path.abspath(source) != os.path.abspath(_resolve(manifest.get("source"))):
+            problems.append(("mismatched", "listed source differs from the one built: "
+                             + str(manifest.get("source"))))
+        elif os.path.getsize(source) != manifest.get("source_bytes") or \
+                _sha256(source) != manifest["source_sha256"]:
+            problems.append(("mismatched", "source changed since the build (built "
+                             + str(manifest.get("built_at")) + ")"))
+    return problems
+
+
+def verify_caches(acronyms=None, workers=MAX_WORKERS):
+    """Verify every cached and every listed ontology in parallel. Returns
+    {"mismatched": [...], "missing": [...], "orphaned": [...]}, each a list
+    of (acronym, message)."""
+    listed = _listed_sources()
+    if acronyms is None:
+        acronyms = sorted(set(_cached_acronyms()) | set(listed))
+    print("Verifying " + str(len(acronyms)) + " ontologies (offline)...")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda a: verify_one(a, listed.get(a)), acronyms))
+
+    report = {"mismatched": [], "missing": [], "orphaned": []}
+    for acronym, problems in zip(acronyms, results):
+        for kind, message in problems:
+            report[kind].append((acronym, message))
+
+    print("")
+    print("=" * 60)
+    n_problems = sum(len(v) for v in report.values())
+    if not n_problems:
+        print("All caches match their sources.")
+    for kind in ("mismatched", "missing", "orphaned"):
+        if report[kind]:
+            print(kind + " (" + str(len(report[kind])) + "):")
+            for acronym, message in report[kind]:
+                print("  " + acronym.ljust(12) + " " + message)
+    return report
+
+
+def show_deltas(acronyms=None):
+    """Print the release delta of each ontology's published generation.
+    Returns {acronym: counts} for those that have one."""
+    if acronyms is None:
+        acronyms = _cached_acronyms()
+    found = {}
+    for acronym in acronyms:
+        folder = _published_dir(acronym)
+        path = os.path.join(folder, acronym + DELTA_SUFFIX) if folder else None
+        if not path or not os.path.exists(path):
+            print(acronym.ljust(12) + " no release delta (first build, or built before deltas)")
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            delta = json.load(f)
+        counts = delta.get("counts") or {}
+        found[acronym] = counts
+        print(acronym.ljust(12) + " since generation " + str(delta.get("from_generation")) + ": "
+              + ", ".join(kind + " " + str(counts.get(kind, 0))
+                          for kind in ("added", "removed", "label_changed", "definition_changed")))
+        for kind in ("added", "removed", "label_changed"):
+            for entry in delta.get(kind, [])[:DELTA_SHOW]:
+                print("    " + kind.ljust(14) + " " + " | ".join(str(x) for x in entry))
+            if len(delta.get(kind, [])) > DELTA_SHOW:
+                print("    " + kind.ljust(14) + " ... " + str(len(delta[kind]) - DELTA_SHOW) + " more")
+    return found
+
+
 def _get_api_key(arg_key):
     return arg_key or os.environ.get("BIOPORTAL_APIKEY", "").strip()
 
@@ -191,22 +468,40 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--record", action="store_true", help="Record current versions of cached ontologies")
     parser.add_argument("--check", action="store_true", help="List ontologies that are newer on BioPortal")
+    parser.add_argument("--verify", action="store_true",
+                        help="Offline: compare sources and cache files with their build manifests")
+    parser.add_argument("--delta", action="store_true",
+                        help="Offline: show what the latest rebuild of each ontology changed")
     parser.add_argument("--only", help="Comma-separated acronyms (default: all cached)")
     parser.add_argument("--apikey", help="BioPortal API key (or set BIOPORTAL_APIKEY)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="Concurrent BioPortal requests (default " + str(MAX_WORKERS) + ")")
+    parser.add_argument("--max-age", type=int, default=CACHE_MAX_AGE_SEC,
+                        help="Reuse cached responses younger than this many seconds")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the response cache (--check)")
     args = parser.parse_args()
 
-    api_key = _get_api_key(args.apikey)
-    if not api_key:
-        raise SystemExit("No API key. Pass --apikey or set BIOPORTAL_APIKEY.")
-
     only = None
     if args.only:
         only = [a.strip() for a in args.only.split(",") if a.strip()]
 
+    if args.verify:
+        report = verify_caches(only, args.workers)
+        sys.exit(1 if any(report.values()) else 0)
+    if args.delta:
+        show_deltas(only)
+        return
+
+    api_key = _get_api_key(args.apikey)
+    if not api_key:
+        raise SystemExit("No API key. Pass --apikey or set BIOPORTAL_APIKEY.")
+
+    max_age = 0 if args.refresh else args.max_age
+    session = make_session(args.workers)
     if args.record:
-        record_versions(api_key, only)
+        record_versions(api_key, only, session, workers=args.workers)
     elif args.check:
-        check_for_updates(api_key, only)
+        check_for_updates(api_key, only, session, max_age=max_age, workers=args.workers)
     else:
         parser.print_help()
 
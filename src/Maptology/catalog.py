@@ -0,0 +1,141 @@
+"""
+Ontology catalog: which ontologies have a published TF-IDF cache, their full
+names and what each one costs.
+
+build_all_caches.py writes tfidf_cache/catalog.json after every build run:
+
+    {"generated_at": "...",
+     "ontologies": [{"acronym": "NCIT", "name": "...", "n_terms": 180000,
+                     "matrix_bytes": 41000000, "memory_bytes": 160000000,
+                     "generation": 3,
+                     "built_at": "2025-01-01T00:00:00Z"}, ...]}
+
+This module is the single in-process copy of it, shared by search
+(tfidf_search), the ontology picker, mapping import and export. It is read
+once and re-read only when the file changes (checked at most every
+CHECK_INTERVAL_SEC), so startup does not parse ontology_list.tsv or stat a
+folder per ontology. Deployments without a catalog.json fall back to the TSV
+plus a published-generation check, as before.
+"""
+
+import csv
+import json
+import os
+import time
+
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_DIR = os.path.join(_REPO_ROOT, "tfidf_cache")
+CATALOG_FILE = os.path.join(CACHE_DIR, "catalog.json")
+TSV_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_list.tsv")
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+CHECK_INTERVAL_SEC = 30
+
+_state = {"mtime": None, "checked_at": None, "entries": None}
+
+
+def published_generation(acronym, cache_dir=CACHE_DIR):
+    """Generation currently published for an ontology (0 for a cache in the
+    pre-generation layout), or None if it has no cache."""
+    folder = os.path.join(cache_dir, acronym)
+    try:
+        with open(os.path.join(folder, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        pass
+    if os.path.exists(os.path.join(folder, acronym + "_tfidf_matrix.npz")):
+        return 0
+    return None
+
+
+def generation_folder(acronym, generation, cache_dir=CACHE_DIR):
+    """Folder holding one generation's cache files (the ontology's own folder
+    for a cache in the pre-generation layout)."""
+    folder = os.path.join(cache_dir, acronym)
+    if generation == 0 and not os.path.exists(os.path.join(folder, CURRENT_FILE)):
+        return folder
+    return os.path.join(folder, GENERATION_PREFIX + str(generation).zfill(6))
+
+
+def _entries_from_tsv():
+    """Fallback when no catalog.json exists: TSV rows with a published cache."""
+    entries = {}
+    if not os.path.exists(TSV_FILE):
+        print("Error: neither " + CATALOG_FILE + " nor " + TSV_FILE + " found")
+        return entries
+    with open(TSV_FILE, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            acronym = str(row.get("abbreviation") or "").strip()
+            if not acronym:
+                continue
+            generation = published_generation(acronym)
+            if generation is None:
+                continue
+            entries[acronym] = {
+                "acronym": acronym,
+                "name": str(row.get("name") or acronym),
+                "n_terms": None,
+                "matrix_bytes": None,
+                "memory_bytes": None,
+                "generation": generation,
+                "built_at": None,
+            }
+    return entries
+
+
+def load_catalog():
+    """{acronym: entry} for every ontology with a published cache."""
+    now = time.monotonic()
+    checked_at = _state["checked_at"]
+    if _state["entries"] is not None and checked_at is not None \
+            and now - checked_at < CHECK_INTERVAL_SEC:
+        return _state["entries"]
+    _state["checked_at"] = now
+
+    try:
+        mtime = os.path.getmtime(CATALOG_FILE)
+    except OSError:
+        mtime = None
+    if _state["entries"] is not None and mtime == _state["mtime"] and mtime is not None:
+        return _state["entries"]
+
+    entries = None
+    if mtime is not None:
+        try:
+            with open(CATALOG_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = {e["acronym"]: e for e in data.get("ontologies", [])}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print("Error reading " + CATALOG_FILE + ": " + str(e))
+    if entries is None:
+        entries = _entries_from_tsv()
+
+    _state["entries"] = entries
+    _state["mtime"] = mtime
+    return entries
+
+
+def ontology_list():
+    """[{acronym, name, description, n_terms, matrix_bytes, memory_bytes,
+    generation}],
+    sorted by acronym (the shape the ontology picker expects)."""
+    out = []
+    for acronym, entry in sorted(load_catalog().items()):
+        item = dict(entry)
+        item.setdefault("name", acronym)
+        item["description"] = ""
+        out.append(item)
+    return out
+
+
+def ontology_entry(acronym):
+    return load_catalog().get(acronym)
+
+
+def ontology_name(acronym):
+    """Full name of an ontology, or the acronym itself if unknown."""
+    entry = load_catalog().get(acronym)
+    if entry and entry.get("name"):
+        return entry["name"]
+    return acronym
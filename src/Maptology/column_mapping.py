@@ -1,7 +1,7 @@
 import hashlib
 
 import streamlit as st
-from ontology import search_ontology, search_bioportal_manual_column, get_ontology_details
+from ontology import search_ontology, search_bioportal_manual_column, get_ontology_details, get_term_ancestors
 from mapping import (
     on_column_select,
     is_column_term_mapped,
@@ -52,7 +52,11 @@ def _render_term_checklist(df, key_prefix, column):
             # is the same widget family as the ℹ️ button, which already lines up
             # with the checkbox, so it sits on the same line. Plain markdown text
             # centers within its block and drifts slightly lower than the widgets.
-            st.button(str(row['Ontology Name']), key="ont_" + unique_key, disabled=True, type="tertiary")
+            # Terms imported by several ontologies list the others on hover.
+            others = [o for o in (row.get('Ontologies') or []) if o != row['Ontology Name']]
+            st.button(str(row['Ontology Name']) + (" +" + str(len(others)) if others else ""),
+                      key="ont_" + unique_key, disabled=True, type="tertiary",
+                      help=("Also in: " + ", ".join(others)) if others else None)
         sep2.markdown(DIVIDER, unsafe_allow_html=True)
         with info_btn_col:
             if st.button("ℹ️", key="prev_" + unique_key, help="View term details", type="tertiary"):
@@ -64,6 +68,7 @@ def _render_term_checklist(df, key_prefix, column):
                     "definition": row['Definition'],
                     "term_uri": row['Ontology Term URI'],
                     "synonyms": row.get('Synonyms', []),
+                    "ancestors": get_term_ancestors(row['Ontology Name'], row['Ontology Term URI']),
                 })
 
         if result != is_checked:
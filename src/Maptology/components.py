@@ -42,6 +42,9 @@ def _render_term_details(info):
     synonyms = info.get('synonyms') or []
     if synonyms:
         st.markdown(f"**Synonyms:** {', '.join(str(s) for s in synonyms)}")
+    ancestors = info.get('ancestors') or []
+    if ancestors:
+        st.markdown(f"**Ancestors** (top-level first): {' › '.join(str(a) for a in ancestors)}")
     encoded_uri = urllib.parse.quote(info['term_uri'], safe='')
     detail_url = f"https://bioportal.bioontology.org/ontologies/{info['ontology_abbr']}?p=classes&conceptid={encoded_uri}"
     st.caption(f"[Open this term on BioPortal ↗]({detail_url})")
@@ -51,10 +54,23 @@ def _render_term_details(info):
 def show_term_modal(info):
     """Show one term's details in a modal popup. Dismissed with the built-in X
     in the corner or the Close button. Replaces the always-on side panel so the
-    term list can use the full page width."""
+    term list can use the full page width. "Suggest only terms under this one"
+    limits every search to the term's subtree (see ontology._search_selected)."""
     _render_term_details(info)
-    if st.button("Close", key="close_term_modal"):
-        st.rerun()
+    close_col, subtree_col = st.columns([1, 3])
+    with close_col:
+        if st.button("Close", key="close_term_modal"):
+            st.rerun()
+    with subtree_col:
+        if st.button("Suggest only terms under this one", key="subtree_term_modal"):
+            st.session_state.subtree_root = {
+                "iri": info['term_uri'],
+                "label": info['pref_label'],
+                "ontology": info['ontology_abbr'],
+            }
+            # Re-run the automatic searches with the restriction
+            st.session_state.ontologies_changed = True
+            st.rerun()
 
 
 def render_preview_panel(preview_key):
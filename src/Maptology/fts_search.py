@@ -0,0 +1,122 @@
+"""
+On-disk search backend: SQLite with an FTS5 full-text index, for deployments
+that cannot hold the TF-IDF matrices in memory. Selected with
+MAPTOLOGY_SEARCH_BACKEND=fts (tfidf_search.search_local and get_term_by_iri
+then answer from these files).
+
+build_all_caches.py writes <ACR>_terms.sqlite into each generation of the
+ontologies with "fts": true in ontology_cache/build_options.json:
+
+    terms(row INTEGER PRIMARY KEY, iri, label, synonyms, definition)
+        row = the term's index in <ACR>_terms.ormsgpack, synonyms a JSON list
+    terms_iri   index on terms(iri)
+    terms_fts   FTS5 over label, synonyms, definition (external content =
+                terms, unicode61 tokenizer without diacritics)
+
+Queries are the query's words OR-ed together and ranked by BM25 with
+label > synonyms > definition weights (FTS_WEIGHTS). Scores are -bm25, so
+higher is better like the TF-IDF cosine, but unbounded; search_local divides
+them by the query's best score before merging them with TF-IDF results.
+
+Generation folders never change once published, so the files are opened
+read-only and immutable (no locking); each thread keeps its own connections.
+Memory is SQLite's page cache (FTS_CACHE_KB per connection), not the index.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from urllib.parse import quote
+
+
+FTS_SUFFIX = "_terms.sqlite"
+FTS_WEIGHTS = (4.0, 2.0, 0.25)  # bm25 weights: label, synonyms, definition
+FTS_CACHE_KB = 8192
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_local = threading.local()
+
+
+def fts_path(acronym, folder):
+    return os.path.join(folder, acronym + FTS_SUFFIX)
+
+
+def _connect(path):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        uri = "file:" + quote(os.path.abspath(path)) + "?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.execute("PRAGMA cache_size = -" + str(FTS_CACHE_KB))
+        connections[path] = conn
+    return conn
+
+
+def match_expression(query):
+    """FTS5 query for free text: every word quoted (so FTS5 syntax in user
+    input is taken literally) and OR-ed, like the TF-IDF backend's bag of
+    words. None if the query has no words."""
+    words = []
+    for word in _WORD_RE.findall(query.lower()):
+        if word not in words:
+            words.append(word)
+    if not words:
+        return None
+    return " OR ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def _term(label, iri, synonyms, definition):
+    return {
+        "label": label,
+        "iri": iri,
+        "synonyms": json.loads(synonyms) if synonyms else [],
+        "definition": definition,
+    }
+
+
+def search(path, query, limit, rows=None):
+    """[(row, score, term)] of the best `limit` matches, best first.
+    `rows`: only match these term rows (e.g. one subtree of the hierarchy)."""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    params = FTS_WEIGHTS + (expression,)
+    where = " WHERE terms_fts MATCH ?"
+    if rows is not None:
+        where += " AND t.row IN (SELECT value FROM json_each(?))"
+        params += (json.dumps([int(r) for r in rows]),)
+    sql = ("SELECT t.row, -bm25(terms_fts, ?, ?, ?) AS score, t.label, t.iri, t.synonyms, t.definition"
+           " FROM terms_fts JOIN terms AS t ON t.row = terms_fts.rowid"
+           + where + " ORDER BY score DESC, t.row LIMIT ?")
+    rows = _connect(path).execute(sql, params + (int(limit),)).fetchall()
+    return [(row, score, _term(label, iri, synonyms, definition))
+            for row, score, label, iri, synonyms, definition in rows]
+
+
+def row_of_iri(path, iri):
+    """Row (term index) of the first term with this IRI, or None."""
+    found = _connect(path).execute(
+        "SELECT row FROM terms WHERE iri = ? ORDER BY row LIMIT 1", (iri,)).fetchone()
+    return None if found is None else found[0]
+
+
+def term_at(path, row):
+    found = _connect(path).execute(
+        "SELECT label, iri, synonyms, definition FROM terms WHERE row = ?", (int(row),)).fetchone()
+    if found is None:
+        return None
+    return _term(*found)
+
+
+def term_by_iri(path, iri):
+    """The term with this IRI (first row if repeated), or None."""
+    found = _connect(path).execute(
+        "SELECT label, iri, synonyms, definition FROM terms WHERE iri = ? ORDER BY row LIMIT 1",
+        (iri,)).fetchone()
+    if found is None:
+        return None
+    return _term(*found)
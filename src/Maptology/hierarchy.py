@@ -0,0 +1,69 @@
+"""
+Class hierarchy of one ontology with a precomputed ancestor closure, built by
+build_all_caches.py from the extracted rdfs:subClassOf links (named
+superclasses only) and stored as <ACR>_hierarchy.npz. Rows are term indices
+in <ACR>_terms.ormsgpack:
+
+    parent_indptr / parent_indices  int32   direct parents of each row (CSR)
+    post             int32 (n,)   postorder number of each row in a DFS from
+                                  the roots
+    order            int32 (n,)   rows by postorder (order[post[i]] == i)
+    interval_indptr  int32 (n+1,) per row, its slice of interval_lo/hi
+    interval_lo/hi   int32        closed postorder ranges; row j is a
+                                  descendant of row i (or i itself) iff
+                                  post[j] falls in one of i's ranges
+    depth            int32 (n,)   fewest subClassOf steps up to a root
+
+A tree needs one range per row (its DFS subtree); a term with several
+parents adds the ranges of the branches reached through the others. Terms on
+a subclass cycle share consecutive numbers and the same ranges.
+Both questions the app asks are answered from these arrays without walking
+the graph: a subtree is a few slices of `order`, the ancestors of a row are
+the rows owning a range that contains its postorder number.
+"""
+
+import os
+
+import numpy as np
+
+
+HIERARCHY_SUFFIX = "_hierarchy.npz"
+
+
+def hierarchy_path(acronym, folder):
+    return os.path.join(folder, acronym + HIERARCHY_SUFFIX)
+
+
+def load_hierarchy(path):
+    """The arrays of an <ACR>_hierarchy.npz as a dict, plus interval_owner
+    (the row each range belongs to)."""
+    with np.load(path) as npz:
+        h = {name: npz[name] for name in npz.files}
+    h["interval_owner"] = np.repeat(np.arange(len(h["post"]), dtype=np.int32),
+                                    np.diff(h["interval_indptr"]))
+    return h
+
+
+def parent_rows(h, row):
+    return h["parent_indices"][h["parent_indptr"][row]:h["parent_indptr"][row + 1]]
+
+
+def descendant_rows(h, row):
+    """Rows of the term and everything below it (unsorted)."""
+    start, stop = h["interval_indptr"][row], h["interval_indptr"][row + 1]
+    order = h["order"]
+    slices = [order[lo:hi + 1] for lo, hi in zip(h["interval_lo"][start:stop],
+                                                  h["interval_hi"][start:stop])]
+    if len(slices) == 1:
+        return slices[0]
+    return np.concatenate(slices)
+
+
+def ancestor_rows(h, row):
+    """Rows of every ancestor of the term (not the term itself), roots first
+    (by depth, then row)."""
+    p = h["post"][row]
+    hits = np.flatnonzero((h["interval_lo"] <= p) & (h["interval_hi"] >= p))
+    rows = np.unique(h["interval_owner"][hits])
+    rows = rows[rows != row]
+    return rows[np.lexsort((rows, h["depth"][rows]))]
@@ -0,0 +1,654 @@
+"""
+Uploaded data files, parsed once and shared.
+
+Streamlit reruns main.py on every widget interaction (each checkbox in the
+term lists calls st.rerun()), and the upload used to be parsed again with
+pd.read_csv / pd.read_excel every time. Parsed frames are now kept in one
+process-wide LRU cache keyed by the SHA-256 of the file content plus the
+reader options, so:
+
+  - a rerun of the same session reuses its frame without hashing anything
+    (the session remembers the upload's file_id and cache key),
+  - the same file uploaded in another session is parsed only once while
+    any session uses it.
+
+Each session pins the entry it is using; pinned entries are never evicted.
+A session unpins when its file is removed or replaced; a pin also lapses
+after PIN_TTL_SEC without a rerun (a closed browser tab never says goodbye).
+When an entry's last pin goes, its memory is released: only the most
+recently used unpinned frames, at most CACHE_UNPINNED_MAX_ENTRIES of them
+and CACHE_UNPINNED_MAX_BYTES (MAPTOLOGY_UPLOAD_CACHE_MB, default 64) in
+total, are kept, so a small file removed and uploaded again is not parsed
+again; a larger one is dropped at once.
+
+Sessions get a shallow copy of the cached frame, so replacing a column in one
+session never shows up in another. Column profiles (unique values, detected
+type, ranges; utils.get_column_profile) are kept in the same entry and
+counted in its size, so a parsed column is profiled once per file however
+many reruns and sessions look at it; a column a session converts to another
+type gets a profile of its own in that session.
+
+With pyarrow installed (optional), CSV/TSV is parsed by pandas' multithreaded
+pyarrow engine (the C parser still reads files where an unquoted field starts
+with a blank or the header has repeated or blank names), Parquet and Feather
+uploads are accepted, and text columns are stored as Arrow-backed strings
+(one contiguous buffer per column instead of a Python object per cell).
+Without it, the C parser and pandas' own string dtype are used and
+Parquet/Feather uploads are refused.
+
+.xlsx workbooks are streamed. openpyxl reads only the workbook part (sheet
+list, date epoch) and the styles (which cells are dates); the shared strings
+and the chosen sheet's XML are parsed here row by row, and each cell value is
+appended straight to its column's list. Nothing else is built: no workbook
+object model, no cell objects, no other sheet (openpyxl's read-only mode
+still makes a cell object per cell, then pandas re-parses the rows). Columns
+are typed at the end with the conversions pd.read_excel makes (first row as
+header, "Unnamed: i" and "a.1" names, trailing blank rows dropped, NA
+strings, integral numbers as ints, numeric text as numbers, booleans beside
+blanks or numbers as 1.0 / 0.0), so a sheet reads the same as before, only
+faster and with progress reported. The streaming relies on openpyxl
+internals; should they move, .xlsx falls back to pd.read_excel. Legacy .xls
+(binary, no XML to stream) always goes through pd.read_excel (xlrd).
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# The .xlsx streaming reader uses openpyxl internals (requirements.txt pins
+# the 3.1 series); if they move, .xlsx goes through pd.read_excel instead.
+try:
+    from openpyxl.reader.excel import ExcelReader
+    from openpyxl.styles.stylesheet import apply_stylesheet
+    from openpyxl.utils.cell import column_index_from_string
+    from openpyxl.utils.datetime import from_excel, from_ISO8601
+    from openpyxl.xml.constants import SHARED_STRINGS, SHEET_MAIN_NS
+    XLSX_STREAMING = True
+except ImportError:
+    XLSX_STREAMING = False
+    SHEET_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+
+# Frames no session uses that are kept for a re-upload
+CACHE_UNPINNED_MAX_BYTES = int(float(os.environ.get("MAPTOLOGY_UPLOAD_CACHE_MB", "64")) * 1024 * 1024)
+CACHE_UNPINNED_MAX_ENTRIES = 4
+PIN_TTL_SEC = 3600
+
+# The pyarrow CSV engine has no skipinitialspace; it is used only when no
+# field starts with a blank (nothing to skip). Blanks inside quoted text, as in
+# "Smith, John", do not count.
+_ARROW_CSV_UNSAFE = {",": (b", ", b"\n "), "\t": (b"\t ", b"\n ")}
+
+# Text cells pd.read_excel reads as missing (pandas' default na_values)
+NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+EXCEL_PROGRESS_ROWS = 5000  # report progress every this many rows
+_ROW_TAG = "{" + SHEET_MAIN_NS + "}row"
+_CELL_TAG = "{" + SHEET_MAIN_NS + "}c"
+_VALUE_TAG = "{" + SHEET_MAIN_NS + "}v"
+_INLINE_TAG = "{" + SHEET_MAIN_NS + "}is"
+_SI_TAG = "{" + SHEET_MAIN_NS + "}si"
+_TEXT_TAG = "{" + SHEET_MAIN_NS + "}t"
+_RUN_TAG = "{" + SHEET_MAIN_NS + "}r"
+
+_lock = threading.Lock()
+_frames = OrderedDict()  # key -> {"df", "bytes", "name", "pins": {session: last seen}, "profiles"}
+
+
+def reader_options(file_name, sheet=None):
+    """How a file is parsed, from its name (and for a workbook the sheet,
+    None = the first); None for an unsupported format. Part of the cache
+    key, so a change here never serves a stale parse."""
+    name = file_name.lower()
+    if name.endswith(".csv"):
+        return {"format": "csv", "sep": ",", "skipinitialspace": True}
+    if name.endswith(".tsv"):
+        return {"format": "csv", "sep": "\t", "skipinitialspace": True}
+    if name.endswith(".xlsx"):
+        return {"format": "xlsx", "sheet": sheet}
+    if name.endswith(".xls"):
+        return {"format": "xls", "sheet": sheet}
+    if name.endswith(".parquet"):
+        return {"format": "parquet"}
+    if name.endswith(".feather"):
+        return {"format": "feather"}
+    return None
+
+
+def content_key(data, options):
+    h = hashlib.sha256(data)
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _arrow_csv_ok(data, options):
+    if not PYARROW_AVAILABLE:
+        return False
+    if not options["skipinitialspace"]:
+        return True
+    unsafe = _ARROW_CSV_UNSAFE.get(options["sep"])
+    if unsafe is None or data[:1] == b" ":
+        return False
+    # Every other piece between double quotes is outside quoted text (an
+    # escaped "" opens and closes an empty piece)
+    unquoted = data.split(b'"')[::2]
+    return not any(pattern in piece for piece in unquoted for pattern in unsafe)
+
+
+def _arrow_strings(df):
+    """Text columns as Arrow-backed strings (numeric, datetime and mixed
+    columns are left alone)."""
+    if not PYARROW_AVAILABLE:
+        return df
+    arrow = pd.StringDtype("pyarrow")
+    for column in df.columns:
+        dtype = df[column].dtype
+        if dtype == arrow:
+            continue
+        if isinstance(dtype, pd.StringDtype) or (
+                dtype == object and pd.api.types.infer_dtype(df[column], skipna=True) == "string"):
+            df[column] = df[column].astype(arrow)
+    return df
+
+
+def _workbook_reader(data):
+    """openpyxl's reader with the manifest and workbook part read (sheet
+    list, epoch), and no sheet touched."""
+    reader = ExcelReader(io.BytesIO(data), read_only=True, data_only=True, keep_links=False)
+    reader.read_manifest()
+    reader.read_workbook()
+    return reader
+
+
+def _worksheets(reader):
+    """[(name, part path)] of the worksheets (chartsheets have no cells)."""
+    return [(ws.name, rel.target) for ws, rel in reader.parser.find_sheets()
+            if "chartsheet" not in rel.Type]
+
+
+def sheet_names(data, file_name):
+    """Sheet names of an uploaded workbook, in order, without reading any
+    sheet ([] for other formats or an unreadable workbook)."""
+    name = file_name.lower()
+    try:
+        if name.endswith(".xlsx") and XLSX_STREAMING:
+            reader = _workbook_reader(data)
+            try:
+                return [ws_name for ws_name, _ in _worksheets(reader)]
+            finally:
+                reader.archive.close()
+        if name.endswith((".xlsx", ".xls")):
+            return list(pd.ExcelFile(io.BytesIO(data)).sheet_names)
+    except Exception as e:
+        print("Error listing sheets of " + file_name + ": " + str(e))
+    return []
+
+
+def _excel_column(values):
+    """One column of cell values (None = missing) as a Series typed the way
+    pd.read_excel would type it."""
+    values = [None if type(v) is str and v in NA_STRINGS else v for v in values]
+    series = pd.Series(values, dtype=object)
+    kinds = set(type(v) for v in values if v is not None)
+    if not kinds:
+        return series.astype(float) if values else series
+    numbers = series
+    if bool in kinds and (len(kinds) > 1 or any(v is None for v in values)):
+        # booleans next to numbers or blanks are read as 1 / 0
+        numbers = pd.Series([int(v) if type(v) is bool else v for v in values], dtype=object)
+    if kinds <= {bool, int, float, str} and (str in kinds or numbers is not series):
+        try:  # numeric text is read as numbers
+            return pd.to_numeric(numbers)
+        except (ValueError, TypeError):
+            pass
+    series = series.infer_objects()
+    if series.dtype == object:
+        series = series.mask(series.isna(), np.nan)  # missing as NaN, not None
+    return series
+
+
+def _column_names(header, width):
+    """Header cells as column names, duplicates renamed the way pandas'
+    parsers rename them (a, a.1, a.2, skipping names already taken)."""
+    names = []
+    unnamed = []
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        if value is None or value == "":
+            names.append("Unnamed: " + str(i))
+            unnamed.append(i)
+        else:
+            names.append(value)
+    counts = {}
+    for i in [i for i in range(width) if i not in unnamed] + unnamed:
+        name = old = names[i]
+        count = counts.get(name, 0)
+        if count > 0:
+            while count > 0:
+                counts[old] = count + 1
+                name = str(old) + "." + str(count)
+                count = count + 1 if name in names else counts.get(name, 0)
+            names[i] = name
+        counts[name] = count + 1
+    return names
+
+
+def _text(el):
+    """Text of a string item (<si> or an inline <is>): its plain text and
+    rich text runs joined, phonetic runs left out (openpyxl's Text.content,
+    without building a Text object)."""
+    parts = []
+    for child in el:
+        if child.tag == _TEXT_TAG:
+            parts.append(child.text or "")
+        elif child.tag == _RUN_TAG:
+            parts.append(child.findtext(_TEXT_TAG) or "")
+    return "".join(parts)
+
+
+def _shared_strings(reader):
+    """The shared string table, as openpyxl's read_string_table reads it."""
+    ct = reader.package.find(SHARED_STRINGS)
+    if ct is None:
+        return []
+    strings = []
+    with reader.archive.open(ct.PartName[1:]) as src:
+        for _, el in ET.iterparse(src):
+            if el.tag != _SI_TAG:
+                continue
+            strings.append(_text(el).replace("x005F_", ""))
+            el.clear()
+    return strings
+
+
+def _cell_value(cell, strings, epoch, date_styles, timedelta_styles):
+    """Value of one <c> element, converted as openpyxl's worksheet reader
+    and then pd.read_excel convert it (errors are None, integral numbers
+    ints)."""
+    data_type = cell.get("t", "n")
+    if data_type == "inlineStr":
+        child = cell.find(_INLINE_TAG)
+        return None if child is None else _text(child)
+    value = cell.findtext(_VALUE_TAG) or None
+    if value is None:
+        return None
+    if data_type == "n":
+        if "." in value or "e" in value or "E" in value:
+            value = float(value)
+            if value.is_integer():
+                value = int(value)
+        else:
+            value = int(value)
+        style = cell.get("s")
+        if style and int(style) in date_styles:
+            try:
+                return from_excel(value, epoch, timedelta=int(style) in timedelta_styles)
+            except (OverflowError, ValueError):
+                return None
+        return value
+    if data_type == "s":
+        return strings[int(value)]
+    if data_type == "b":
+        return bool(int(value))
+    if data_type == "str":
+        return value
+    if data_type == "d":
+        return from_ISO8601(value)
+    return None  # "e": #DIV/0!, #REF!, ...
+
+
+def _read_xlsx(data, sheet, progress=None):
+    """Stream one sheet into column lists. openpyxl reads the workbook and
+    styles; the shared strings and the sheet part itself are parsed here,
+    row by row (openpyxl's read-only worksheet builds a cell object per cell
+    and first scans a sheet without a <dimension> for its size). progress(rows
+    read, fraction of the sheet read) is called every EXCEL_PROGRESS_ROWS
+    rows. Returns None if this openpyxl keeps the style lookups elsewhere.
+    """
+    reader = _workbook_reader(data)
+    try:
+        worksheets = _worksheets(reader)
+        if not worksheets:
+            raise ValueError("The workbook has no worksheet")
+        if sheet is None:
+            part = worksheets[0][1]
+        else:
+            part = dict(worksheets).get(sheet)
+            if part is None:
+                raise ValueError("No sheet named " + sheet)
+        strings = _shared_strings(reader)
+        apply_stylesheet(reader.archive, reader.wb)
+        epoch = reader.wb.epoch
+        date_styles = getattr(reader.wb, "_date_formats", None)
+        timedelta_styles = getattr(reader.wb, "_timedelta_formats", None)
+        if date_styles is None or timedelta_styles is None:
+            return None
+        size = reader.archive.getinfo(part).file_size or 1
+
+        header = None
+        columns = []
+        n_rows = 0
+        blank = 0      # blank rows not yet added (trailing blank rows are dropped)
+        expected = 1   # sheet row number of the next row
+        with reader.archive.open(part) as src:
+            for _, el in ET.iterparse(src):
+                if el.tag != _ROW_TAG:
+                    continue
+                number = el.get("r")
+                number = int(number) if number else expected
+                gap = number - expected
+                expected = number + 1
+                row = []
+                for cell in el:
+                    if cell.tag != _CELL_TAG:
+                        continue
+                    ref = cell.get("r")
+                    if ref:
+                        column = column_index_from_string(ref.rstrip("0123456789")) - 1
+                        if column > len(row):
+                            row.extend([None] * (column - len(row)))
+                    row.append(_cell_value(cell, strings, epoch, date_styles, timedelta_styles))
+                el.clear()
+                while row and (row[-1] is None or row[-1] == ""):
+                    row.pop()
+                if header is None:
+                    # the first sheet row is the header, even if blank
+                    if not gap:
+                        header = row
+                        continue
+                    header, gap = [], gap - 1
+                blank += gap  # rows the sheet leaves out are blank
+                if not row:
+                    blank += 1
+                    continue
+                if blank:
+                    for column in columns:
+                        column.extend([None] * blank)
+                    n_rows += blank
+                    blank = 0
+                if len(row) > len(columns):
+                    columns.extend([None] * n_rows for _ in range(len(row) - len(columns)))
+                for column, value in zip(columns, row):
+                    column.append(value)
+                for column in columns[len(row):]:
+                    column.append(None)
+                n_rows += 1
+                if progress is not None and n_rows % EXCEL_PROGRESS_ROWS == 0:
+                    progress(n_rows, min(src.tell() / float(size), 1.0))
+    finally:
+        reader.archive.close()
+    if header is None:
+        raise ValueError("The sheet is empty")
+    width = max(len(header), len(columns))
+    columns.extend([None] * n_rows for _ in range(width - len(columns)))
+    names = _column_names(header, width)
+    return pd.DataFrame({name: _excel_column(column) for name, column in zip(names, columns)},
+                        columns=names)
+
+
+def _parse(data, options, progress=None):
+    fmt = options["format"]
+    if fmt == "csv":
+        df = None
+        if _arrow_csv_ok(data, options):
+            df = pd.read_csv(io.BytesIO(data), sep=options["sep"], engine="pyarrow")
+            if df.columns.duplicated().any() or (df.columns == "").any():
+                # pyarrow keeps repeated and blank header names as they are;
+                # the C parser below renames them (a.1, Unnamed: 2)
+                df = None
+        if df is not None:
+            # pyarrow types ISO dates and times itself (and cannot be told not
+            # to); the C parser leaves them as text, which the column type
+            # detection and date checks expect, so those columns are re-read
+            # as text by the C parser.
+            temporal = [c for c in df.columns
+                        if not (pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_string_dtype(df[c]))]
+            if temporal:
+                text = pd.read_csv(io.BytesIO(data), sep=options["sep"], usecols=temporal)
+                for column in temporal:
+                    df[column] = text[column]
+        else:
+            df = pd.read_csv(io.BytesIO(data), sep=options["sep"],
+                             skipinitialspace=options["skipinitialspace"])
+    elif fmt in ("xlsx", "xls"):
+        df = None
+        if fmt == "xlsx" and XLSX_STREAMING:
+            df = _read_xlsx(data, options["sheet"], progress)
+        if df is None:
+            df = pd.read_excel(io.BytesIO(data), sheet_name=options["sheet"] or 0)
+    elif fmt in ("parquet", "feather"):
+        if not PYARROW_AVAILABLE:
+            raise ValueError("Reading Parquet/Feather files needs pyarrow (pip install pyarrow)")
+        reader = pd.read_parquet if fmt == "parquet" else pd.read_feather
+        df = reader(io.BytesIO(data))
+        if not isinstance(df.index, pd.RangeIndex):
+            df = df.reset_index()
+    else:
+        raise ValueError("Unsupported file format")
+    df = _arrow_strings(df)
+    df.index = range(1, len(df) + 1)
+    return df
+
+
+def _frame_bytes(df):
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+def _expire_pins(now):
+    for entry in _frames.values():
+        stale = [s for s, seen in entry["pins"].items() if now - seen > PIN_TTL_SEC]
+        for session in stale:
+            del entry["pins"][session]
+
+
+def _evict():
+    """Drop unpinned entries, least recently used first, until those left fit
+    the unpinned allowance."""
+    unpinned = [key for key, entry in _frames.items() if not entry["pins"]]
+    total = sum(_frames[key]["bytes"] for key in unpinned)
+    count = len(unpinned)
+    for key in unpinned:
+        if total <= CACHE_UNPINNED_MAX_BYTES and count <= CACHE_UNPINNED_MAX_ENTRIES:
+            break
+        total -= _frames[key]["bytes"]
+        count -= 1
+        del _frames[key]
+
+
+def _unpin(session, key):
+    entry = _frames.get(key)
+    if entry is not None:
+        entry["pins"].pop(session, None)
+
+
+def get_frame(key, session):
+    """The cached frame for a key, pinned for the session (and marked as
+    just used), or None if it is not cached."""
+    with _lock:
+        entry = _frames.get(key)
+        if entry is None:
+            return None
+        entry["pins"][session] = time.monotonic()
+        _frames.move_to_end(key)
+        return entry["df"]
+
+
+def load_frame(data, file_name, session, previous_key=None, sheet=None, progress=None):
+    """(key, cached frame) for uploaded bytes, parsing them only if this
+    content (and sheet) was not cached yet; progress is passed to the
+    workbook reader. Pins the entry for the session and unpins previous_key
+    (the session's earlier upload)."""
+    options = reader_options(file_name, sheet)
+    if options is None:
+        raise ValueError("Unsupported file format")
+    key = content_key(data, options)
+    df = get_frame(key, session)
+    if df is None:
+        # Parse outside the lock; two sessions uploading the same new file at
+        # once both parse it and the second result is dropped.
+        parsed = _parse(data, options, progress)
+        with _lock:
+            entry = _frames.get(key)
+            if entry is None:
+                entry = {"df": parsed, "bytes": _frame_bytes(parsed), "name": file_name, "pins": {},
+                         "profiles": {}}
+                _frames[key] = entry
+            entry["pins"][session] = time.monotonic()
+            _frames.move_to_end(key)
+            df = entry["df"]
+    with _lock:
+        if previous_key and previous_key != key:
+            _unpin(session, previous_key)
+        _expire_pins(time.monotonic())
+        _evict()
+    return key, df
+
+
+def release(session, key):
+    """The session no longer uses this upload (file removed or replaced).
+    The frame is freed unless another session uses it or it fits the
+    unpinned allowance."""
+    with _lock:
+        _unpin(session, key)
+        _evict()
+
+
+def cache_status():
+    """{"entries", "bytes", "pinned"} of the process-wide cache."""
+    with _lock:
+        return {
+            "entries": len(_frames),
+            "bytes": sum(entry["bytes"] for entry in _frames.values()),
+            "pinned": sum(1 for entry in _frames.values() if entry["pins"]),
+        }
+
+
+# ============================================================
+# Streamlit glue
+# ============================================================
+
+def upload_sheets(uploaded_file, state):
+    """Sheet names of an uploaded workbook, listed once per upload."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    cached = state.get("ingest_sheets")
+    if cached is not None and file_id is not None and cached[0] == file_id:
+        return cached[1]
+    names = sheet_names(uploaded_file.getvalue(), uploaded_file.name)
+    state["ingest_sheets"] = (file_id, names)
+    return names
+
+
+def read_upload(uploaded_file, state, sheet=None, progress=None):
+    """The parsed DataFrame for a Streamlit upload (and sheet), for this
+    session (state = st.session_state). Same upload as on the previous rerun
+    -> the session's frame as it is; otherwise the cached parse of its
+    content (parsed now if needed, reporting to progress), as a shallow
+    copy."""
+    session = state.get("ingest_session")
+    if session is None:
+        session = state["ingest_session"] = uuid.uuid4().hex
+    current = state.get("ingest_upload")  # (file_id, sheet, key) of the upload in use
+    file_id = getattr(uploaded_file, "file_id", None)
+
+    if current is not None and file_id is not None and current[:2] == (file_id, sheet) \
+            and state.get("uploaded_df") is not None:
+        get_frame(current[2], session)  # refresh the pin
+        return state["uploaded_df"]
+
+    key, df = load_frame(uploaded_file.getvalue(), uploaded_file.name, session,
+                         current[2] if current else None, sheet, progress)
+    state["ingest_upload"] = (file_id, sheet, key)
+    state["ingest_modified"] = None  # a fresh frame: no column converted yet
+    return df.copy(deep=False)
+
+
+def column_modified(state, column):
+    """The session replaced a column of its frame (a type change): its
+    profile is no longer the shared one of the parsed column."""
+    versions = state.get("ingest_modified")
+    if versions is None:
+        versions = state["ingest_modified"] = {}
+    versions[column] = versions.get(column, 0) + 1
+
+
+def column_profile(state, column, build):
+    """The profile of one column of the session's upload (build(series) makes
+    it). A column as parsed is profiled once per file content: the profile
+    is kept with the cached frame, so every rerun and every session with the
+    same file shares it. A column the session replaced (column_modified) is
+    profiled for that session only, again after each replacement; a dtype
+    does not tell which values a converted column holds. Kept in the session
+    too if the frame is no longer cached."""
+    series = state["uploaded_df"][column]
+    current = state.get("ingest_upload")
+    key = current[2] if current else None
+    version = (state.get("ingest_modified") or {}).get(column, 0)
+    entry = None
+    if version == 0:
+        with _lock:
+            entry = _frames.get(key)
+        # a column changed without column_modified is not the parsed one
+        if entry is not None and entry["df"][column].dtype != series.dtype:
+            entry = None
+    if entry is not None:
+        profiles = entry["profiles"]
+        slot = column
+    else:
+        profiles = state.get("ingest_profiles")
+        if profiles is None or profiles.get("key") != key:
+            profiles = state["ingest_profiles"] = {"key": key}
+        slot = (column, version, str(series.dtype))
+    profile = profiles.get(slot)
+    if profile is None:
+        built = build(series)
+        profile = profiles.setdefault(slot, built)
+        if entry is not None and profile is built:
+            size = _profile_bytes(built)
+            with _lock:
+                entry["bytes"] += size
+                _evict()
+    return profile
+
+
+def _profile_bytes(profile):
+    """Rough size of a column profile: its lists and the objects in them."""
+    total = sys.getsizeof(profile)
+    for value in profile.values():
+        total += sys.getsizeof(value)
+        if isinstance(value, (list, tuple)):
+            total += sum(sys.getsizeof(item) for item in value)
+    return total
+
+
+def release_upload(state):
+    """Unpin the session's upload (called when the file is removed)."""
+    current = state.get("ingest_upload")
+    session = state.get("ingest_session")
+    if current is not None and session is not None:
+        release(session, current[2])
+    state["ingest_upload"] = None
+    state["ingest_sheets"] = None
+    state["ingest_profiles"] = None
+    state["ingest_modified"] = None
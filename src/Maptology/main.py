@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 
+import ingest
 from utils import initialize_session, add_css
 from components import render_header
 from ontology import render_ontology_selection, get_available_ontologies, search_ontology
@@ -35,7 +36,7 @@ st.write("### Step 1: Upload Data File")
 # its value to None on a rerun (which would wipe the whole session).
 uploaded_file = st.file_uploader(
     "Drag and drop or browse files",
-    type=["csv", "tsv", "xlsx", "xls"],
+    type=["csv", "tsv", "xlsx", "xls"] + (["parquet", "feather"] if ingest.PYARROW_AVAILABLE else []),
     label_visibility="collapsed",
     key="main_file_uploader",
 )
@@ -45,9 +46,20 @@ if 'current_file_name' not in st.session_state:
     st.session_state.current_file_name = None
 
 if uploaded_file:
-    # Reset all mapping info when a new file is uploaded
-    if st.session_state.current_file_name != uploaded_file.name:
-        st.session_state.current_file_name = uploaded_file.name
+    # Workbooks with several sheets: pick one. Only the sheet names are read
+    # here; the chosen sheet alone is parsed below.
+    upload_options = ingest.reader_options(uploaded_file.name)
+    sheet = None
+    if upload_options is not None and upload_options["format"] in ("xlsx", "xls"):
+        sheets = ingest.upload_sheets(uploaded_file, st.session_state)
+        if len(sheets) > 1:
+            sheet = st.selectbox("Sheet", sheets,
+                                 key="upload_sheet_" + str(getattr(uploaded_file, "file_id", "")))
+    source_name = uploaded_file.name if sheet is None else uploaded_file.name + " [" + sheet + "]"
+
+    # Reset all mapping info when a new file (or another sheet) is uploaded
+    if st.session_state.current_file_name != source_name:
+        st.session_state.current_file_name = source_name
         # Reset all mapping info
         st.session_state.mapped_terms = []
         st.session_state.value_ontology_mapping = {}
@@ -64,6 +76,7 @@ if uploaded_file:
         st.session_state.search_terms_selections = {}
         st.session_state.column_states = {}
         st.session_state.selected_ontologies = []
+        st.session_state.subtree_root = None
         st.session_state.column_data_types = {}
         # Clear imported-mapping state and reset the import uploader widget
         st.session_state.imported_mapping_name = None
@@ -75,20 +88,19 @@ if uploaded_file:
         st.session_state.ontology_widget_version = st.session_state.get('ontology_widget_version', 0) + 1
 
     try:
-        # Read file based on format
-        file_name = uploaded_file.name.lower()
-
-        if file_name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file, skipinitialspace=True)
-        elif file_name.endswith('.tsv'):
-            df = pd.read_csv(uploaded_file, sep='\t', skipinitialspace=True)
-        elif file_name.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(uploaded_file)
-        else:
+        # Parsed once per file content and shared across reruns and sessions
+        # (ingest.py); a rerun gets this session's frame back without re-reading.
+        if upload_options is None:
             st.error("Unsupported file format")
             st.stop()
+        # Large workbooks report progress while their rows are streamed in
+        progress_slot = st.empty()
 
-        df.index = range(1, len(df) + 1)
+        def show_progress(rows, fraction):
+            progress_slot.progress(fraction, text="Reading sheet: " + format(rows, ",") + " rows")
+
+        df = ingest.read_upload(uploaded_file, st.session_state, sheet, show_progress)
+        progress_slot.empty()
         st.session_state.uploaded_df = df
 
         # File processing completion message
@@ -164,6 +176,8 @@ else:
     # Reset when file is removed
     if st.session_state.current_file_name is not None:
         st.session_state.current_file_name = None
+        # Let the shared parse cache drop the frame (if no other session uses it)
+        ingest.release_upload(st.session_state)
         st.session_state.mapped_terms = []
         st.session_state.value_ontology_mapping = {}
         st.session_state.column_mapping = {}
@@ -180,6 +194,7 @@ else:
         st.session_state.search_terms_selections = {}
         st.session_state.column_states = {}
         st.session_state.selected_ontologies = []
+        st.session_state.subtree_root = None
         st.session_state.column_data_types = {}
         # Clear imported-mapping state and reset the import uploader widget
         st.session_state.imported_mapping_name = None
@@ -190,10 +190,11 @@ def on_column_select():
 
         # Auto-search the first unique value for string-like columns
         if st.session_state.uploaded_df is not None and not st.session_state.auto_searched:
-            dtype_name = str(st.session_state.uploaded_df[selected_column].dtype)
-            if dtype_name == 'object' or dtype_name.startswith('string') or dtype_name == 'category':
-                unique_values = st.session_state.uploaded_df[selected_column].dropna().unique()
-                unique_values.sort()
+            from utils import get_column_profile
+            profile = get_column_profile(st.session_state.uploaded_df, selected_column)
+            dtype_name = profile["dtype"]
+            if dtype_name in ['object', 'str'] or dtype_name.startswith('string') or dtype_name == 'category':
+                unique_values = profile["values"]
                 if len(unique_values) > 0:
                     default_value = str(unique_values[0])
                     st.session_state.selected_unique_value = default_value
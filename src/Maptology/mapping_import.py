@@ -30,8 +30,9 @@ import pandas as pd
 import streamlit as st
 import yaml
 
+import catalog
+import release_delta
 from schema import data_type_from_term
-from tfidf_search import get_ontology_list_from_tsv
 
 
 # SSSOM rows that record a column's basic data type (a schema.org term) use this
@@ -51,19 +52,11 @@ _VALID_DATA_TYPES = {"String", "Float", "Integer", "Boolean", "Date", "Datetime"
 # Ontology catalog helpers (abbreviation -> full name)
 # ============================================================
 
-_catalog = None
-
-
 def _abbr_to_name(abbr):
-    global _catalog
-    if _catalog is None:
-        _catalog = {}
-        try:
-            for o in get_ontology_list_from_tsv():
-                _catalog[o["acronym"]] = o["name"]
-        except Exception:
-            _catalog = {}
-    return _catalog.get(abbr, abbr)
+    try:
+        return catalog.ontology_name(abbr)
+    except Exception:
+        return abbr
 
 
 def _display_ontology_name(abbr):
@@ -322,29 +315,85 @@ def filter_to_data(col_recs, val_recs, df):
 # Apply to session state
 # ============================================================
 
-def _latest_label_def(abbr, term_uri, fallback_label, fallback_def):
-    """Return the CURRENT label/definition for a term from the local OWL cache,
-    matched by URI (the stable identifier). Falls back to the values stored in
-    the imported file if the term is not in the cache.
+# _current_term's answer when the ontology could not be loaded to look
+_UNAVAILABLE = object()
 
-    This is intentional: an exported mapping may be old, and the ontology's
-    label/definition may have changed since. We trust only the URI from the
-    file and re-read the up-to-date label/definition locally."""
+
+def _current_term(abbr, term_uri):
+    """The term as the local OWL cache has it now (matched by URI), None if
+    the ontology does not have it, or _UNAVAILABLE if the ontology could not
+    be loaded (refused for lack of memory, or a failed load) - then nobody
+    knows whether the term is still there."""
+    if not abbr:
+        return None
     try:
         from tfidf_search import get_term_by_iri
-        term = get_term_by_iri(abbr, term_uri) if abbr else None
+        return get_term_by_iri(abbr, term_uri, unavailable=_UNAVAILABLE)
     except Exception:
-        term = None
-    if term:
+        return _UNAVAILABLE
+
+
+def _latest_label_def(term, fallback_label, fallback_def):
+    """Return the CURRENT label/definition for a term from the local OWL cache
+    (term from _current_term). Falls back to the values stored in the
+    imported file if the term is not in the cache.
+
+    This is intentional: an exported mapping may be old, and the ontology's
+    label/definition may have changed since. We trust only the URI from the
+    file and re-read the up-to-date label/definition locally."""
+    if term and term is not _UNAVAILABLE:
         label = term.get("label") or fallback_label
         definition = term.get("definition") or fallback_def
         return label, definition
     return fallback_label, fallback_def
 
 
+def _term_change(abbr, term_uri, file_label, term, mapped_to):
+    """A note for the import report when a mapped term was removed from the
+    ontology or relabeled since the file was saved, else None. The release
+    delta of the latest rebuild says whether it happened in that rebuild.
+    If the ontology could not be loaded, only the release delta can say the
+    term was removed; otherwise the term is reported as not checked."""
+    if not abbr or catalog.ontology_entry(abbr) is None:
+        return None  # ontology not available here at all (reported separately)
+    latest = release_delta.term_change(abbr, term_uri)
+    if term is _UNAVAILABLE:
+        removed = latest is not None and latest["change"] == "removed"
+        return {
+            "mapped_to": mapped_to,
+            "term_uri": term_uri,
+            "ontology": abbr,
+            "change": "removed" if removed else "unchecked",
+            "old_label": file_label,
+            "new_label": None,
+            "latest_release": removed,
+        }
+    if term is None:
+        change = "removed"
+        new_label = None
+    elif file_label and term.get("label") and file_label != term["label"]:
+        change = "relabeled"
+        new_label = term["label"]
+    else:
+        return None
+    return {
+        "mapped_to": mapped_to,
+        "term_uri": term_uri,
+        "ontology": abbr,
+        "change": change,
+        "old_label": file_label,
+        "new_label": new_label,
+        "latest_release": latest is not None and latest["change"] in ("removed", "label_changed"),
+    }
+
+
 def apply_mappings(kept_cols, kept_vals):
+    """Add the kept mappings to the session. Returns the term changes found
+    on the way (see _term_change) for the import report."""
     from utils import get_column_data_type
 
+    changes = []
+
     added = False
     existing = set(
         (m["Original Label"], m["Ontology Term URI"])
@@ -355,7 +404,11 @@ def apply_mappings(kept_cols, kept_vals):
         if key in existing:
             continue
         abbr = r.get("ontology_abbr") or _abbr_from_uri(r["term_uri"])
-        label, definition = _latest_label_def(abbr, r["term_uri"], r.get("label", ""), r.get("definition", ""))
+        term = _current_term(abbr, r["term_uri"])
+        label, definition = _latest_label_def(term, r.get("label", ""), r.get("definition", ""))
+        change = _term_change(abbr, r["term_uri"], r.get("label", ""), term, str(r["column"]))
+        if change:
+            changes.append(change)
         st.session_state.mapped_terms.append({
             "Original Label": r["column"],
             "Preferred Label": label,
@@ -380,7 +433,11 @@ def apply_mappings(kept_cols, kept_vals):
         if any(m.get("Ontology Term URI") == r["term_uri"] for m in vom[col][val]):
             continue
         abbr = r.get("ontology_abbr") or _abbr_from_uri(r["term_uri"])
-        label, definition = _latest_label_def(abbr, r["term_uri"], r.get("label", ""), r.get("definition", ""))
+        term = _current_term(abbr, r["term_uri"])
+        label, definition = _latest_label_def(term, r.get("label", ""), r.get("definition", ""))
+        change = _term_change(abbr, r["term_uri"], r.get("label", ""), term, str(col) + " = " + val)
+        if change:
+            changes.append(change)
         vom[col][val].append({
             "Preferred Label": label,
             "Ontology Name": _display_ontology_name(abbr),
@@ -396,6 +453,7 @@ def apply_mappings(kept_cols, kept_vals):
     # (otherwise Streamlit keeps stale unchecked widget state).
     if added:
         st.session_state.mapping_version = st.session_state.get("mapping_version", 0) + 1
+    return changes
 
 
 # ============================================================
@@ -538,7 +596,7 @@ def render_import_section():
             kept_cols, kept_vals, dropped_cols, dropped_vals = filter_to_data(
                 col_recs, val_recs, df
             )
-            apply_mappings(kept_cols, kept_vals)
+            term_changes = apply_mappings(kept_cols, kept_vals)
             unknown_onts, overflow_onts = _auto_select_ontologies(kept_cols, kept_vals)
             applied_types, rejected_types = _restore_data_types(kept_cols + kept_vals)
 
@@ -554,6 +612,7 @@ def render_import_section():
                 "overflow_onts": overflow_onts,
                 "applied_types": applied_types,
                 "rejected_types": rejected_types,
+                "term_changes": term_changes,
             }
 
     report = st.session_state.get("import_report")
@@ -601,3 +660,40 @@ def render_import_section():
                 + ("..." if len(rejected_types) > 8 else "")
                 + "]. The automatically detected type was kept instead."
             )
+
+        # Terms that changed in the ontology since the file was saved
+        # (checked against the local cache; "latest release" from the
+        # release delta written by the last rebuild)
+        term_changes = report.get("term_changes") or []
+        removed = [c for c in term_changes if c["change"] == "removed"]
+        relabeled = [c for c in term_changes if c["change"] == "relabeled"]
+        unchecked = [c for c in term_changes if c["change"] == "unchecked"]
+        if removed:
+            items = []
+            for c in removed[:8]:
+                items.append(c["mapped_to"] + " → " + (c["old_label"] or c["term_uri"])
+                             + " (" + c["ontology"] + (", removed in the latest release" if c["latest_release"] else "") + ")")
+            st.warning(
+                str(len(removed)) + " imported mapping(s) point to terms that are no longer in the "
+                "current ontology build: " + "; ".join(items)
+                + ("..." if len(removed) > 8 else "")
+                + ". They were kept with the label from the file; please review them."
+            )
+        if relabeled:
+            items = []
+            for c in relabeled[:8]:
+                items.append("'" + c["old_label"] + "' → '" + c["new_label"] + "'"
+                             + (" (latest release)" if c["latest_release"] else ""))
+            st.info(
+                str(len(relabeled)) + " mapped term(s) have a new label in the current ontology "
+                "build, which is used now: " + "; ".join(items)
+                + ("..." if len(relabeled) > 8 else "")
+            )
+        if unchecked:
+            ontologies = sorted(set(c["ontology"] for c in unchecked))
+            st.info(
+                str(len(unchecked)) + " imported mapping(s) could not be checked against the current "
+                "ontology build because " + ", ".join(ontologies) + " could not be loaded "
+                "(the server may be short of memory). They were kept with the label from the file; "
+                "import the file again later to refresh them."
+            )
@@ -1,13 +1,14 @@
 import streamlit as st
 import pandas as pd
-from tfidf_search import get_ontology_list_from_tsv, search_local
+import catalog
+from tfidf_search import (get_ontology_list_from_tsv, search_local, ontology_cost,
+                          memory_status, refused_ontologies, get_ancestors)
 
 
-# Load the ontology catalog once per server process.
-# The catalog is static (it only changes when the TF-IDF caches are rebuilt),
-# so @st.cache_data computes it a single time and shares the result across
-# every session, rerun, and user - no need to rebuild it on each page load.
-@st.cache_data(show_spinner=False)
+# The ontology catalog is one in-process object (catalog.py) shared by every
+# session, rerun and user. It is read once from tfidf_cache/catalog.json and
+# re-read only when a rebuild rewrites that file, so no st.cache_data here -
+# that would keep serving the list from before the rebuild.
 def _load_ontology_catalog():
     return get_ontology_list_from_tsv()
 
@@ -34,12 +35,14 @@ def get_ontology_details(ontology_acronym):
     if ontology_acronym in st.session_state.ontology_details_cache:
         return st.session_state.ontology_details_cache[ontology_acronym]
 
-    # Look up from available ontologies list
-    full_name = ontology_acronym
+    # Look up from available ontologies list, then the shared catalog
+    full_name = None
     for ont in st.session_state.available_ontologies:
         if ont["acronym"] == ontology_acronym:
             full_name = ont["name"]
             break
+    if full_name is None:
+        full_name = catalog.ontology_name(ontology_acronym)
 
     # Cache the result
     st.session_state.ontology_details_cache[ontology_acronym] = {
@@ -50,6 +53,35 @@ def get_ontology_details(ontology_acronym):
     return st.session_state.ontology_details_cache[ontology_acronym]
 
 
+def _format_mb(n_bytes):
+    if not n_bytes:
+        return "? MB"
+    mb = n_bytes / 1024.0 / 1024.0
+    if mb >= 1024:
+        return str(round(mb / 1024.0, 1)) + " GB"
+    return str(int(round(mb))) + " MB"
+
+
+# Labels of a term's ancestors (roots first), from the hierarchy built with
+# the ontology's cache - shown in the term preview.
+def get_term_ancestors(ontology_acronym, term_uri):
+    return [term["label"] for term in get_ancestors(ontology_acronym, term_uri) if term]
+
+
+# Run search_local over the selected ontologies and tell the user about any
+# ontology the server could not load within its memory budget. When the user
+# limited suggestions to one term's subtree, only its descendants are returned.
+def _search_selected(search_term, top_n=10):
+    subtree = st.session_state.get("subtree_root")
+    df_results = search_local(search_term, st.session_state.selected_ontologies, top_n=top_n,
+                              within=subtree["iri"] if subtree else None)
+    refused = refused_ontologies()
+    if refused:
+        st.warning("Not searched (server memory is full, try again shortly or select "
+                   "fewer/smaller ontologies): " + ", ".join(refused))
+    return df_results
+
+
 # Search ontology for column mapping - search within selected ontologies
 # (replaces BioPortal API search)
 def search_ontology(selected_column):
@@ -67,7 +99,7 @@ def search_ontology(selected_column):
     search_term = selected_column.strip()
 
     # Search using local TF-IDF
-    df_results = search_local(search_term, st.session_state.selected_ontologies)
+    df_results = _search_selected(search_term)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
@@ -75,10 +107,9 @@ def search_ontology(selected_column):
         st.session_state.ontology_results = df_results
         # The auto-suggestion list shows the TOP 10 overall. search_local returns
         # up to 10 PER ontology, so with several ontologies selected the combined
-        # set is larger - keep only the 10 best distinct terms.
-        st.session_state.filtered_ontology_results = (
-            df_results.drop_duplicates(subset=["Ontology Term URI"], keep="first").head(10)
-        )
+        # set is larger - keep only the 10 best. (search_local already returns
+        # each term once, even when several selected ontologies contain it.)
+        st.session_state.filtered_ontology_results = df_results.head(10)
 
         # Reset selected term index if it's out of range
         if (st.session_state.selected_term_index is not None and
@@ -108,15 +139,13 @@ def search_ontology_for_value(selected_value):
     search_term = str(selected_value).strip()
 
     # Search using local TF-IDF
-    df_results = search_local(search_term, st.session_state.selected_ontologies)
+    df_results = _search_selected(search_term)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
         df_results = df_results.sort_values(by=["Mapping Score", "Preferred Label"], ascending=[False, True])
         # Auto-suggestion list: keep only the top 10 overall (see search_ontology).
-        st.session_state.value_ontology_results = (
-            df_results.drop_duplicates(subset=["Ontology Term URI"], keep="first").head(10)
-        )
+        st.session_state.value_ontology_results = df_results.head(10)
     else:
         # Automatic value search: stay silent on no match (see search_ontology).
         st.session_state.value_ontology_results = None
@@ -137,7 +166,7 @@ def search_bioportal_all_columns(search_term):
     search_term = str(search_term).strip()
 
     # Search using local TF-IDF
-    df_results = search_local(search_term, st.session_state.selected_ontologies)
+    df_results = _search_selected(search_term)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
@@ -168,7 +197,7 @@ def search_bioportal_all(search_term):
     search_term = str(search_term).strip()
 
     # Search using local TF-IDF
-    df_results = search_local(search_term, st.session_state.selected_ontologies)
+    df_results = _search_selected(search_term)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
@@ -199,7 +228,7 @@ def search_bioportal_manual_value(search_term):
     # Search using local TF-IDF. Fetch more per ontology (top_n=20) so that after
     # we drop terms already shown in the auto list, enough candidates remain to
     # show ~10.
-    df_results = search_local(search_term, st.session_state.selected_ontologies, top_n=20)
+    df_results = _search_selected(search_term, top_n=20)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
@@ -228,7 +257,7 @@ def search_bioportal_manual_column(search_term):
     # Search using local TF-IDF. Fetch more per ontology (top_n=20) so that after
     # we drop terms already shown in the auto list, enough candidates remain to
     # show ~10.
-    df_results = search_local(search_term, st.session_state.selected_ontologies, top_n=20)
+    df_results = _search_selected(search_term, top_n=20)
 
     if df_results is not None and len(df_results) > 0:
         # Sort by relevance (TF-IDF cosine similarity), highest first
@@ -244,6 +273,7 @@ def search_bioportal_manual_column(search_term):
 # Ontology deselection function (for Select None button)
 def select_none_ontologies():
     st.session_state.selected_ontologies = []
+    st.session_state.subtree_root = None
     st.session_state.ontologies_changed = True
     # Programmatic change -> refresh the ontology checkboxes so they don't keep
     # their stale (checked) widget state.
@@ -268,6 +298,29 @@ def render_ontology_selection(available_ontologies):
         if st.session_state.selected_ontologies:
             selected_text = ", ".join(st.session_state.selected_ontologies)
             st.markdown("**Selected ontologies (" + str(current_count) + "/" + str(max_count) + "):** " + selected_text)
+            # Memory the selection needs once loaded, against the server's budget
+            # (shared by all sessions; see tfidf_search admission control)
+            selected_cost = 0
+            for acronym in st.session_state.selected_ontologies:
+                selected_cost += ontology_cost(acronym) or 0
+            status = memory_status()
+            memory_text = "Memory: " + _format_mb(selected_cost)
+            if status["budget"]:
+                memory_text += (" of a " + _format_mb(status["budget"]) + " server budget ("
+                                + _format_mb(status["resident"]) + " loaded)")
+            st.caption(memory_text)
+            if status["budget"] and selected_cost > status["budget"]:
+                st.warning("The selected ontologies do not fit in server memory together; "
+                           "some searches may skip ontologies.")
+            # Subtree restriction, set from a term's preview
+            subtree = st.session_state.get("subtree_root")
+            if subtree:
+                st.info("Suggestions are limited to terms under **" + subtree["label"] + "** ("
+                        + subtree["ontology"] + "). Ontologies without this term are not searched.")
+                if st.button("Search all terms again", key="btn_clear_subtree"):
+                    st.session_state.subtree_root = None
+                    st.session_state.ontologies_changed = True
+                    st.rerun()
         else:
             st.warning("Please select at least one ontology to proceed.")
 
@@ -294,6 +347,7 @@ def render_ontology_selection(available_ontologies):
                 acronym = ont["acronym"]
                 name = ont["name"]
                 tooltip = ont.get("description", "")
+                cost = ont.get("memory_bytes") or ontology_cost(acronym)
 
                 # Check checkbox state
                 is_checked = acronym in st.session_state.selected_ontologies
@@ -306,7 +360,7 @@ def render_ontology_selection(available_ontologies):
                 is_disabled = (current_count >= max_count and not is_checked)
 
                 checkbox = st.checkbox(
-                    acronym + " - " + name,
+                    acronym + " - " + name + "  (" + _format_mb(cost) + ")",
                     value=is_checked,
                     key="ont_" + acronym + "_" + str(st.session_state.get("ontology_widget_version", 0)),
                     help=tooltip,
@@ -0,0 +1,82 @@
+"""
+What changed in an ontology's latest rebuild. build_all_caches.py compares
+each rebuild's terms with the generation it replaces (matched by IRI) and
+writes <ACR>_delta.json into the new generation:
+
+    {"acronym": "NCIT", "from_generation": 2,
+     "counts": {"added": 120, "removed": 3, "label_changed": 41,
+                "definition_changed": 310},
+     "added":              [[iri, label], ...],
+     "removed":            [[iri, label], ...],
+     "label_changed":      [[iri, old label, new label], ...],
+     "definition_changed": [iri, ...]}
+
+every list sorted by IRI. A first build has no delta. The file of the
+generation the catalog lists is read once (again when the catalog lists a
+newer one) into an {iri: change} index, so term_change is a dict lookup.
+"""
+
+import json
+import os
+
+import catalog
+
+
+DELTA_SUFFIX = "_delta.json"
+
+_deltas = {}  # acronym -> (generation, delta or None, {iri: change})
+
+
+def _index(delta):
+    changes = {}
+    for iri, label in delta.get("added", []):
+        changes[iri] = {"change": "added", "old_label": None, "new_label": label}
+    for iri, label in delta.get("removed", []):
+        changes[iri] = {"change": "removed", "old_label": label, "new_label": None}
+    for iri, old, new in delta.get("label_changed", []):
+        changes[iri] = {"change": "label_changed", "old_label": old, "new_label": new}
+    for iri in delta.get("definition_changed", []):
+        if iri not in changes:
+            changes[iri] = {"change": "definition_changed", "old_label": None, "new_label": None}
+    return changes
+
+
+def _load(acronym):
+    entry = catalog.ontology_entry(acronym)
+    generation = entry.get("generation") if entry else None
+    cached = _deltas.get(acronym)
+    if cached is not None and cached[0] == generation:
+        return cached
+    delta = None
+    if generation is not None:
+        folder = catalog.generation_folder(acronym, generation, catalog.CACHE_DIR)
+        path = os.path.join(folder, acronym + DELTA_SUFFIX)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    delta = json.load(f)
+            except (OSError, ValueError) as e:
+                print("Error reading " + path + ": " + str(e))
+    cached = (generation, delta, _index(delta) if delta else {})
+    _deltas[acronym] = cached
+    return cached
+
+
+def load_delta(acronym):
+    """The published generation's delta (the dict above), or None."""
+    return _load(acronym)[1]
+
+
+def term_change(acronym, iri):
+    """How one term changed in the latest rebuild of an ontology:
+    {change: added / removed / label_changed / definition_changed, old_label,
+    new_label, from_generation, generation}, or None if it did not change
+    (or there is no delta)."""
+    generation, delta, changes = _load(acronym)
+    change = changes.get(iri)
+    if change is None:
+        return None
+    out = dict(change)
+    out["from_generation"] = delta.get("from_generation")
+    out["generation"] = generation
+    return out
@@ -5,6 +5,7 @@ import os
 import pandas as pd
 import io
 from utils import get_column_data_type
+import catalog
 
 try:
     from sssom.util import MappingSetDataFrame
@@ -255,7 +256,9 @@ def generate_linkml_schema():
 
 # 매핑에 사용된 온톨로지들의 버전 정보 / Versions of the ontologies used here.
 # Reads ontology_cache/ontology_versions.json (populated by version_check.py).
-# Returns {abbr: {version, released, submissionId}}; "unknown" if not recorded.
+# Returns {abbr: {version, released, submissionId, cacheGeneration,
+# cacheBuiltAt}}; "unknown" if not recorded. The cache fields say which local
+# TF-IDF build the terms were searched in (from the shared catalog).
 def _ontology_versions_used():
     used = set()
     for m in st.session_state.mapped_terms:
@@ -281,10 +284,13 @@ def _ontology_versions_used():
     result = {}
     for abbr in sorted(used):
         info = recorded.get(abbr) or {}
+        built = catalog.ontology_entry(abbr) or {}
         result[abbr] = {
             "version": info.get("version", "unknown"),
             "released": info.get("released", "unknown"),
             "submissionId": info.get("submissionId"),
+            "cacheGeneration": built.get("generation"),
+            "cacheBuiltAt": built.get("built_at"),
         }
     return result
 
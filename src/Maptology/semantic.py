@@ -0,0 +1,108 @@
+"""
+LSA (latent semantic analysis) term embeddings, built per ontology by
+build_all_caches.py from its TF-IDF matrix (option "lsa_dim" in
+ontology_cache/build_options.json) and stored as <ACR>_lsa.npz:
+
+    feature_index  int32 (F,)    TF-IDF columns the SVD was fitted on (sorted)
+    components     float32 (F, k) projection of those columns into k dimensions
+    embeddings     float32 or int8 (n_terms, k), unit-length rows
+    scales         float32 (n_terms,), only for int8: row i = embeddings[i] * scales[i]
+
+A query is embedded with the same TF-IDF vector search_local already
+computes, so everything runs offline on CPU. Terms that share no token with
+the query ("sex" vs "gender") can still be close in the embedding space;
+search_local blends this cosine with the sparse one (hybrid_scores).
+"""
+
+import numpy as np
+
+
+BLOCK_ROWS = 65536  # embedding rows scored per block in top_k
+
+
+def load_lsa(path):
+    """The arrays of an <ACR>_lsa.npz as a dict (int8 embeddings keep their
+    per-row scales)."""
+    with np.load(path) as npz:
+        lsa = {name: npz[name] for name in npz.files}
+    return lsa
+
+
+def embed_query(lsa, query_vector):
+    """Project a 1 x n_features TF-IDF query vector (CSR) into the embedding
+    space; returns a unit-length float32 vector, or None if none of the
+    query's features were part of the SVD."""
+    query_vector = query_vector.tocsr()
+    feature_index = lsa["feature_index"]
+    pos = np.searchsorted(feature_index, query_vector.indices)
+    pos = np.minimum(pos, len(feature_index) - 1)
+    hit = feature_index[pos] == query_vector.indices
+    if not hit.any():
+        return None
+    embedding = query_vector.data[hit].astype(np.float32) @ lsa["components"][pos[hit]]
+    norm = np.linalg.norm(embedding)
+    if norm == 0:
+        return None
+    return (embedding / norm).astype(np.float32)
+
+
+def scores_for_rows(lsa, query_embedding, rows):
+    """Cosine between the query and the given embedding rows."""
+    block = lsa["embeddings"][rows].astype(np.float32)
+    scores = block @ query_embedding
+    if "scales" in lsa:
+        scores *= lsa["scales"][rows]
+    return scores
+
+
+def top_k(lsa, query_embedding, k, exclude=None, block_rows=BLOCK_ROWS):
+    """Indices and cosines of the k nearest terms, best first. Scores one
+    block of rows at a time (so int8 embeddings are only widened a block at
+    a time) and keeps a running top k. `exclude`: row indices to skip."""
+    embeddings = lsa["embeddings"]
+    scales = lsa.get("scales")
+    n = embeddings.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    best_idx = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        scores = embeddings[start:stop].astype(np.float32) @ query_embedding
+        if scales is not None:
+            scores *= scales[start:stop]
+        if exclude is not None and len(exclude):
+            local = exclude[(exclude >= start) & (exclude < stop)] - start
+            scores[local] = -np.inf
+        if len(scores) > k:
+            keep = np.argpartition(scores, -k)[-k:]
+        else:
+            keep = np.arange(len(scores))
+        best_idx = np.concatenate([best_idx, keep + start])
+        best_scores = np.concatenate([best_scores, scores[keep]])
+        if len(best_idx) > k:
+            keep = np.argpartition(best_scores, -k)[-k:]
+            best_idx, best_scores = best_idx[keep], best_scores[keep]
+    order = np.lexsort((best_idx, -best_scores))
+    best_idx, best_scores = best_idx[order], best_scores[order]
+    finite = np.isfinite(best_scores)
+    return best_idx[finite], best_scores[finite]
+
+
+def top_k_exact(lsa, query_embedding, k, exclude=None):
+    """Brute-force reference for top_k: score every row at once, full sort."""
+    scores = lsa["embeddings"].astype(np.float32) @ query_embedding
+    if "scales" in lsa:
+        scores *= lsa["scales"]
+    if exclude is not None and len(exclude):
+        scores[exclude] = -np.inf
+    order = np.lexsort((np.arange(len(scores)), -scores))[:k]
+    order = order[np.isfinite(scores[order])]
+    return order, scores[order]
+
+
+def hybrid_scores(sparse_scores, semantic_scores, weight):
+    """Blend of the sparse TF-IDF cosine and the LSA cosine (negative LSA
+    similarity counts as 0)."""
+    return (1.0 - weight) * sparse_scores + weight * np.maximum(semantic_scores, 0.0)
@@ -5,74 +5,373 @@ Replaces BioPortal API calls with local precomputed TF-IDF search.
 
 import os
 import pickle
+import threading
+import time
+import numpy as np
 import ormsgpack
 import pandas as pd
 from scipy import sparse
 from sklearn.metrics.pairwise import linear_kernel
 
+import catalog
+import fts_search
+import hierarchy
+import semantic
+import warm_bundle
+
 
 # Path settings. Resolved against the repo root (this file lives in
 # src/Maptology/) rather than the current working directory, so the caches are
 # found no matter which directory the app is launched from.
 _REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CACHE_DIR = os.path.join(_REPO_ROOT, "tfidf_cache")
-TSV_FILE = os.path.join(_REPO_ROOT, "ontology_cache", "ontology_list.tsv")
+
+# build_all_caches.py publishes each rebuild as tfidf_cache/<ACR>/gen-NNNNNN/
+# and then atomically points tfidf_cache/<ACR>/CURRENT at it. A loaded
+# ontology re-reads CURRENT at most this often and swaps in a newer generation
+# without an app restart.
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+GENERATION_CHECK_INTERVAL_SEC = 30
+
+# Written by build_all_caches.py: {iri: [acronyms]} for every IRI published by
+# more than one ontology (imported OBO terms). Reloaded when the file changes.
+SHARED_IRIS_NAME = "shared_iris.ormsgpack"
+_shared_iris = {"mtime": None, "checked_at": None, "owners": {}}
+
+# Also written by build_all_caches.py: the shared-term block, those terms
+# once each, published and admitted like an ontology. Ontologies loaded while
+# it is published drop their copies of its terms (_drop_shared_terms), and
+# search_local scores the block once per query for all of them.
+SHARED_BLOCK = "_shared"
+SHARED_BLOCK_LABEL = "shared terms"  # its name in refused_ontologies()
+
+# Written by build_all_caches.py for the most used ontologies (warm_start in
+# build_options.json): their caches packed into one file that is memory-mapped
+# here at startup, so they are searchable without loading their cache files.
+WARM_BUNDLE_NAME = "warm_bundle.bin"
+
+# Hybrid search: for ontologies built with LSA embeddings (<ACR>_lsa.npz, see
+# semantic.py) the score is (1 - w) * TF-IDF cosine + w * embedding cosine,
+# over the top HYBRID_CANDIDATE_FACTOR * top_n candidates of each. w = 0
+# gives the plain TF-IDF ranking.
+SEMANTIC_WEIGHT = float(os.environ.get("MAPTOLOGY_SEMANTIC_WEIGHT", "0.3"))
+HYBRID_CANDIDATE_FACTOR = 5
+
+# Search backend. "tfidf" (default) loads each ontology's matrix into memory;
+# "fts" answers from the SQLite/FTS5 file the build writes for ontologies with
+# "fts": true (see fts_search.py) and never loads the matrix - for small
+# machines. Ontologies without such a file are still searched with TF-IDF.
+SEARCH_BACKEND = os.environ.get("MAPTOLOGY_SEARCH_BACKEND", "tfidf").strip().lower()
+
+# Subtree-scoped search (search_local(within=IRI)) and ancestors use the
+# <ACR>_hierarchy.npz the build writes (see hierarchy.py). It is small next to
+# the matrix, is kept per published generation outside the memory budget and
+# also serves the fts backend. A subtree smaller than this fraction of an
+# ontology is scored on its own rows only.
+SUBTREE_SLICE_FRACTION = 0.5
+_hierarchies = {}  # acronym -> (generation, hierarchy dict or None)
+
+
+def _current_generation(acronym):
+    """Return (generation, folder) for the published cache of an ontology.
+    Caches from before generations existed (files directly in <ACR>/) are
+    generation 0. Returns (None, None) if nothing is published."""
+    generation = catalog.published_generation(acronym, CACHE_DIR)
+    if generation is None:
+        return None, None
+    return generation, _generation_folder(acronym, generation)
+
+
+def _generation_folder(acronym, generation):
+    return catalog.generation_folder(acronym, generation, CACHE_DIR)
 
 
 # ============================================================
-# Load ontology list from TSV file (replaces BioPortal API)
+# Ontology list (replaces BioPortal API)
 # ============================================================
 
 def get_ontology_list_from_tsv():
     """
-    Read ontology list from local TSV file.
-    Returns a list of dictionaries with acronym, name, description.
+    List of ontologies with a published TF-IDF cache, as dictionaries with
+    acronym, name, description (plus n_terms, matrix_bytes, generation).
+    Served from the shared catalog (tfidf_cache/catalog.json, written by the
+    build); falls back to ontology_list.tsv when there is no catalog yet.
     This replaces the BioPortal API call in get_available_ontologies().
     """
-    if not os.path.exists(TSV_FILE):
-        print("Error: TSV file not found at " + TSV_FILE)
-        return []
-
-    df = pd.read_csv(TSV_FILE, sep="\t")
-
-    ontology_list = []
-    for i in range(len(df)):
-        row = df.iloc[i]
-        acronym = str(row["abbreviation"])
-        name = str(row["name"])
+    return catalog.ontology_list()
 
-        # Only include ontologies that have a TF-IDF cache built
-        cache_folder = os.path.join(CACHE_DIR, acronym)
-        if os.path.exists(cache_folder):
-            entry = {}
-            entry["acronym"] = acronym
-            entry["name"] = name
-            entry["description"] = ""
-            ontology_list.append(entry)
 
-    # Sort alphabetically by acronym
-    ontology_list.sort(key=lambda x: x["acronym"])
+# ============================================================
+# Cache for loaded TF-IDF data (avoid reloading same ontology)
+# ============================================================
 
-    return ontology_list
+_loaded_ontologies = {}
 
 
 # ============================================================
-# Cache for loaded TF-IDF data (avoid reloading same ontology)
+# Memory admission control
 # ============================================================
+#
+# Every session can select up to 10 ontologies, and all sessions share the
+# loaded caches above. Before an ontology is loaded it must be admitted: its
+# memory cost (memory_bytes in the catalog, measured by the build) has to
+# fit in the budget next to the ontologies already resident. If it does not,
+# resident ontologies that no search is currently using are evicted, least
+# recently used first; if that is not enough, the load waits up to
+# ADMISSION_WAIT_SEC for running searches to finish and is then refused
+# (search_local skips it; refused_ontologies() names it).
+#
+# Budget: MAPTOLOGY_MEMORY_BUDGET_MB, else MEMORY_BUDGET_FRACTION of physical
+# memory; 0 disables the limit.
+
+MEMORY_BUDGET_ENV = "MAPTOLOGY_MEMORY_BUDGET_MB"
+MEMORY_BUDGET_FRACTION = 0.5
+ADMISSION_WAIT_SEC = 10
+# Loaded size of the terms / vectorizer files relative to their size on disk,
+# for caches the catalog has no measured memory_bytes for.
+RESIDENT_SIZE_FACTOR = 5
+
+_admission = threading.Condition()
+_resident = {}    # acronym -> bytes charged against the budget
+_pins = {}        # acronym -> number of searches currently using it
+_last_used = {}   # acronym -> time.monotonic() of the last admission
+_refusals = threading.local()
+
+
+def memory_budget_bytes():
+    """Bytes the loaded caches may use in total (0 = unlimited)."""
+    configured = os.environ.get(MEMORY_BUDGET_ENV, "").strip()
+    if configured:
+        return int(float(configured) * 1024 * 1024)
+    try:
+        physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 0
+    return int(physical * MEMORY_BUDGET_FRACTION)
+
+
+def ontology_cost(acronym):
+    """Estimated bytes one ontology occupies once loaded, or None if it has
+    no published cache. The catalog's memory_bytes when the build measured
+    it; otherwise estimated from the file sizes once per catalog load (so
+    once per published generation) and kept in the catalog entry, since the
+    ontology picker asks on every rerun."""
+    entry = catalog.ontology_entry(acronym)
+    if entry is None:
+        return _estimated_cost(acronym)
+    if entry.get("memory_bytes") is None:
+        entry["memory_bytes"] = _estimated_cost(acronym)
+    return entry["memory_bytes"]
+
+
+def _estimated_cost(acronym):
+    """Loaded size estimated from the published cache files' sizes."""
+    _, folder = _current_generation(acronym)
+    if folder is None:
+        return None
+    total = 0
+    for suffix, factor in (("_tfidf_matrix.npz", 1),
+                           ("_vectorizer.pkl", RESIDENT_SIZE_FACTOR),
+                           ("_terms.ormsgpack", RESIDENT_SIZE_FACTOR)):
+        path = os.path.join(folder, acronym + suffix)
+        if os.path.exists(path):
+            total += os.path.getsize(path) * factor
+    return total
+
+
+def memory_status():
+    """{"budget", "resident", "pinned"} in bytes, for display."""
+    with _admission:
+        resident = sum(_resident.values())
+        pinned = sum(b for a, b in _resident.items() if _pins.get(a))
+    return {"budget": memory_budget_bytes(), "resident": resident, "pinned": pinned}
+
+
+def refused_ontologies():
+    """Ontologies the last search_local call in this thread (i.e. this
+    session's script run) skipped because they did not fit in memory."""
+    return list(getattr(_refusals, "acronyms", []))
+
+
+def _evict(acronym):
+    """Drop an unpinned ontology from the resident set. Callers still holding
+    its data keep it alive until they let go. Returns the bytes released."""
+    _loaded_ontologies.pop(acronym, None)
+    _last_used.pop(acronym, None)
+    return _resident.pop(acronym, 0)
+
+
+def _admit(acronym):
+    """Charge one ontology against the memory budget and pin it (it cannot be
+    evicted until _release). Evicts least recently used unpinned ontologies,
+    then waits for pins to be released. Returns False if it cannot fit.
+    Ontologies served from the warm-start bundle cost nothing: their pages are
+    file-backed and the OS can reclaim them."""
+    budget = memory_budget_bytes()
+    generation, _ = _current_generation(acronym)
+    if not budget:
+        cost = 0
+    elif generation is not None and warm_bundle.bundled_generation(acronym) == generation:
+        cost = 0
+    else:
+        cost = ontology_cost(acronym) or 0
+    deadline = None
+    with _admission:
+        while acronym not in _resident and budget:
+            if cost > budget:
+                print("Refusing " + acronym + ": needs " + str(cost // 1048576)
+                      + " MB, memory budget is " + str(budget // 1048576) + " MB")
+                return False
+            free = budget - sum(_resident.values())
+            unpinned = [a for a in _resident if not _pins.get(a)]
+            unpinned.sort(key=lambda a: _last_used.get(a, 0))
+            while free < cost and unpinned:
+                free += _evict(unpinned.pop(0))
+            if free >= cost:
+                break
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + ADMISSION_WAIT_SEC
+            if now >= deadline:
+                print("Refusing " + acronym + ": " + str(cost // 1048576)
+                      + " MB does not fit next to the ontologies in use")
+                return False
+            _admission.wait(deadline - now)
+        _resident.setdefault(acronym, cost)
+        _pins[acronym] = _pins.get(acronym, 0) + 1
+        _last_used[acronym] = time.monotonic()
+    return True
+
+
+def _release(acronym, loaded=True):
+    """Unpin an admitted ontology. If it was not actually loaded (no cache,
+    read error), its reservation is returned as well."""
+    with _admission:
+        count = _pins.get(acronym, 0) - 1
+        if count > 0:
+            _pins[acronym] = count
+        else:
+            _pins.pop(acronym, None)
+            if not loaded and acronym not in _loaded_ontologies:
+                _resident.pop(acronym, None)
+        _admission.notify_all()
+
+
+def _acquire_ontology_data(acronym, block=None):
+    """Admit, pin and load one ontology. Returns its data (release it with
+    _release when done) or None - no cache, or refused for memory (then
+    recorded for refused_ontologies). `block`: the loaded shared-term block
+    the data has to be split against (see _drop_shared_terms)."""
+    if not _admit(acronym):
+        _refusals.acronyms = getattr(_refusals, "acronyms", []) + [acronym]
+        return None
+    data = _load_ontology_data(acronym, block)
+    if data is None:
+        _release(acronym, loaded=False)
+    return data
 
-_loaded_ontologies = {}
+
+def _acquire_shared_block():
+    """Admit, pin and load the shared-term block, or None if none is
+    published or it was refused (reported as SHARED_BLOCK_LABEL)."""
+    if _current_generation(SHARED_BLOCK)[0] is None:
+        return None
+    block = _acquire_ontology_data(SHARED_BLOCK)
+    if block is None:
+        _refusals.acronyms = [SHARED_BLOCK_LABEL if a == SHARED_BLOCK else a
+                              for a in getattr(_refusals, "acronyms", [])]
+    return block
 
 
-def _load_ontology_data(acronym):
+def _load_ontology_data(acronym, block=None):
     """
     Load precomputed TF-IDF files for one ontology.
-    Uses an in-memory cache so we don't reload the same files.
+    Uses an in-memory cache so we don't reload the same files, but picks up a
+    newly published generation (checked every GENERATION_CHECK_INTERVAL_SEC).
+    The previous data stays valid for callers still holding it and is freed
+    once they drop it; if the new generation fails to load, the old one keeps
+    being served. Given the shared-term `block`, the ontology is also
+    reloaded when it was split against another generation of the block.
     """
-    # Check if already loaded
-    if acronym in _loaded_ontologies:
-        return _loaded_ontologies[acronym]
+    cached = _loaded_ontologies.get(acronym)
+    now = time.monotonic()
+    stale = (cached is not None and block is not None
+             and cached.get("block_generation") != block["generation"])
+    if cached is not None and not stale and now - cached["checked_at"] < GENERATION_CHECK_INTERVAL_SEC:
+        return cached
+
+    generation, folder = _current_generation(acronym)
+    if cached is not None:
+        cached["checked_at"] = now
+        if generation is None or (generation == cached["generation"] and not stale):
+            return cached
+    if folder is None:
+        return None
 
-    folder = os.path.join(CACHE_DIR, acronym)
+    try:
+        data = warm_bundle.load(acronym, generation)
+        if data is None:
+            data = _read_ontology_files(acronym, folder)
+    except Exception as e:
+        # A generation pruned between reading CURRENT and opening its files,
+        # or a damaged file: keep serving what we have.
+        print("Error loading " + acronym + " generation " + str(generation) + ": " + str(e))
+        data = None
+    if data is None:
+        return cached
+
+    data["generation"] = generation
+    data["checked_at"] = now
+    if block is not None:
+        _drop_shared_terms(data, block)
+    _loaded_ontologies[acronym] = data
+
+    return data
+
+
+def _drop_shared_terms(data, block):
+    """Hand the ontology's copies of the block's terms over to the block, so
+    that each shared term is held and scored once: their matrix rows are
+    emptied (the row numbers stay, for the hierarchy and the embeddings) and
+    their records replaced by the block's. data["block_rows"] is the block
+    row of every row, -1 for the ontology's own terms. Bundled ontologies
+    keep their rows in the mapped file; search_local skips them instead."""
+    terms = data["terms"]
+    iris = data.get("iris")
+    if iris is None:
+        iris = [term.get("iri") for term in terms]
+    block_rows = np.full(len(iris), -1, dtype=np.int32)
+    for i, iri in enumerate(iris):
+        row = _row_of_iri(block, iri)
+        if row is not None:
+            block_rows[i] = row
+    data["block_rows"] = block_rows
+    data["block_generation"] = block["generation"]
+
+    shared = np.flatnonzero(block_rows >= 0)
+    if len(shared) == 0 or data.get("bundled"):
+        return
+    keep = np.ones(len(block_rows), dtype=np.float32)
+    keep[shared] = 0
+    matrix = _compact_matrix(sparse.diags(keep) @ data["tfidf_matrix"])
+    matrix.eliminate_zeros()
+    data["tfidf_matrix"] = matrix
+    for i in shared:
+        terms[i] = block["terms"][block_rows[i]]
+
+
+def _compact_matrix(matrix):
+    matrix = matrix.tocsr().astype(np.float32, copy=False)
+    if matrix.nnz < 2 ** 31 and matrix.shape[1] < 2 ** 31:
+        matrix.indices = matrix.indices.astype(np.int32, copy=False)
+        matrix.indptr = matrix.indptr.astype(np.int32, copy=False)
+    return matrix
+
+
+def _read_ontology_files(acronym, folder):
+    """Read the three cache files of one generation folder into a data dict,
+    or return None if any of them is missing."""
 
     # Check if cache exists
     matrix_path = os.path.join(folder, acronym + "_tfidf_matrix.npz")
@@ -92,8 +391,9 @@ def _load_ontology_data(acronym):
     if not os.path.exists(terms_path):
         return None
 
-    # Load TF-IDF matrix
-    tfidf_matrix = sparse.load_npz(matrix_path)
+    # Load TF-IDF matrix as float32 weights with int32 indices. Current builds
+    # store it that way already; older caches (float64 / int64) are cast here.
+    tfidf_matrix = _compact_matrix(sparse.load_npz(matrix_path))
 
     # Load vectorizer
     f = open(vectorizer_path, "rb")
@@ -111,24 +411,147 @@ def _load_ontology_data(acronym):
         terms = json.load(f)
         f.close()
 
-    # Store in cache
     data = {}
     data["tfidf_matrix"] = tfidf_matrix
     data["vectorizer"] = vectorizer
     data["terms"] = terms
 
-    _loaded_ontologies[acronym] = data
+    # Optional LSA embeddings (built only when configured)
+    lsa_path = os.path.join(folder, acronym + "_lsa.npz")
+    if os.path.exists(lsa_path):
+        data["lsa"] = semantic.load_lsa(lsa_path)
 
     return data
 
 
+def _load_shared_iris():
+    """The cross-ontology owner index, re-read at most every
+    GENERATION_CHECK_INTERVAL_SEC and only when the file changed. Returns {}
+    when no index has been built (search then falls back to merging
+    duplicate results)."""
+    now = time.monotonic()
+    checked_at = _shared_iris["checked_at"]
+    if checked_at is not None and now - checked_at < GENERATION_CHECK_INTERVAL_SEC:
+        return _shared_iris["owners"]
+    _shared_iris["checked_at"] = now
+
+    path = os.path.join(CACHE_DIR, SHARED_IRIS_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _shared_iris["mtime"] = None
+        _shared_iris["owners"] = {}
+        return _shared_iris["owners"]
+    if mtime != _shared_iris["mtime"]:
+        try:
+            with open(path, "rb") as f:
+                _shared_iris["owners"] = ormsgpack.unpackb(f.read())
+            _shared_iris["mtime"] = mtime
+        except Exception as e:
+            print("Error loading " + path + ": " + str(e))
+    return _shared_iris["owners"]
+
+
+def _shared_rows(data, owners_map):
+    """{row: owners} for the rows of one ontology whose IRI is shared with
+    other ontologies. Recomputed when the shared index changes."""
+    version = _shared_iris["mtime"]
+    cached = data.get("shared_rows")
+    if cached is None or cached[0] != version:
+        rows = {}
+        if owners_map:
+            iris = data.get("iris")
+            if iris is None:
+                iris = [term.get("iri") for term in data["terms"]]
+            for i, iri in enumerate(iris):
+                owners = owners_map.get(iri)
+                if owners:
+                    rows[i] = owners
+        cached = (version, rows)
+        data["shared_rows"] = cached
+    return cached[1]
+
+
+# ============================================================
+# Class hierarchy (subtree-scoped search, ancestors)
+# ============================================================
+
+def _load_hierarchy(acronym, generation):
+    """The hierarchy of one generation of an ontology, or None if it was
+    built without one. Kept until another generation is asked for."""
+    cached = _hierarchies.get(acronym)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    path = hierarchy.hierarchy_path(acronym, _generation_folder(acronym, generation))
+    h = None
+    if os.path.exists(path):
+        try:
+            h = hierarchy.load_hierarchy(path)
+        except Exception as e:
+            print("Error loading " + path + ": " + str(e))
+    _hierarchies[acronym] = (generation, h)
+    return h
+
+
+def _row_of_iri(data, iri):
+    """Row of the first term with this IRI in a loaded ontology, or None."""
+    index = data.get("iri_index")
+    if hasattr(index, "row"):
+        return index.row(iri)  # warm-start bundle
+    rows = data.get("iri_rows")
+    if rows is None:
+        rows = {}
+        for i, term in enumerate(data["terms"]):
+            rows.setdefault(term.get("iri"), i)
+        data["iri_rows"] = rows
+    return rows.get(iri)
+
+
+def _subtree_rows(h, row):
+    """Rows under (and including) a row, or None if there is no such term."""
+    if h is None or row is None:
+        return None
+    return hierarchy.descendant_rows(h, row)
+
+
+def get_ancestors(acronym, iri):
+    """Every ancestor of one term in the given ontology, as term dicts
+    (label, iri, synonyms, definition), roots first. [] if the term is
+    unknown, has no parents or the ontology was built without a hierarchy."""
+    if not acronym or not iri:
+        return []
+    fts_file = _fts_file(acronym)
+    if fts_file is not None:
+        generation, _ = _current_generation(acronym)
+        h = _load_hierarchy(acronym, generation)
+        row = fts_search.row_of_iri(fts_file, iri)
+        if h is None or row is None:
+            return []
+        return [fts_search.term_at(fts_file, r) for r in hierarchy.ancestor_rows(h, row)]
+    data = _acquire_ontology_data(acronym)
+    if data is None:
+        return []
+    try:
+        h = _load_hierarchy(acronym, data["generation"])
+        row = _row_of_iri(data, iri)
+        if h is None or row is None:
+            return []
+        terms = data["terms"]
+        return [terms[int(r)] for r in hierarchy.ancestor_rows(h, row)]
+    finally:
+        _release(acronym)
+
+
 # ============================================================
 # Look up a single term by its IRI (used by mapping re-import)
 # ============================================================
 
-def get_term_by_iri(acronym, iri):
+def get_term_by_iri(acronym, iri, unavailable=None):
     """Return the cached term dict (label, iri, synonyms, definition) for one
-    IRI within the given ontology, or None if not found.
+    IRI within the given ontology, or None if not found. If the ontology
+    could not be loaded (refused by admission control, or a failed load),
+    `unavailable` is returned instead, so callers that need to can tell
+    "not in this ontology" from "could not look".
 
     Builds a per-ontology IRI index on first use so repeated lookups are O(1).
     Used on import to refresh a saved mapping's label/definition from the
@@ -136,25 +559,157 @@ def get_term_by_iri(acronym, iri):
     """
     if not acronym or not iri:
         return None
-    data = _load_ontology_data(acronym)
+    fts_file = _fts_file(acronym)
+    if fts_file is not None:
+        return fts_search.term_by_iri(fts_file, iri)
+    data = _acquire_ontology_data(acronym)
     if data is None:
-        return None
-    index = data.get("iri_index")
-    if index is None:
-        index = {}
-        for term in data["terms"]:
-            term_iri = term.get("iri")
-            if term_iri and term_iri not in index:
-                index[term_iri] = term
-        data["iri_index"] = index
-    return index.get(iri)
+        return unavailable
+    try:
+        index = data.get("iri_index")
+        if index is None:
+            index = {}
+            for term in data["terms"]:
+                term_iri = term.get("iri")
+                if term_iri and term_iri not in index:
+                    index[term_iri] = term
+            data["iri_index"] = index
+        return index.get(iri)
+    finally:
+        _release(acronym)
 
 
 # ============================================================
 # Main search function (replaces BioPortal API search)
 # ============================================================
 
-def search_local(search_term, selected_ontologies, top_n=10):
+def _fts_file(acronym):
+    """The ontology's FTS5 file when the fts backend is selected and the
+    published generation has one, else None."""
+    if SEARCH_BACKEND != "fts":
+        return None
+    _, folder = _current_generation(acronym)
+    if folder is None:
+        return None
+    path = fts_search.fts_path(acronym, folder)
+    if not os.path.exists(path):
+        return None
+    return path
+
+
+def _fts_hits(path, search_term, top_n, owners_map, rows=None):
+    """[(score, term, owners)] of the top_n matches in one ontology's FTS5
+    file. `rows`: restrict to these term rows (a subtree)."""
+    return [(score, term, owners_map.get(term["iri"]) or [])
+            for _, score, term in fts_search.search(path, search_term, top_n, rows)]
+
+
+def _add_result(all_results, seen, acronym, term, score, owners):
+    label = term.get("label", "")
+    if not label:
+        return
+
+    definition = term.get("definition", "No definition available")
+    iri = term.get("iri", "N/A")
+    synonyms = term.get("synonyms", []) or []
+
+    # The same IRI from several ontologies is returned once, as the ontology
+    # that scored it best (ties: the first selected), listing all of them.
+    earlier = seen.get(iri)
+    if earlier is not None and float(score) <= earlier["Mapping Score"]:
+        if acronym not in earlier["Ontologies"]:
+            earlier["Ontologies"].append(acronym)
+        return
+
+    result = {}
+    result["Ontology Name"] = acronym
+    result["Preferred Label"] = label
+    result["Definition"] = definition
+    result["Synonyms"] = synonyms
+    result["Ontology URI"] = "https://bioportal.bioontology.org/ontologies/" + acronym
+    result["Ontology Term URI"] = iri
+    # Keep the RAW similarity as the sort key. Rounding here (e.g. to 3
+    # decimals) would create artificial ties that then get ordered by
+    # Preferred Label, which can change the Top-10 boundary. The score is
+    # never displayed, so there is no reason to round it.
+    result["Mapping Score"] = float(score)
+    result["Ontologies"] = [acronym] + [o for o in owners if o != acronym]
+
+    if earlier is not None:
+        for other in earlier["Ontologies"]:
+            if other not in result["Ontologies"]:
+                result["Ontologies"].append(other)
+        all_results[all_results.index(earlier)] = result
+    else:
+        all_results.append(result)
+    seen[iri] = result
+
+
+def _hybrid_score_array(data, query_vector, score_array, top_n, weight):
+    """Replace the TF-IDF scores of one ontology by hybrid scores on the union
+    of the TF-IDF and the embedding top candidates (other rows score 0).
+    Returns score_array unchanged when the ontology has no embeddings or the
+    query has no feature the embeddings know."""
+    lsa = data.get("lsa")
+    if lsa is None or weight <= 0:
+        return score_array
+    query_embedding = semantic.embed_query(lsa, query_vector)
+    if query_embedding is None:
+        return score_array
+    pool = top_n * HYBRID_CANDIDATE_FACTOR
+    if len(score_array) > pool:
+        lexical = np.argpartition(-score_array, pool)[:pool]
+    else:
+        lexical = np.arange(len(score_array))
+    lexical = lexical[score_array[lexical] > 0]
+    nearest, _ = semantic.top_k(lsa, query_embedding, pool)
+    candidates = np.union1d(lexical, nearest)
+    hybrid = np.zeros_like(score_array)
+    hybrid[candidates] = semantic.hybrid_scores(
+        score_array[candidates],
+        semantic.scores_for_rows(lsa, query_embedding, candidates),
+        weight)
+    return hybrid
+
+
+def _score_array(data, search_term, top_n, weight, subtree=None):
+    """Scores of every row of one loaded ontology (or the shared-term block)
+    for the query: cosine, or hybrid for ontologies with embeddings. With
+    `subtree`, rows outside it score 0."""
+    tfidf_matrix = data["tfidf_matrix"]
+    vectorizer = data["vectorizer"]
+
+    # Convert search term to vector. The vectorizer is a TfidfVectorizer or,
+    # for ontologies built in hashing mode, a HashingVectorizer +
+    # TfidfTransformer pipeline; both map a query into the matrix's space.
+    # Cast to float32 to match the matrix (older vectorizers emit float64,
+    # which would upcast the whole product).
+    query_vector = vectorizer.transform([search_term]).astype(np.float32, copy=False)
+
+    # Compute cosine similarity (for a small subtree, on its rows only)
+    n_rows = tfidf_matrix.shape[0]
+    if subtree is not None and len(subtree) < n_rows * SUBTREE_SLICE_FRACTION:
+        score_array = np.zeros(n_rows, dtype=np.float32)
+        score_array[subtree] = linear_kernel(query_vector, tfidf_matrix[subtree])[0]
+    else:
+        scores = linear_kernel(query_vector, tfidf_matrix)
+        score_array = scores[0]
+    score_array = _hybrid_score_array(data, query_vector, score_array, top_n, weight)
+    if subtree is not None:
+        inside = np.zeros(n_rows, dtype=bool)
+        inside[subtree] = True
+        score_array[~inside] = 0  # embedding neighbours outside the subtree
+    return score_array
+
+
+def _top_rows(score_array, top_n):
+    """Rows of the top_n scores above 0, best first."""
+    top_indices = score_array.argsort()[::-1][:top_n]
+    return [idx for idx in top_indices if score_array[idx] > 0]
+
+
+def search_local(search_term, selected_ontologies, top_n=10, semantic_weight=None,
+                 within=None):
     """
     Search for a term across selected ontologies using precomputed TF-IDF.
 
@@ -162,12 +717,33 @@ def search_local(search_term, selected_ontologies, top_n=10):
         search_term: string to search for (e.g. "gender")
         selected_ontologies: list of ontology acronyms (e.g. ["NCIT", "EFO"])
         top_n: number of results per ontology
+        semantic_weight: weight of the LSA embedding cosine in the hybrid
+            score (default SEMANTIC_WEIGHT; 0 = TF-IDF only)
+        within: IRI of a class; only that class and its descendants are
+            returned. Ontologies that do not contain it, or were built
+            without a hierarchy, are skipped.
 
     Returns:
         pandas DataFrame with columns:
             Ontology Name, Preferred Label, Definition,
-            Ontology URI, Ontology Term URI
+            Ontology URI, Ontology Term URI, Mapping Score,
+            Ontologies (every ontology that contains the term, this one first)
         Returns None if no results found.
+
+    A term imported by several ontologies is kept once, in the shared-term
+    block, and scored there once per query: the block's top N among the
+    terms of the selected ontologies is returned along with each ontology's
+    own top N, so the ranking does not depend on the selection order. It is
+    returned as its canonical owner if that is selected, else as the first
+    selected owner; "Ontologies" lists every ontology that contains it.
+    Without a published block each ontology scores its own copy and the best
+    one is kept. Every IRI appears at most once.
+
+    Ontologies that do not fit in the memory budget are skipped; see
+    refused_ontologies(). For ontologies built with LSA embeddings the
+    Mapping Score is the hybrid score (see _hybrid_score_array); with the
+    fts backend it is the BM25 score (see fts_search.py) divided by the best
+    BM25 score of the query, so it is in [0, 1] like the cosines.
     """
     if not search_term:
         return None
@@ -179,62 +755,97 @@ def search_local(search_term, selected_ontologies, top_n=10):
     if len(search_term) == 0:
         return None
 
+    _refusals.acronyms = []
+    if semantic_weight is None:
+        semantic_weight = SEMANTIC_WEIGHT
     all_results = []
-
-    # Search each selected ontology
-    for acronym in selected_ontologies:
-        # Load precomputed data
-        data = _load_ontology_data(acronym)
-
-        if data is None:
-            continue
-
-        tfidf_matrix = data["tfidf_matrix"]
-        vectorizer = data["vectorizer"]
-        terms = data["terms"]
-
-        # Convert search term to vector
-        query_vector = vectorizer.transform([search_term])
-
-        # Compute cosine similarity
-        scores = linear_kernel(query_vector, tfidf_matrix)
-        score_array = scores[0]
-
-        # Get top N indices
-        sorted_indices = score_array.argsort()[::-1]
-        top_indices = sorted_indices[:top_n]
-
-        # Build results
-        for idx in top_indices:
-            score = score_array[idx]
-
-            if score <= 0:
+    owners_map = _load_shared_iris()
+    seen = {}  # iri -> result
+    scored = []  # (acronym, [(score, term, owners)], from the FTS backend)
+    best_bm25 = 0.0
+    block = None  # the shared-term block, acquired with the first loaded ontology
+    block_searched = False
+    via_block = []  # (acronym, block rows of its terms in scope)
+
+    try:
+        # Search each selected ontology
+        for acronym in selected_ontologies:
+            # On-disk backend: nothing to load or admit
+            fts_file = _fts_file(acronym)
+            if fts_file is not None:
+                subtree = None
+                if within:
+                    generation, _ = _current_generation(acronym)
+                    subtree = _subtree_rows(_load_hierarchy(acronym, generation),
+                                            fts_search.row_of_iri(fts_file, within))
+                    if subtree is None:
+                        continue
+                hits = _fts_hits(fts_file, search_term, top_n, owners_map, subtree)
+                if hits:
+                    best_bm25 = max(best_bm25, hits[0][0])
+                scored.append((acronym, hits, True))
                 continue
 
-            term = terms[idx]
+            if not block_searched:
+                block_searched = True
+                block = _acquire_shared_block()
 
-            label = term.get("label", "")
-            if not label:
-                continue
+            # Load precomputed data (admitted against the memory budget and
+            # pinned - not evictable - while it is being scored)
+            data = _acquire_ontology_data(acronym, block)
 
-            definition = term.get("definition", "No definition available")
-            iri = term.get("iri", "N/A")
-            synonyms = term.get("synonyms", []) or []
-
-            result = {}
-            result["Ontology Name"] = acronym
-            result["Preferred Label"] = label
-            result["Definition"] = definition
-            result["Synonyms"] = synonyms
-            result["Ontology URI"] = "https://bioportal.bioontology.org/ontologies/" + acronym
-            result["Ontology Term URI"] = iri
-            # Keep the RAW similarity as the sort key. Rounding here (e.g. to 3
-            # decimals) would create artificial ties that then get ordered by
-            # Preferred Label, which can change the Top-10 boundary. The score is
-            # never displayed, so there is no reason to round it.
-            result["Mapping Score"] = float(score)
-
-            all_results.append(result)
+            if data is None:
+                continue
+            try:
+                subtree = None
+                if within:
+                    subtree = _subtree_rows(_load_hierarchy(acronym, data["generation"]),
+                                            _row_of_iri(data, within))
+                    if subtree is None:
+                        continue
+
+                shared_rows = _shared_rows(data, owners_map)
+                terms = data["terms"]
+                score_array = _score_array(data, search_term, top_n, semantic_weight, subtree)
+
+                # Terms held by the shared-term block are scored there
+                block_rows = data.get("block_rows")
+                if block_rows is not None:
+                    score_array[block_rows >= 0] = 0
+                    if block is not None:
+                        in_scope = block_rows if subtree is None else block_rows[subtree]
+                        via_block.append((acronym, in_scope[in_scope >= 0]))
+
+                hits = [(score_array[idx], terms[idx], shared_rows.get(idx) or [])
+                        for idx in _top_rows(score_array, top_n)]
+                scored.append((acronym, hits, False))
+            finally:
+                _release(acronym)
+
+        # The shared terms of the searched ontologies, scored once
+        if via_block:
+            rows = np.unique(np.concatenate([r for _, r in via_block]))
+            score_array = _score_array(block, search_term, top_n, semantic_weight, rows)
+            top = _top_rows(score_array, top_n)
+            found_in = [(a, set(np.asarray(top)[np.isin(top, r)].tolist())) for a, r in via_block]
+            for idx in top:
+                term = block["terms"][idx]
+                owners = term.get("owners") or []
+                searched = [a for a, found in found_in if idx in found]
+                acronym = next((o for o in owners if o in searched), searched[0])
+                scored.append((acronym, [(score_array[idx], term, owners)], False))
+    finally:
+        if block is not None:
+            _release(SHARED_BLOCK)
+
+    # BM25 is unbounded while the cosines are at most 1: scale the BM25 scores
+    # by the best one for this query, so that FTS and TF-IDF ontologies share
+    # one [0, 1] Mapping Score when they are ranked and merged together.
+    for acronym, hits, is_fts in scored:
+        for score, term, owners in hits:
+            if is_fts:
+                score = score / best_bm25 if best_bm25 > 0 else 0.0
+            _add_result(all_results, seen, acronym, term, score, owners)
 
     if len(all_results) == 0:
         return None
@@ -249,4 +860,8 @@ def search_local(search_term, selected_ontologies, top_n=10):
     # Actually keep it - it can be useful
     # df_results = df_results.drop(columns=["Mapping Score"])
 
-    return df_results
\ No newline at end of file
+    return df_results
+
+
+# Map the warm-start bundle once at startup (re-mapped when a build replaces it).
+warm_bundle.open_bundle(os.path.join(CACHE_DIR, WARM_BUNDLE_NAME))
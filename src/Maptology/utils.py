@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
+import heapq
 import re
 from dateutil import parser as date_parser
 
 # BioPortal API is no longer used (local TF-IDF search only) / BioPortal API 더 이상 사용 안 함
 API_KEY = ""
 
+# 컬럼 정보에 보여줄 값 개수 / Unique values the column info lists (kept in the profile)
+PROFILE_DISPLAY_VALUES = 5
+
 # 세션 상태 초기화 / Initialize session state
 def initialize_session():
     if 'api_key' not in st.session_state:
@@ -71,6 +75,10 @@ def initialize_session():
         st.session_state.filtered_ontology_results = None
     if 'ontologies_changed' not in st.session_state:
         st.session_state.ontologies_changed = False
+    # 하위 트리 검색 제한 / Limit suggestions to one term's subtree
+    # ({iri, label, ontology} or None)
+    if 'subtree_root' not in st.session_state:
+        st.session_state.subtree_root = None
     if 'search_terms_selections' not in st.session_state:
         st.session_state.search_terms_selections = {}
     
@@ -318,15 +326,15 @@ def get_friendly_dtype(dtype):
         return "String"
 
 # dateutil을 사용하여 컬럼 타입 자동 감지 / Auto-detect column type using dateutil
-def detect_column_type(df, column_name):
-    dtype = df[column_name].dtype
+def _infer_column_type(series):
+    dtype = series.dtype
     dtype_name = str(dtype)
     
     # object(string) 타입이 아니면 pandas dtype 그대로 사용 / Use pandas dtype if not object
     if dtype_name not in ['object', 'str'] and not dtype_name.startswith('string') and dtype_name != 'category':
         return get_friendly_dtype(dtype)
     
-    values = df[column_name].dropna()
+    values = series.dropna()
     if len(values) == 0:
         return "String"
     
@@ -374,6 +382,73 @@ def detect_column_type(df, column_name):
     else:
         return "Date"
 
+# 컬럼 프로파일 생성 / Build a column profile: everything the column
+# information, type checks and value lists need, from one pass over the column.
+#   type          auto-detected type ("String", "Integer", "Date", ...)
+#   values        unique non-null values, sorted (numbers numerically; by str
+#                 when the values cannot be compared)
+#   display_values  the first PROFILE_DISPLAY_VALUES of them sorted by str
+#                 (what the column info shows)
+#   nulls         number of missing rows
+#   range         (min, max, mean), or None if the column has no numeric range
+#   has_decimals  a value has a fractional part (blocks Float -> Integer)
+#   date_range    (min, max) datetimes; filled on first use (date_range_of)
+def _build_column_profile(series):
+    uniques = series.dropna().unique()
+    try:
+        values = pd.Index(uniques).sort_values().tolist()
+    except TypeError:
+        values = sorted(pd.Index(uniques).tolist(), key=str)
+    value_range = None
+    if pd.api.types.is_numeric_dtype(series.dtype) or series.dtype == object:
+        try:
+            value_range = (series.min(), series.max(), series.mean())
+        except (TypeError, ValueError):
+            value_range = None
+    has_decimals = False
+    if pd.api.types.is_float_dtype(series.dtype):
+        has_decimals = any(not float(v).is_integer() for v in values)
+    return {
+        "dtype": str(series.dtype),
+        "type": _infer_column_type(series),
+        "values": values,
+        "display_values": (values[:PROFILE_DISPLAY_VALUES] if all(type(v) is str for v in values)
+                           else heapq.nsmallest(PROFILE_DISPLAY_VALUES, values, key=str)),
+        "nulls": int(series.isna().sum()),
+        "range": value_range,
+        "has_decimals": has_decimals,
+    }
+
+# 컬럼 프로파일 가져오기 / The profile of a column, computed once per uploaded
+# file and column and cached with the parsed frame (ingest.py); a column
+# converted by change_column_type is profiled again for this session
+def get_column_profile(df, column_name):
+    if df is st.session_state.get('uploaded_df'):
+        import ingest
+        return ingest.column_profile(st.session_state, column_name, _build_column_profile)
+    return _build_column_profile(df[column_name])
+
+# 날짜 범위 / (min, max) datetimes of a column: directly for datetime columns,
+# otherwise each unique value parsed with dateutil once (unparseable ones are
+# skipped); None if nothing parses. Stored in the profile on first use.
+def date_range_of(profile):
+    if "date_range" not in profile:
+        if profile["dtype"].startswith('datetime'):
+            dates = profile["values"]
+        else:
+            dates = []
+            for val in profile["values"]:
+                try:
+                    dates.append(date_parser.parse(str(val)))
+                except (ValueError, OverflowError, TypeError):
+                    pass
+        profile["date_range"] = (min(dates), max(dates)) if dates else None
+    return profile["date_range"]
+
+# 자동 감지된 컬럼 타입 / Auto-detected column type (from the column profile)
+def detect_column_type(df, column_name):
+    return get_column_profile(df, column_name)["type"]
+
 # 사용자가 선택한 데이터 타입을 가져오는 함수 / Get user-selected data type
 def get_column_data_type(column_name):
     if column_name in st.session_state.get('column_data_types', {}):
@@ -387,8 +462,8 @@ def validate_type_change(column_name, new_type):
     if st.session_state.uploaded_df is None:
         return True, ""
     
-    df = st.session_state.uploaded_df
-    actual_dtype = detect_column_type(df, column_name)
+    profile = get_column_profile(st.session_state.uploaded_df, column_name)
+    actual_dtype = profile["type"]
     
     if actual_dtype == new_type:
         return True, ""
@@ -419,13 +494,7 @@ def validate_type_change(column_name, new_type):
     
     if actual_dtype == "Float":
         if new_type == "Integer":
-            col_data = df[column_name].dropna()
-            has_decimals = False
-            for val in col_data:
-                if val != int(val):
-                    has_decimals = True
-                    break
-            if has_decimals:
+            if profile["has_decimals"]:
                 return False, "This column contains at least one floating-point value and cannot be converted to Integer."
             else:
                 return True, ""
@@ -462,71 +531,61 @@ def validate_type_change(column_name, new_type):
 
 # 컬럼 정보 표시 함수 / Display column info function
 def display_column_info(df, column_name, user_type=None):
-    dtype = df[column_name].dtype
-    dtype_name = str(dtype)
+    profile = get_column_profile(df, column_name)
+    dtype_name = profile["dtype"]
     
     # 사용자가 String을 선택하면 → 항상 unique values 표시 / If user selected String → always show unique values
     if user_type == "String":
-        unique_values = sorted(df[column_name].dropna().unique(), key=str)
-        total_count = len(unique_values)
-        display_values = unique_values[:5]
+        total_count = len(profile["values"])
+        display_values = profile["display_values"]
         values_str = ", ".join([str(v) for v in display_values])
         
-        if total_count > 5:
-            remaining = total_count - 5
+        if total_count > PROFILE_DISPLAY_VALUES:
+            remaining = total_count - PROFILE_DISPLAY_VALUES
             st.markdown(f'<div class="unique-values-display"><strong>Unique values:</strong> {values_str}... <em>(+{remaining} more, {total_count} total)</em></div>', unsafe_allow_html=True)
         else:
             st.markdown(f'<div class="unique-values-display"><strong>Unique values:</strong> {values_str} <em>({total_count} total)</em></div>', unsafe_allow_html=True)
         return
     
     if user_type == "Boolean":
-        unique_values = sorted(df[column_name].dropna().unique(), key=str)
-        total_count = len(unique_values)
-        values_str = ", ".join([str(v) for v in unique_values])
+        total_count = len(profile["values"])
+        values_str = ", ".join([str(v) for v in profile["display_values"]])
+        if total_count > PROFILE_DISPLAY_VALUES:
+            values_str += "..."
         st.markdown(f'<div class="unique-values-display"><strong>Unique values:</strong> {values_str} <em>({total_count} total)</em></div>', unsafe_allow_html=True)
         return
     
     # 숫자 타입 / Numeric types
     if user_type in ["Float", "Integer"] or dtype_name.startswith('float') or dtype_name.startswith('int'):
-        try:
-            min_val = df[column_name].min()
-            max_val = df[column_name].max()
-            mean_val = df[column_name].mean()
-            st.markdown(f'<div class="unique-values-display"><strong>Range:</strong> {min_val} - {max_val} &nbsp;&nbsp;|&nbsp;&nbsp; <strong>Average:</strong> {mean_val:.2f}</div>', unsafe_allow_html=True)
-            return
-        except (TypeError, ValueError):
-            pass
+        if profile["range"] is not None:
+            min_val, max_val, mean_val = profile["range"]
+            try:
+                st.markdown(f'<div class="unique-values-display"><strong>Range:</strong> {min_val} - {max_val} &nbsp;&nbsp;|&nbsp;&nbsp; <strong>Average:</strong> {mean_val:.2f}</div>', unsafe_allow_html=True)
+                return
+            except (TypeError, ValueError):
+                pass
     
     # 날짜/시간 타입 / Date/time types
     if user_type in ["Date", "Datetime", "Time"] or dtype_name.startswith('datetime'):
         try:
+            date_range = date_range_of(profile)
             # pandas datetime이면 바로 사용 / Use directly if pandas datetime
             if dtype_name.startswith('datetime'):
-                min_date = df[column_name].min()
-                max_date = df[column_name].max()
-            else:
-                # string인 경우 dateutil로 파싱 / Parse with dateutil if string
-                parsed_dates = []
-                for val in df[column_name].dropna():
-                    try:
-                        parsed_dates.append(date_parser.parse(str(val)))
-                    except (ValueError, OverflowError, TypeError):
-                        pass
-                if parsed_dates:
-                    min_date = min(parsed_dates)
-                    max_date = max(parsed_dates)
-                    if user_type == "Time":
-                        min_date = min_date.strftime("%H:%M:%S")
-                        max_date = max_date.strftime("%H:%M:%S")
-                    elif user_type == "Date":
-                        min_date = min_date.strftime("%Y-%m-%d")
-                        max_date = max_date.strftime("%Y-%m-%d")
-                    else:
-                        min_date = min_date.strftime("%Y-%m-%d %H:%M:%S")
-                        max_date = max_date.strftime("%Y-%m-%d %H:%M:%S")
+                min_date, max_date = date_range if date_range else (pd.NaT, pd.NaT)
+            elif date_range:
+                min_date, max_date = date_range
+                if user_type == "Time":
+                    min_date = min_date.strftime("%H:%M:%S")
+                    max_date = max_date.strftime("%H:%M:%S")
+                elif user_type == "Date":
+                    min_date = min_date.strftime("%Y-%m-%d")
+                    max_date = max_date.strftime("%Y-%m-%d")
                 else:
-                    min_date = "N/A"
-                    max_date = "N/A"
+                    min_date = min_date.strftime("%Y-%m-%d %H:%M:%S")
+                    max_date = max_date.strftime("%Y-%m-%d %H:%M:%S")
+            else:
+                min_date = "N/A"
+                max_date = "N/A"
             st.markdown(f'<div class="unique-values-display"><strong>Range:</strong> {min_date} - {max_date}</div>', unsafe_allow_html=True)
             return
         except (TypeError, ValueError):
@@ -534,13 +593,12 @@ def display_column_info(df, column_name, user_type=None):
     
     # 문자열 / String
     if dtype_name in ['object', 'str'] or dtype_name.startswith('string') or dtype_name == 'category':
-        unique_values = sorted(df[column_name].dropna().unique(), key=str)
-        total_count = len(unique_values)
-        display_values = unique_values[:5]
+        total_count = len(profile["values"])
+        display_values = profile["display_values"]
         values_str = ", ".join([str(v) for v in display_values])
         
-        if total_count > 5:
-            remaining = total_count - 5
+        if total_count > PROFILE_DISPLAY_VALUES:
+            remaining = total_count - PROFILE_DISPLAY_VALUES
             st.markdown(f'<div class="unique-values-display"><strong>Unique values:</strong> {values_str}... <em>(+{remaining} more, {total_count} total)</em></div>', unsafe_allow_html=True)
         else:
             st.markdown(f'<div class="unique-values-display"><strong>Unique values:</strong> {values_str} <em>({total_count} total)</em></div>', unsafe_allow_html=True)
@@ -568,6 +626,9 @@ def change_column_type(column_name, new_type):
                 df[column_name] = pd.to_datetime(df[column_name], errors='coerce')
             
             st.session_state.uploaded_df = df
+            # 변환된 컬럼은 세션 전용 프로파일 / The converted column gets its own profile
+            import ingest
+            ingest.column_modified(st.session_state, column_name)
             for i, mapping in enumerate(st.session_state.mapped_terms):
                 if mapping["Original Label"] == column_name:
                     st.session_state.mapped_terms[i]["Data Type"] = new_type
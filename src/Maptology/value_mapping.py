@@ -1,7 +1,7 @@
 import hashlib
 
 import streamlit as st
-from ontology import search_ontology_for_value, search_bioportal_manual_value, get_ontology_details
+from ontology import search_ontology_for_value, search_bioportal_manual_value, get_ontology_details, get_term_ancestors
 from mapping import (
     on_value_select,
     is_value_term_mapped,
@@ -9,7 +9,7 @@ from mapping import (
     remove_value_term,
 )
 from components import show_term_modal
-from utils import validate_type_change, get_column_data_type
+from utils import validate_type_change, get_column_data_type, get_column_profile
 
 
 def _render_value_checklist(df, key_prefix, column, value):
@@ -50,7 +50,11 @@ def _render_value_checklist(df, key_prefix, column, value):
             # is the same widget family as the ℹ️ button, which already lines up
             # with the checkbox, so it sits on the same line. Plain markdown text
             # centers within its block and drifts slightly lower than the widgets.
-            st.button(str(row['Ontology Name']), key="ont_" + unique_key, disabled=True, type="tertiary")
+            # Terms imported by several ontologies list the others on hover.
+            others = [o for o in (row.get('Ontologies') or []) if o != row['Ontology Name']]
+            st.button(str(row['Ontology Name']) + (" +" + str(len(others)) if others else ""),
+                      key="ont_" + unique_key, disabled=True, type="tertiary",
+                      help=("Also in: " + ", ".join(others)) if others else None)
         sep2.markdown(DIVIDER, unsafe_allow_html=True)
         with info_btn_col:
             if st.button("ℹ️", key="prev_" + unique_key, help="View term details", type="tertiary"):
@@ -62,6 +66,7 @@ def _render_value_checklist(df, key_prefix, column, value):
                     "definition": row['Definition'],
                     "term_uri": row['Ontology Term URI'],
                     "synonyms": row.get('Synonyms', []),
+                    "ancestors": get_term_ancestors(row['Ontology Name'], row['Ontology Term URI']),
                 })
 
         if result != is_checked:
@@ -89,8 +94,8 @@ def render_value_mapping_section():
         return
 
     # Check current data type
-    current_dtype = df[selected_col].dtype
-    dtype_name = str(current_dtype)
+    profile = get_column_profile(df, selected_col)
+    dtype_name = profile["dtype"]
 
     # If user selected String, allow value mapping even for numeric data
     if user_type == "String":
@@ -101,14 +106,13 @@ def render_value_mapping_section():
         show_value_mapping = False
 
     if show_value_mapping:
-        unique_values = df[selected_col].dropna().unique()
-        unique_values.sort()
+        unique_values = profile["values"]
 
         if len(unique_values) > 0:
             st.markdown('<div class="sub-heading">Select a unique value from column \'' + selected_col + '\' to map to an ontology term</div>', unsafe_allow_html=True)
 
             # Convert to string for display
-            value_options = [str(v) for v in unique_values[:5].tolist()]
+            value_options = [str(v) for v in unique_values[:5]]
 
             if st.session_state.selected_unique_value is None or st.session_state.selected_unique_value not in value_options:
                 default_value = value_options[0] if value_options else None
@@ -0,0 +1,292 @@
+"""
+Warm-start bundle: the most used ontologies packed into one memory-mappable
+file, tfidf_cache/warm_bundle.bin, written by build_all_caches.py for the
+ontologies marked "warm_start": true in ontology_cache/build_options.json.
+
+Layout (all integers little-endian):
+
+    0   b"MAPTWB01"                 magic
+    8   uint64 header offset
+    16  uint64 header length
+    64  sections, each 64-byte aligned
+    ... header (UTF-8 JSON) at the end
+
+The header is the offset table: for each ontology its published generation,
+shape, vectorizer settings and {section: [offset, length, dtype]} for
+
+    matrix_data / matrix_indices / matrix_indptr   the CSR TF-IDF matrix
+    idf                                            the vectorizer's IDF weights
+    vocab_offsets / vocab_blob                     feature names in feature
+                                                   order (= sorted order)
+    <field>_offsets / <field>_blob                 term columns (label, iri,
+                                                   definition, synonyms joined
+                                                   by SYNONYM_SEPARATOR)
+    iri_order                                      rows sorted by IRI
+    lsa_<array>                                    LSA embeddings, if built
+                                                   (see semantic.py)
+
+The app maps the whole file once (open_bundle, at import of tfidf_search) and
+serves a bundled ontology straight from the mapping: the matrix arrays are
+views into it, queries are vectorized by binary search over the vocabulary
+section and term records are decoded on access. Nothing is unpickled or
+unpacked, so a fresh process can search the hot set as soon as the pages are
+read in. An entry is only used while its generation is still the published
+one; anything else is loaded from the cache files as before.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+MAGIC = b"MAPTWB01"
+PREAMBLE = struct.Struct("<8sQQ")
+SYNONYM_SEPARATOR = "\x1f"
+TERM_FIELDS = ("label", "iri", "definition", "synonyms")
+CHECK_INTERVAL_SEC = 30
+
+_bundle = {"path": None, "mtime": None, "checked_at": None, "mm": None, "header": {}}
+
+
+def open_bundle(path):
+    """Map the bundle at `path` (again, if the file was replaced). Returns
+    the number of ontologies it holds; 0 if there is no usable bundle."""
+    _bundle["path"] = path
+    _bundle["checked_at"] = time.monotonic()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _bundle["mtime"] = None
+        _bundle["mm"] = None
+        _bundle["header"] = {}
+        return 0
+    if mtime == _bundle["mtime"]:
+        return len(_bundle["header"].get("ontologies", {}))
+
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_offset, header_length = PREAMBLE.unpack_from(mm, 0)
+        if magic != MAGIC:
+            raise ValueError("not a warm-start bundle")
+        header = json.loads(mm[header_offset:header_offset + header_length].decode("utf-8"))
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+            mm.madvise(mmap.MADV_WILLNEED)  # start reading the pages in now
+    except (OSError, ValueError, struct.error) as e:
+        print("Error opening warm-start bundle " + path + ": " + str(e))
+        return 0
+
+    # The previous mapping is not closed: data handed out from it stays valid
+    # until its last array view is dropped.
+    _bundle["mm"] = mm
+    _bundle["header"] = header
+    _bundle["mtime"] = mtime
+    return len(header.get("ontologies", {}))
+
+
+def bundled_generation(acronym):
+    """Generation of the bundled copy of an ontology, or None."""
+    if _bundle["path"] is not None:
+        checked_at = _bundle["checked_at"]
+        if checked_at is None or time.monotonic() - checked_at >= CHECK_INTERVAL_SEC:
+            open_bundle(_bundle["path"])
+    entry = _bundle["header"].get("ontologies", {}).get(acronym)
+    if entry is None or _bundle["mm"] is None:
+        return None
+    return entry["generation"]
+
+
+def _array(mm, section):
+    offset, length, dtype = section
+    dtype = np.dtype(dtype)
+    return np.frombuffer(mm, dtype=dtype, count=length // dtype.itemsize, offset=offset)
+
+
+class _StringColumn:
+    """Read-only sequence of strings stored as offsets + UTF-8 blob."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes()
+
+    def __getitem__(self, i):
+        return self.raw(i).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _Terms:
+    """terms[i] -> {label, iri, synonyms, definition}, like the term list the
+    cache files hold, decoded from the bundle on access."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns["iri"])
+
+    def __getitem__(self, i):
+        synonyms = self.columns["synonyms"][i]
+        return {
+            "label": self.columns["label"][i],
+            "iri": self.columns["iri"][i],
+            "synonyms": synonyms.split(SYNONYM_SEPARATOR) if synonyms else [],
+            "definition": self.columns["definition"][i],
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _IriIndex:
+    """index.get(iri) -> term of the first row with that IRI, index.row(iri)
+    -> that row (binary search over the bundle's IRI order)."""
+
+    def __init__(self, terms, order):
+        self.terms = terms
+        self.iris = terms.columns["iri"]
+        self.order = order
+
+    def row(self, iri):
+        key = iri.encode("utf-8")
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.iris.raw(int(self.order[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self.iris.raw(int(self.order[lo])) == key:
+            return int(self.order[lo])
+        return None
+
+    def get(self, iri, default=None):
+        row = self.row(iri)
+        if row is None:
+            return default
+        return self.terms[row]
+
+
+class _Vectorizer:
+    """transform(texts) with the same output as the build's vectorizer
+    (TfidfVectorizer, or the HashingVectorizer + TfidfTransformer pipeline),
+    from the settings and IDF weights in the bundle."""
+
+    def __init__(self, spec, idf, vocab):
+        self.spec = spec
+        self.idf = idf
+        self.vocab = vocab
+        params = dict(spec["params"])
+        if "ngram_range" in params:
+            params["ngram_range"] = tuple(params["ngram_range"])
+        if spec["kind"] == "hashing":
+            self.hashing = HashingVectorizer(**params)
+            self.analyzer = None
+        else:
+            self.hashing = None
+            self.analyzer = TfidfVectorizer(**params).build_analyzer()
+
+    def _feature(self, token):
+        key = token.encode("utf-8")
+        lo, hi = 0, len(self.vocab)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.vocab.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.vocab) and self.vocab.raw(lo) == key:
+            return lo
+        return -1
+
+    def _counts(self, texts):
+        if self.hashing is not None:
+            return self.hashing.transform(texts).tocsr().astype(np.float64)
+        indptr = [0]
+        indices = []
+        values = []
+        for text in texts:
+            counts = {}
+            for token in self.analyzer(text):
+                j = self._feature(token)
+                if j >= 0:
+                    counts[j] = counts.get(j, 0) + 1
+            for j in sorted(counts):
+                indices.append(j)
+                values.append(counts[j])
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.array(values, dtype=np.float64),
+                                  np.array(indices, dtype=np.int32),
+                                  np.array(indptr, dtype=np.int32)),
+                                 shape=(len(texts), self.spec["n_features"]))
+
+    def transform(self, texts):
+        matrix = self._counts(texts)
+        if self.spec.get("binary"):
+            matrix.data[:] = 1.0
+        if self.spec.get("sublinear_tf"):
+            matrix.data = np.log(matrix.data) + 1.0
+        if self.spec.get("use_idf", True):
+            matrix.data *= self.idf[matrix.indices]
+        if self.spec.get("norm"):
+            matrix = normalize(matrix, norm=self.spec["norm"], copy=False)
+        return matrix.astype(np.float32)
+
+
+def load(acronym, generation):
+    """Data dict (tfidf_matrix, vectorizer, terms, iris, iri_index, lsa) for a
+    bundled ontology, or None if the bundle has no copy of this generation."""
+    if bundled_generation(acronym) != generation:
+        return None
+    mm = _bundle["mm"]
+    entry = _bundle["header"]["ontologies"][acronym]
+    sections = entry["sections"]
+
+    matrix = sparse.csr_matrix(
+        (_array(mm, sections["matrix_data"]),
+         _array(mm, sections["matrix_indices"]),
+         _array(mm, sections["matrix_indptr"])),
+        shape=tuple(entry["shape"]), copy=False)
+    vocab = None
+    if "vocab_offsets" in sections:
+        vocab = _StringColumn(_array(mm, sections["vocab_offsets"]),
+                              _array(mm, sections["vocab_blob"]))
+    columns = {}
+    for field in TERM_FIELDS:
+        columns[field] = _StringColumn(_array(mm, sections[field + "_offsets"]),
+                                       _array(mm, sections[field + "_blob"]))
+    terms = _Terms(columns)
+
+    data = {}
+    data["tfidf_matrix"] = matrix
+    data["vectorizer"] = _Vectorizer(entry["vectorizer"], _array(mm, sections["idf"]), vocab)
+    data["terms"] = terms
+    data["iris"] = columns["iri"]
+    data["iri_index"] = _IriIndex(terms, _array(mm, sections["iri_order"]))
+    if "lsa_dim" in entry:
+        dim = entry["lsa_dim"]
+        lsa = {}
+        for name in ("feature_index", "components", "embeddings", "scales"):
+            if "lsa_" + name in sections:
+                lsa[name] = _array(mm, sections["lsa_" + name])
+        lsa["components"] = lsa["components"].reshape(-1, dim)
+        lsa["embeddings"] = lsa["embeddings"].reshape(-1, dim)
+        data["lsa"] = lsa
+    data["bundled"] = True
+    return data
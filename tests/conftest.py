@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The build scripts and the app modules import each other by bare name.
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_REPO_ROOT, "build"))
+sys.path.insert(0, os.path.join(_REPO_ROOT, "src", "Maptology"))
@@ -0,0 +1,217 @@
+"""
+Offline tests of the download flow in build/download_owl_files.py: every
+request goes to a requests-mock adapter mounted on the pooled session (the
+retry test uses a local HTTP server, since urllib3's retries live in the real
+HTTPAdapter that requests-mock replaces).
+"""
+
+import gzip
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests_mock
+
+import download_owl_files as dl
+
+
+BASE_URL = "http://bioportal.test"
+URL = BASE_URL + "/ontologies/TEST/download"
+ONT = {"acronym": "TEST", "native_format": "OWL"}
+BODY = b"<rdf:RDF>test ontology</rdf:RDF>"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dl, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def mock():
+    adapter = requests_mock.Adapter()
+    session = dl.make_session("test-key")
+    session.mount(BASE_URL + "/", adapter)
+    return session, adapter
+
+
+def download(session, compression="none"):
+    return dl.download_one(session, dl.RateLimiter(0), ONT, compression, base_url=BASE_URL)
+
+
+def test_full_download_goes_through_part_file(cache_dir, mock):
+    session, adapter = mock
+    adapter.register_uri("GET", URL, content=BODY, headers={"ETag": '"v1"'})
+
+    status, path, _ = download(session)
+
+    assert status == "downloaded"
+    assert path == dl.source_path("TEST")
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert not os.path.exists(dl.part_path("TEST"))
+    assert dl.read_meta("TEST") == {"etag": '"v1"', "last_modified": None, "complete": True}
+    request = adapter.last_request
+    assert request.headers["Authorization"] == "apikey token=test-key"
+    assert request.headers["Accept-Encoding"] == "identity"
+    assert "Range" not in request.headers
+
+
+def test_compressed_download(cache_dir, mock):
+    session, adapter = mock
+    adapter.register_uri("GET", URL, content=BODY, headers={"ETag": '"v1"'})
+
+    status, path, _ = download(session, compression="gzip")
+
+    assert status == "downloaded"
+    assert path.endswith(".owl.gz")
+    with gzip.open(path, "rb") as f:
+        assert f.read() == BODY
+    assert not os.path.exists(dl.part_path("TEST"))
+
+
+def test_unchanged_file_is_skipped_on_304(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.source_path("TEST"), "wb") as f:
+        f.write(BODY)
+    dl.write_meta("TEST", {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+                           "complete": True})
+    adapter.register_uri("GET", URL, status_code=304)
+
+    status, path, _ = download(session)
+
+    assert status == "unchanged"
+    assert path == dl.source_path("TEST")
+    request = adapter.last_request
+    assert request.headers["If-None-Match"] == '"v1"'
+    assert request.headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+
+
+def test_file_without_validators_is_not_requested(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.source_path("TEST"), "wb") as f:
+        f.write(BODY)
+
+    status, _, _ = download(session)
+
+    assert status == "exists"
+    assert adapter.call_count == 0
+
+
+def test_partial_download_resumes_with_range(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.part_path("TEST"), "wb") as f:
+        f.write(BODY[:10])
+    dl.write_meta("TEST", {"etag": '"v1"', "last_modified": None, "complete": False})
+    adapter.register_uri("GET", URL, status_code=206, content=BODY[10:],
+                         headers={"Content-Range": "bytes 10-" + str(len(BODY) - 1) + "/" + str(len(BODY))})
+
+    status, path, _ = download(session)
+
+    assert status == "resumed"
+    request = adapter.last_request
+    assert request.headers["Range"] == "bytes=10-"
+    assert request.headers["If-Range"] == '"v1"'
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert not os.path.exists(dl.part_path("TEST"))
+    assert dl.read_meta("TEST")["complete"] is True
+
+
+def test_changed_file_restarts_when_if_range_fails(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.part_path("TEST"), "wb") as f:
+        f.write(b"stale bytes of the old release")
+    dl.write_meta("TEST", {"etag": '"v1"', "last_modified": None, "complete": False})
+    # If-Range did not match: the server sends the whole new file with 200
+    adapter.register_uri("GET", URL, status_code=200, content=BODY, headers={"ETag": '"v2"'})
+
+    status, path, _ = download(session)
+
+    assert status == "downloaded"
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+    assert dl.read_meta("TEST") == {"etag": '"v2"', "last_modified": None, "complete": True}
+
+
+def test_wrong_content_range_fails(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.part_path("TEST"), "wb") as f:
+        f.write(BODY[:10])
+    dl.write_meta("TEST", {"etag": '"v1"', "last_modified": None, "complete": False})
+    adapter.register_uri("GET", URL, status_code=206, content=BODY,
+                         headers={"Content-Range": "bytes 0-" + str(len(BODY) - 1) + "/" + str(len(BODY))})
+
+    status, path, _ = download(session)
+
+    assert status == "failed"
+    assert path is None
+    with open(dl.part_path("TEST"), "rb") as f:
+        assert f.read() == BODY[:10]  # left for the next run
+
+
+def test_range_not_satisfiable_drops_part_file(cache_dir, mock):
+    session, adapter = mock
+    with open(dl.part_path("TEST"), "wb") as f:
+        f.write(BODY)
+    dl.write_meta("TEST", {"etag": '"v1"', "last_modified": None, "complete": False})
+    adapter.register_uri("GET", URL, status_code=416)
+
+    status, path, _ = download(session)
+
+    assert status == "failed"
+    assert path is None
+    assert not os.path.exists(dl.part_path("TEST"))
+    assert not os.path.exists(dl.source_path("TEST"))
+
+
+def test_server_errors_are_retried(cache_dir, monkeypatch):
+    monkeypatch.setattr(dl, "RETRY_BACKOFF", 0)
+    responses = [503, 502, 200]
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            code = responses.pop(0)
+            self.send_response(code)
+            body = BODY if code == 200 else b"busy"
+            self.send_header("Content-Length", str(len(body)))
+            if code == 200:
+                self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        session = dl.make_session("test-key")
+        base_url = "http://127.0.0.1:" + str(server.server_port)
+        status, path, _ = dl.download_one(session, dl.RateLimiter(0), ONT, base_url=base_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert status == "downloaded"
+    assert len(requests_seen) == 3
+    with open(path, "rb") as f:
+        assert f.read() == BODY
+
+
+def test_obo_ontologies_are_requested_as_rdf(cache_dir, mock):
+    session, adapter = mock
+    adapter.register_uri("GET", URL, content=BODY)
+
+    dl.download_one(session, dl.RateLimiter(0), {"acronym": "TEST", "native_format": "OBO"},
+                    base_url=BASE_URL)
+
+    assert adapter.last_request.qs == {"download_format": ["rdf"]}
+    assert json.loads(open(dl.meta_path("TEST")).read())["complete"] is True
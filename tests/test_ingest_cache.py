@@ -0,0 +1,80 @@
+"""
+The process-wide cache of parsed uploads in src/Maptology/ingest.py: pinning
+per session and releasing memory when a file is removed.
+"""
+
+import pytest
+
+import ingest
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(ingest, "_frames", type(ingest._frames)())
+    monkeypatch.setattr(ingest, "CACHE_UNPINNED_MAX_BYTES", 1024 * 1024)
+
+
+def csv(rows):
+    return ("id,name\n" + "".join(str(i) + ",n" + str(i) + "\n" for i in range(rows))).encode()
+
+
+def test_same_content_is_parsed_once(monkeypatch):
+    parsed = []
+    parse = ingest._parse
+    monkeypatch.setattr(ingest, "_parse", lambda *args: parsed.append(1) or parse(*args))
+
+    key_a, df_a = ingest.load_frame(csv(10), "a.csv", "session-a")
+    key_b, df_b = ingest.load_frame(csv(10), "b.csv", "session-b")
+
+    assert key_a == key_b and df_a is df_b
+    assert len(parsed) == 1
+    assert ingest.cache_status() == {"entries": 1, "bytes": ingest._frames[key_a]["bytes"], "pinned": 1}
+
+
+def test_removing_a_large_file_frees_it(monkeypatch):
+    monkeypatch.setattr(ingest, "CACHE_UNPINNED_MAX_BYTES", 100)  # under any real frame
+    key, _ = ingest.load_frame(csv(1000), "a.csv", "session-a")
+    ingest.load_frame(csv(1000), "a.csv", "session-b")
+
+    ingest.release("session-a", key)
+    assert ingest.cache_status()["entries"] == 1  # session-b still uses it
+
+    ingest.release("session-b", key)
+    assert ingest.cache_status() == {"entries": 0, "bytes": 0, "pinned": 0}
+
+
+def test_small_removed_files_are_kept_within_the_allowance(monkeypatch):
+    monkeypatch.setattr(ingest, "CACHE_UNPINNED_MAX_ENTRIES", 2)
+    keys = []
+    for i in range(3):
+        key, _ = ingest.load_frame(csv(5 + i), "f.csv", "session-" + str(i))
+        keys.append(key)
+        ingest.release("session-" + str(i), key)
+
+    assert list(ingest._frames) == keys[1:]  # least recently used dropped first
+    assert ingest.cache_status()["pinned"] == 0
+
+
+def test_replacing_a_file_releases_the_previous_one(monkeypatch):
+    monkeypatch.setattr(ingest, "CACHE_UNPINNED_MAX_BYTES", 0)
+    first, _ = ingest.load_frame(csv(10), "a.csv", "session-a")
+    second, _ = ingest.load_frame(csv(20), "b.csv", "session-a", previous_key=first)
+
+    assert list(ingest._frames) == [second]
+
+
+def test_shared_profiles_count_towards_the_entry_size():
+    state = {}
+    key, df = ingest.load_frame(csv(50), "a.csv", "session-a")
+    state.update(ingest_session="session-a", ingest_upload=(None, None, key), uploaded_df=df.copy(deep=False))
+    before = ingest._frames[key]["bytes"]
+    built = []
+
+    def build(series):
+        built.append(series.name)
+        return {"values": sorted(series.tolist())}
+
+    profile = ingest.column_profile(state, "name", build)
+    assert ingest.column_profile(state, "name", build) is profile
+    assert built == ["name"]
+    assert ingest._frames[key]["bytes"] == before + ingest._profile_bytes(profile)
@@ -0,0 +1,51 @@
+"""
+CSV/TSV uploads in src/Maptology/ingest.py must read the way the C parser
+with skipinitialspace reads them, whichever engine parses them.
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+import ingest
+
+
+def assert_reads_like_c_parser(data, name="data.csv"):
+    options = ingest.reader_options(name)
+    parsed = ingest._parse(data, options)
+    expected = pd.read_csv(io.BytesIO(data), sep=options["sep"], skipinitialspace=True)
+    expected = ingest._arrow_strings(expected)
+    expected.index = parsed.index
+    pd.testing.assert_frame_equal(parsed, expected)
+
+
+@pytest.mark.parametrize("data", [
+    b"a,a,b\n1,2,x\n",                              # repeated header name
+    b"id,a,a\n1,x,y\n",
+    b"a,a,a.1\n1,2,3\n",
+    b"a,,b\n1,2,3\n",                               # blank header name
+    b"id,name,score\n1,\"Smith, John\",2.5\n2,\"Doe, Jane\",3\n",
+    b"id, name\n1, x\n2, y\n",                      # blanks to skip
+    b"id,name\n1, \"x, y\"\n2,z\n",
+    b"id,when,day\n1,12:00,2024-01-01\n2,13:30,2024-01-02\n",
+    b"id,n\n1,\n2,NA\n3,4\n",
+    b"id,quote\n1,\"say \"\"hi\"\", then go\"\n",
+])
+def test_csv_matches_c_parser(data):
+    assert_reads_like_c_parser(data)
+
+
+def test_tsv_matches_c_parser():
+    assert_reads_like_c_parser(b"a\ta\tb\n1\t x\t\"p\tq\"\n", "data.tsv")
+
+
+@pytest.mark.skipif(not ingest.PYARROW_AVAILABLE, reason="needs pyarrow")
+def test_quoted_blanks_keep_the_pyarrow_engine():
+    options = ingest.reader_options("data.csv")
+
+    assert ingest._arrow_csv_ok(b"id,name\n1,\"Smith, John\"\n", options)
+    assert ingest._arrow_csv_ok(b"id,q\n1,\"a \"\"b, c\"\" d\"\n", options)
+    assert not ingest._arrow_csv_ok(b"id, name\n1,x\n", options)
+    assert not ingest._arrow_csv_ok(b"id,name\n1, \"x\"\n", options)
+    assert not ingest._arrow_csv_ok(b"id,name\n \"1\",x\n", options)
@@ -0,0 +1,87 @@
+"""
+The streaming .xlsx reader in src/Maptology/ingest.py must read a sheet the
+way pd.read_excel does: same column names, dtypes and values.
+"""
+
+import datetime
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import ingest
+
+
+def workbook(*sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets:
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def assert_reads_like_read_excel(data, sheet=None):
+    streamed = ingest._read_xlsx(data, sheet)
+    expected = pd.read_excel(io.BytesIO(data), sheet_name=sheet or 0)
+    expected.index = streamed.index
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+ROWS = [
+    ["id", "bool", "bool_blank", "bool_int", "bool_text", "num_text", "mixed", "na",
+     "date", "when", "", "id"],
+    [1, True, True, True, True, "1.5", "a", "NA", datetime.datetime(2024, 1, 1), datetime.time(8, 30), 1, 10],
+    [2, False, None, 2, "x", "2", 3, "n/a", None, datetime.time(9, 0), None, 11],
+    [3, True, False, 3, False, None, 4.5, "b", datetime.datetime(2024, 1, 3), None, None, 12],
+    [4.0, False, None, 4.5, None, "7", None, None, datetime.datetime(2024, 1, 4), datetime.time(10, 0), 2, 13],
+]
+
+
+def test_column_types_match_read_excel():
+    assert_reads_like_read_excel(workbook(("Data", ROWS)))
+
+
+def test_booleans_beside_blanks_are_floats():
+    df = ingest._read_xlsx(workbook(("Data", ROWS)), None)
+
+    assert df["bool"].dtype == bool
+    assert df["bool_blank"].dtype == "float64"
+    assert df["bool_blank"].fillna(-1).tolist() == [1.0, -1, 0.0, -1]
+    assert df["bool_int"].tolist() == [1.0, 2.0, 3.0, 4.5]
+    assert df["bool_text"].dtype == object
+
+
+@pytest.mark.parametrize("rows", [
+    [["a", "b"]],                                   # header only
+    [["a", None], [1, None], [None, None]],         # blank column, trailing blank row
+    [[None, "b"], [1, 2], [None, None], [3, 4]],    # unnamed column, blank row inside
+    [["a", "a", "a.1"], [1, 2, 3]],                 # duplicate names
+    [["only"], [None], [5]],
+])
+def test_sheet_shapes_match_read_excel(rows):
+    assert_reads_like_read_excel(workbook(("Data", rows)))
+
+
+def test_named_sheet():
+    data = workbook(("First", [["a"], [1]]), ("Second", [["b", "c"], ["x", 2.5]]))
+
+    assert ingest.sheet_names(data, "book.xlsx") == ["First", "Second"]
+    assert_reads_like_read_excel(data, "Second")
+    with pytest.raises(ValueError):
+        ingest._read_xlsx(data, "Missing")
+
+
+def test_falls_back_to_read_excel(monkeypatch):
+    data = workbook(("Data", ROWS))
+    monkeypatch.setattr(ingest, "XLSX_STREAMING", False)
+
+    df = ingest._parse(data, ingest.reader_options("book.xlsx"))
+
+    expected = pd.read_excel(io.BytesIO(data))
+    assert list(df.columns) == list(expected.columns)
+    assert df["bool_blank"].dtype == "float64"
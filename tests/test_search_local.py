@@ -0,0 +1,112 @@
+"""
+search_local in src/Maptology/tfidf_search.py over caches published by
+build/build_all_caches.py into a temporary tfidf_cache.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import build_all_caches
+import catalog
+import tfidf_search
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path)
+    for name, value in (("CACHE_DIR", cache_dir),
+                        ("CATALOG_FILE", str(tmp_path / "catalog.json")),
+                        ("WARM_BUNDLE_FILE", str(tmp_path / "warm_bundle.bin")),
+                        ("SHARED_IRIS_FILE", str(tmp_path / "shared_iris.ormsgpack")),
+                        ("BUILD_OPTIONS_FILE", str(tmp_path / "build_options.json"))):
+        monkeypatch.setattr(build_all_caches, name, value)
+    monkeypatch.setattr(catalog, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(catalog, "CATALOG_FILE", str(tmp_path / "catalog.json"))
+    monkeypatch.setattr(catalog, "_state", {"mtime": None, "checked_at": None, "entries": None})
+    monkeypatch.setattr(tfidf_search, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(tfidf_search, "_shared_iris", {"mtime": None, "checked_at": None, "owners": {}})
+    for name in ("_hierarchies", "_loaded_ontologies", "_resident", "_pins", "_last_used"):
+        monkeypatch.setattr(tfidf_search, name, {})
+    return tmp_path
+
+
+def term(label, iri):
+    return {"label": label, "iri": iri, "synonyms": [], "definition": ""}
+
+
+def publish(cache, ontologies, options=None):
+    (cache / "build_options.json").write_text(json.dumps(options or {}))
+    for acronym, terms in ontologies.items():
+        build_all_caches.build_and_save(acronym, [dict(t) for t in terms])
+    build_all_caches.build_shared_iri_index()
+    build_all_caches.write_catalog()
+
+
+FILLER = [term("thing %d sex organ" % i, "http://f/%d" % i) for i in range(30)]
+
+
+def test_fts_scores_are_on_the_cosine_scale(cache, monkeypatch):
+    publish(cache, {"TFI": [term("blood pressure", "http://t/1")] + FILLER,
+                    "FTS": [term("blood pressure", "http://s/1"),
+                            term("pressure", "http://s/2")] + FILLER},
+            {"FTS": {"fts": True}})
+    monkeypatch.setattr(tfidf_search, "SEARCH_BACKEND", "fts")
+
+    results = tfidf_search.search_local("blood pressure", ["TFI", "FTS"], top_n=5)
+
+    scores = dict(zip(results["Ontology Term URI"], results["Mapping Score"]))
+    assert all(0 < score <= 1.0 + 1e-6 for score in scores.values())
+    assert scores["http://s/1"] == pytest.approx(1.0)
+    assert scores["http://t/1"] == pytest.approx(1.0, abs=1e-5)
+    assert scores["http://s/2"] < scores["http://s/1"]
+
+
+SHARED = "http://purl.obolibrary.org/obo/BB_0000001"
+
+
+def shared_ontologies():
+    male = [term("male sex determination %d" % i, "http://a/%d" % i) for i in range(12)]
+    return {"AA": [term("male sex", SHARED)] + male + FILLER,
+            "BB": [term("male sex", SHARED), term("female", "http://b/1")] + FILLER,
+            "CC": [term("male sex", SHARED)] + FILLER}
+
+
+def test_shared_terms_are_published_once(cache):
+    publish(cache, shared_ontologies())
+
+    assert build_all_caches.published_acronyms() == ["AA", "BB", "CC"]
+    block = tfidf_search._load_ontology_data(tfidf_search.SHARED_BLOCK)
+    shared = [t for t in block["terms"] if t["iri"] == SHARED]
+    assert len(shared) == 1 and shared[0]["owners"] == ["BB", "AA", "CC"]
+    assert len(block["terms"]) == 31  # the shared IRI and the 30 fillers
+
+
+def test_loaded_ontologies_hand_shared_terms_to_the_block(cache):
+    publish(cache, shared_ontologies())
+
+    tfidf_search.search_local("male sex", ["AA", "BB"], semantic_weight=0)
+
+    block = tfidf_search._loaded_ontologies[tfidf_search.SHARED_BLOCK]
+    for acronym in ("AA", "BB"):
+        data = tfidf_search._loaded_ontologies[acronym]
+        rows = np.flatnonzero(data["block_rows"] >= 0)
+        assert len(rows) == 31  # the shared IRI and the 30 fillers
+        assert data["tfidf_matrix"][rows].nnz == 0
+        assert all(data["terms"][i] is block["terms"][data["block_rows"][i]] for i in rows)
+
+
+def test_shared_terms_rank_the_same_in_any_selection_order(cache):
+    publish(cache, shared_ontologies())
+
+    rankings = []
+    for selection in (["AA", "BB"], ["BB", "AA"], ["AA", "CC"], ["CC", "AA"]):
+        results = tfidf_search.search_local("male sex", selection, top_n=3, semantic_weight=0)
+        assert results["Ontology Term URI"].is_unique
+        row = results[results["Ontology Term URI"] == SHARED].iloc[0]
+        assert row["Mapping Score"] == pytest.approx(1.0, abs=1e-5)
+        assert sorted(row["Ontologies"]) == ["AA", "BB", "CC"]
+        rankings.append((row["Ontology Name"], list(results["Ontology Term URI"])))
+    assert rankings[0] == rankings[1] and rankings[0][0] == "BB"  # the IRI's own ontology
+    assert rankings[2] == rankings[3] and rankings[2][0] == "AA"  # else the first owner
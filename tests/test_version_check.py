@@ -0,0 +1,112 @@
+"""
+Tests of the BioPortal version lookups in build/version_check.py against a
+requests-mock endpoint, including the on-disk response cache.
+"""
+
+import json
+
+import pytest
+import requests_mock
+
+import version_check as vc
+
+
+BASE_URL = "http://bioportal.test"
+
+
+def submission(submission_id, released):
+    return {"submissionId": submission_id, "version": "v" + str(submission_id),
+            "released": released, "creationDate": released, "submissionStatus": ["RDF"],
+            "ontology": "ignored"}
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(vc, "VERSIONS_FILE", str(tmp_path / "ontology_versions.json"))
+    return tmp_path
+
+
+@pytest.fixture
+def mock():
+    adapter = requests_mock.Adapter()
+    adapter.register_uri("GET", BASE_URL + "/ontologies/NCIT/latest_submission",
+                         json=submission(2, "2024-02-01"))
+    adapter.register_uri("GET", BASE_URL + "/ontologies/EFO/latest_submission",
+                         json=submission(7, "2024-03-01"))
+    adapter.register_uri("GET", BASE_URL + "/ontologies/GONE/latest_submission", status_code=404)
+    session = vc.make_session(2)
+    session.mount(BASE_URL + "/", adapter)
+    return session, adapter
+
+
+def test_latest_submission(mock):
+    session, adapter = mock
+
+    info = vc.get_latest_submission("NCIT", "key", session, BASE_URL)
+
+    assert info == {"submissionId": 2, "version": "v2", "released": "2024-02-01",
+                    "creationDate": "2024-02-01", "submissionStatus": ["RDF"]}
+    assert adapter.last_request.qs == {"apikey": ["key"]}
+    assert vc.get_latest_submission("GONE", "key", session, BASE_URL) is None
+
+
+def test_record_then_check(files, mock):
+    session, adapter = mock
+    cache_file = str(files / "cache.json")
+
+    versions = vc.record_versions("key", ["NCIT", "GONE"], session, BASE_URL, cache_file=cache_file)
+
+    assert set(versions) == {"NCIT"}
+    with open(vc.VERSIONS_FILE, encoding="utf-8") as f:
+        assert json.load(f)["NCIT"]["submissionId"] == 2
+
+    adapter.register_uri("GET", BASE_URL + "/ontologies/NCIT/latest_submission",
+                         json=submission(3, "2024-04-01"))
+    outdated = vc.check_for_updates("key", ["NCIT", "EFO"], session, BASE_URL,
+                                    max_age=0, cache_file=cache_file)
+
+    assert [(acronym, why) for acronym, why, _ in outdated] == [
+        ("NCIT", "local=2024-02-01 remote=2024-04-01"),
+        ("EFO", "not recorded locally"),
+    ]
+
+
+def test_response_cache_is_per_endpoint(files, mock):
+    session, adapter = mock
+    cache_file = str(files / "cache.json")
+
+    vc.get_latest_submissions(["NCIT", "GONE"], "key", session, BASE_URL, cache_file=cache_file)
+    assert adapter.call_count == 2
+    with open(cache_file, encoding="utf-8") as f:
+        assert list(json.load(f)) == [BASE_URL + "/ontologies/NCIT/latest_submission"]
+
+    # Fresh answers are reused; the failed lookup is asked again
+    latest = vc.get_latest_submissions(["NCIT", "GONE"], "key", session, BASE_URL,
+                                       cache_file=cache_file)
+    assert latest["NCIT"]["submissionId"] == 2
+    assert adapter.call_count == 3
+
+    # Another endpoint does not see the first one's answers
+    other = requests_mock.Adapter()
+    other.register_uri("GET", "http://mirror.test/ontologies/NCIT/latest_submission",
+                       json=submission(9, "2025-01-01"))
+    session.mount("http://mirror.test/", other)
+    latest = vc.get_latest_submissions(["NCIT"], "key", session, "http://mirror.test",
+                                       cache_file=cache_file)
+    assert latest["NCIT"]["submissionId"] == 9
+    assert other.call_count == 1
+
+
+def test_record_bypasses_response_cache(files, mock):
+    session, adapter = mock
+    cache_file = str(files / "cache.json")
+    vc.get_latest_submissions(["NCIT"], "key", session, BASE_URL, cache_file=cache_file)
+
+    adapter.register_uri("GET", BASE_URL + "/ontologies/NCIT/latest_submission",
+                         json=submission(3, "2024-04-01"))
+    versions = vc.record_versions("key", ["NCIT"], session, BASE_URL, cache_file=cache_file)
+
+    assert versions["NCIT"]["submissionId"] == 3
+    # ... and refreshes it for the next --check
+    latest = vc.get_latest_submissions(["NCIT"], "key", session, BASE_URL, cache_file=cache_file)
+    assert latest["NCIT"]["submissionId"] == 3